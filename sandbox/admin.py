@@ -1,24 +1,83 @@
+from django import forms
 from django.contrib import admin
-from .models import Organization, Role, Member
-
-class MemberInline(admin.TabularInline):
-    model = Member
-    extra = 1
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelectMultiple
+from tenant_rbac.admin import AutocompleteFilter, TenantAdmin, TenantModelAdmin
+from tenant_rbac.forms import RoleFormMixin
+from .models import AuditEvent, Organization, Role, Member
 
 @admin.register(Organization)
-class OrganizationAdmin(admin.ModelAdmin):
+class OrganizationAdmin(TenantAdmin):
     list_display = ('name', 'tenant_id')
-    inlines = [MemberInline]
+    search_fields = ('name',)
+    # Instead of a member inline: big tenants have 100k+ members
+    readonly_fields = ('member_summary',)
+
+class RoleChangeList(ChangeList):
+    def get_queryset(self, request, exclude_parameters=None):
+        # Annotated before the changelist applies the ordering (member_count / permission_count)
+        if not getattr(self, '_with_summary', False):
+            self.root_queryset = Role.with_summary(self.root_queryset)
+            self._with_summary = True
+        return super().get_queryset(request, exclude_parameters)
+
+class RoleAdminForm(RoleFormMixin, forms.ModelForm):
+    # No request: the admin is global, only the parent checks of RoleFormMixin apply
+    class Meta:
+        model = Role
+        fields = '__all__'
 
 @admin.register(Role)
-class RoleAdmin(admin.ModelAdmin):
-    # CAMBIO: Usamos 'organization' en lugar de 'tenant'
-    list_display = ('name', 'organization') 
-    list_filter = ('organization',)
-    filter_horizontal = ('permissions',)
+class RoleAdmin(TenantModelAdmin):
+    form = RoleAdminForm
+    list_display = ('name', 'organization', 'member_count', 'permission_count')
+    list_filter = [('organization', AutocompleteFilter)]
+    search_fields = ('name', 'organization__name')
+    # Parents as a plain select, limited to the workspace of the role in get_form()
+    autocomplete_fields = ('organization',)
+
+    def get_form(self, request, obj=None, **kwargs):
+        if obj is None:
+            # No workspace yet: search parents on demand instead of listing every role of every tenant
+            widgets = kwargs.setdefault('widgets', {})
+            widgets.setdefault('parents', AutocompleteSelectMultiple(Role._meta.get_field('parents'), self.admin_site))
+        form = super().get_form(request, obj, **kwargs)
+        if obj is not None and 'parents' in form.base_fields:
+            # Never a role of another workspace, the role itself or one that inherits from it
+            field = form.base_fields['parents']
+            field.queryset = field.queryset.filter(organization_id=obj.organization_id).exclude(
+                pk=obj.pk
+            ).exclude(ancestors=obj.pk)
+        return form
+
+    def get_changelist(self, request, **kwargs):
+        # Counts for the list only, not for autocomplete or the change form
+        return RoleChangeList
+
+    @admin.display(ordering='member_count')
+    def member_count(self, obj):
+        return obj.member_count
+
+    @admin.display(ordering='permission_count')
+    def permission_count(self, obj):
+        return obj.permission_count
 
 @admin.register(Member)
-class MemberAdmin(admin.ModelAdmin):
-    # CAMBIO: Usamos 'organization' en lugar de 'tenant'
+class MemberAdmin(TenantModelAdmin):
     list_display = ('user', 'role', 'organization')
-    list_filter = ('organization', 'role')
\ No newline at end of file
+    list_filter = [('organization', AutocompleteFilter), ('role', AutocompleteFilter)]
+    search_fields = ('user__username', 'user__email')
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(TenantModelAdmin):
+    # Written by tenant_rbac.audit only
+    list_display = ('timestamp', 'organization', 'action', 'actor_id', 'target_type', 'target_id')
+    list_filter = [('organization', AutocompleteFilter)]
+    # Exact matches: no SELECT DISTINCT or LIKE scans over the whole log
+    search_fields = ('=action', '=actor_id')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -11,6 +11,11 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'django_multitenant_rbac.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sandbox.settings')
 
 application = get_asgi_application()
+
+# Load the permission registry (and cached permission sets) before the first request
+from tenant_rbac.warmup import warm_up  # noqa: E402
+
+warm_up()
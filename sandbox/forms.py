@@ -1,16 +1,13 @@
 from django import forms
-from tenant_rbac.forms import RoleFormMixin
+from tenant_rbac.forms import PermissionChoiceField, RoleFormMixin
 from .models import Role
 
 class RoleForm(RoleFormMixin, forms.ModelForm): 
-    permissions = forms.ModelMultipleChoiceField(
-        queryset=None, 
-        widget=forms.CheckboxSelectMultiple,
-        required=False
-    )
+    # Checkboxes grouped by app/model, rendered from the permission catalog
+    permissions = PermissionChoiceField(required=False)
     class Meta:
         model = Role
-        fields = ['name', 'description', 'permissions']
+        fields = ['name', 'description', 'parents', 'permissions']
 
 from tenant_rbac.forms import TenantModelForm
 from .models import Member
@@ -0,0 +1,211 @@
+import io
+import json
+import platform
+import statistics
+import time
+from datetime import datetime, timezone
+
+import django
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.template import Context, Template
+from django.test import Client, RequestFactory, override_settings
+from django.test.utils import setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.urls import URLPattern, get_resolver, reverse
+from sandbox.forms import MemberForm, RoleForm
+from sandbox.models import Member, Organization, Role
+from sandbox.views import RoleListView
+from tenant_rbac.instrumentation import RequestMetrics
+from tenant_rbac.middleware import tenant_cache
+
+# Arguments of generate_load_data for each scale
+SCALES = {
+    'small': {'orgs': 10, 'users': 200, 'memberships': 1000},
+    'medium': {'orgs': 50, 'users': 5000, 'memberships': 50000},
+    'large': {'orgs': 200, 'users': 50000, 'memberships': 500000},
+}
+
+TAG_TEMPLATE = Template(
+    '{% load rbac_tags %}' + "{% has_tenant_perm 'sandbox.view_role' as can_view %}{{ can_view }}" * 10
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks the RBAC hot paths (permission check, template tag, tenant forms) and every sandbox URL '
+        'at several data scales, in a throwaway test database. Saves JSON results and compares them with a baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='small,medium', help=f"Comma separated: {', '.join(SCALES)}.")
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='JSON file of a previous run; exit with an error on regressions.')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed p50 slowdown (0.25 = 25%%).')
+        parser.add_argument('--min-delta-ms', type=float, default=0.05, help='Ignore p50 changes smaller than this.')
+
+    def handle(self, *args, **options):
+        scales = [scale.strip() for scale in options['scales'].split(',') if scale.strip()]
+        unknown = set(scales) - set(SCALES)
+        if unknown:
+            raise CommandError(f"Unknown scales: {', '.join(sorted(unknown))}.")
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as handle:
+                baseline = json.load(handle)
+
+        self.iterations, self.warmup = options['iterations'], options['warmup']
+        results = {}
+
+        # Never touch the development database
+        setup_test_environment(debug=False)
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                for scale in scales:
+                    self.stdout.write(self.style.MIGRATE_HEADING(f'Scale: {scale} {SCALES[scale]}'))
+                    self.load(scale, options['seed'])
+                    results[scale] = self.run_scale()
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'date': datetime.now(timezone.utc).isoformat(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'iterations': self.iterations,
+                'seed': options['seed'],
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results saved to {options['output']}"))
+
+        if baseline is not None:
+            self.compare(baseline, report, options['threshold'], options['min_delta_ms'])
+
+    def load(self, scale, seed):
+        call_command('flush', interactive=False, verbosity=0)
+        caches['default'].clear()
+        tenant_cache.clear()
+        call_command('generate_load_data', seed=seed, stdout=io.StringIO(), **SCALES[scale])
+
+    def run_scale(self):
+        # The largest ("whale") tenant and its administrator: the worst case
+        tenant = Organization.objects.annotate(size=Count('members')).order_by('-size').first()
+        admin = Member.objects.select_related('user').get(organization=tenant, is_protected=True).user
+        role = Role.objects.filter(organization=tenant, is_protected=False).first()
+        member = Member.objects.filter(organization=tenant, is_protected=False).first()
+
+        results = {}
+
+        def record(name, func):
+            results[name] = self.measure(func)
+            self.report(name, results[name])
+
+        factory = RequestFactory()
+
+        def new_request():
+            request = factory.get('/')
+            request.user = admin
+            request.tenant = tenant
+            return request
+
+        view = RoleListView()
+        warm = new_request()
+        record('rbac.check.memoized', lambda: view.has_tenant_permission(warm))
+        record('rbac.check.cached', lambda: view.has_tenant_permission(new_request()))
+        with override_settings(TENANT_RBAC_CACHE=None):
+            record('rbac.check.db', lambda: view.has_tenant_permission(new_request()))
+
+        record('tag.has_tenant_perm.x10', lambda: TAG_TEMPLATE.render(Context({'request': new_request()})))
+        record('form.member.init', lambda: MemberForm(request=new_request(), instance=member))
+        record('form.role.init', lambda: RoleForm(request=new_request()))
+        record('form.role.render', lambda: RoleForm(request=new_request()).as_p())
+
+        client = Client()
+        client.force_login(admin)
+        for name, url in self.sandbox_urls(tenant, role, member):
+            record(f'url.{name}', lambda url=url: client.get(url))
+        return results
+
+    def sandbox_urls(self, tenant, role, member):
+        """Every named sandbox URL, with its arguments filled from the benchmark data."""
+        for pattern in get_resolver().url_patterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue  # e.g. the admin include
+            kwargs = {}
+            for argument in pattern.pattern.converters:
+                if argument == 'tenant_id':
+                    kwargs[argument] = tenant.pk
+                elif argument == 'pk':
+                    kwargs[argument] = member.pk if pattern.name.startswith('member') else role.pk
+            yield pattern.name, reverse(pattern.name, kwargs=kwargs)
+
+    def measure(self, func):
+        for _ in range(self.warmup):
+            func()
+        # Queries are counted on a separate call. Not with CaptureQueriesContext:
+        # request_started resets connection.queries during client requests.
+        counter = RequestMetrics()
+        with connection.execute_wrapper(counter):
+            result = func()
+        timings = []
+        for _ in range(self.iterations):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        summary = {
+            'p50_ms': statistics.median(timings),
+            'p95_ms': timings[max(int(len(timings) * 0.95) - 1, 0)],
+            'p99_ms': timings[max(int(len(timings) * 0.99) - 1, 0)],
+            'mean_ms': statistics.fmean(timings),
+            'queries': counter.sql_count,
+        }
+        status = getattr(result, 'status_code', None)
+        if status is not None:
+            summary['status'] = status
+        return summary
+
+    def report(self, name, summary):
+        status = f"  [{summary['status']}]" if 'status' in summary else ''
+        self.stdout.write(
+            f"  {name:32} p50 {summary['p50_ms']:8.3f} ms  p95 {summary['p95_ms']:8.3f} ms  "
+            f"p99 {summary['p99_ms']:8.3f} ms  {summary['queries']:3} queries{status}"
+        )
+
+    def compare(self, baseline, report, threshold, min_delta_ms):
+        regressions = []
+        for scale, cases in report['results'].items():
+            for name, current in cases.items():
+                previous = baseline.get('results', {}).get(scale, {}).get(name)
+                if previous is None:
+                    continue
+                delta = current['p50_ms'] - previous['p50_ms']
+                if delta > min_delta_ms and delta > previous['p50_ms'] * threshold:
+                    regressions.append(
+                        f"{scale}/{name}: p50 {previous['p50_ms']:.3f} -> {current['p50_ms']:.3f} ms "
+                        f"(+{delta / previous['p50_ms']:.0%})"
+                    )
+                if current['queries'] > previous['queries']:
+                    regressions.append(f"{scale}/{name}: queries {previous['queries']} -> {current['queries']}")
+                if previous.get('status') != current.get('status'):
+                    regressions.append(f"{scale}/{name}: status {previous.get('status')} -> {current.get('status')}")
+
+        if regressions:
+            for line in regressions:
+                self.stdout.write(self.style.ERROR(f'  REGRESSION {line}'))
+            raise CommandError(f'{len(regressions)} regression(s) against {baseline["meta"]["date"]}.')
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,90 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+from sandbox.models import Member
+
+
+class Command(BaseCommand):
+    help = 'Compares sync (WSGI) and async (ASGI) throughput of the same tenant-gated endpoint under concurrency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Total requests per mode.')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--username', default='alice', help='Run setup_test_data first.')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User '{options['username']}' does not exist. Run 'setup_test_data' first.")
+
+        membership = Member.objects.filter(user=user).first()
+        if membership is None:
+            raise CommandError(f"User '{user}' has no membership.")
+
+        tenant_id = membership.organization_id
+        total, concurrency = options['requests'], options['concurrency']
+
+        sync_url = reverse('api_permissions', kwargs={'tenant_id': tenant_id})
+        async_url = reverse('api_permissions_async', kwargs={'tenant_id': tenant_id})
+
+        # The test clients always send 'Host: testserver'
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            # Authenticate once; both clients reuse the session cookie
+            login = Client()
+            login.force_login(user)
+            cookies = login.cookies
+
+            self.report('sync  (WSGI, threads)', *self.run_sync(sync_url, cookies, total, concurrency))
+            self.report(
+                'async (ASGI, event loop)', *asyncio.run(self.run_async(async_url, cookies, total, concurrency))
+            )
+
+    def run_sync(self, url, cookies, total, concurrency):
+        def worker(count):
+            client = Client()
+            client.cookies = cookies
+            latencies = []
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.get(url)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.status_code
+            return latencies
+
+        chunks = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            latencies = [latency for result in pool.map(worker, chunks) for latency in result]
+        return time.perf_counter() - start, latencies
+
+    async def run_async(self, url, cookies, total, concurrency):
+        client = AsyncClient()
+        client.cookies = cookies
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url)
+                latencies.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.status_code
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return time.perf_counter() - start, latencies
+
+    def report(self, label, elapsed, latencies):
+        latencies = sorted(latencies)
+        p95 = latencies[int(len(latencies) * 0.95) - 1]
+        self.stdout.write(
+            f'{label:26} {len(latencies) / elapsed:8.1f} req/s   '
+            f'p50 {statistics.median(latencies) * 1000:7.2f} ms   p95 {p95 * 1000:7.2f} ms'
+        )
@@ -0,0 +1,67 @@
+import statistics
+import time
+
+from django import forms
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.forms import modelformset_factory
+from django.test import RequestFactory
+from sandbox.forms import MemberForm
+from sandbox.models import Member, Organization
+
+
+class PerInstanceMemberForm(MemberForm):
+    """
+    Baseline: the previous TenantModelForm behaviour, which inspected every
+    field and rebuilt its tenant filter on each instantiation.
+    """
+    def get_tenant_querysets(self, tenant):
+        querysets = {}
+        for field_name, field in self.fields.items():
+            if isinstance(field, (forms.ModelChoiceField, forms.ModelMultipleChoiceField)):
+                if not hasattr(field, 'queryset') or field.queryset is None:
+                    continue
+                model = field.queryset.model
+                if hasattr(model, 'tenant_id'):
+                    tenant_field = getattr(model, 'tenant_id', 'tenant_id')
+                    querysets[field_name] = field.queryset.filter(**{tenant_field: tenant.pk})
+        return querysets
+
+
+class Command(BaseCommand):
+    help = 'Measures construction and rendering of a tenant member formset (per-class vs per-instance field scoping)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--forms', type=int, default=300, help='Forms per formset.')
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--render', action='store_true', help='Also render the formset to HTML.')
+
+    def handle(self, *args, **options):
+        tenant = Organization.objects.order_by('pk').first()
+        if tenant is None:
+            raise CommandError("No organization found. Run 'setup_test_data' first.")
+
+        for label, form_class in (('per-instance (before)', PerInstanceMemberForm), ('per-class (now)', MemberForm)):
+            timings = self.run(form_class, tenant, options)
+            self.stdout.write(
+                f"{label:22} median {statistics.median(timings) * 1000:8.2f} ms   "
+                f"min {min(timings) * 1000:8.2f} ms   ({options['forms']} forms)"
+            )
+
+    def run(self, form_class, tenant, options):
+        FormSet = modelformset_factory(Member, form=form_class, extra=options['forms'])
+        timings = []
+        for _ in range(options['repeat']):
+            # A fresh request each time, as in a real request cycle
+            request = RequestFactory().get('/')
+            request.user = AnonymousUser()
+            request.tenant = tenant
+
+            start = time.perf_counter()
+            formset = FormSet(queryset=Member.objects.none(), form_kwargs={'request': request})
+            forms_list = formset.forms
+            if options['render']:
+                formset.as_p()
+            timings.append(time.perf_counter() - start)
+            assert len(forms_list) == options['forms']
+        return timings
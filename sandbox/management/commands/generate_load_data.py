@@ -0,0 +1,210 @@
+import random
+import time
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import Permission, User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from sandbox.models import AuditEvent, EffectivePermission, Member, Organization, Role
+from tenant_rbac.bitmask import mask_from_ids
+from tenant_rbac.cache import invalidate_tenant_permissions
+from tenant_rbac.effective import get_effective_permission_model, sync_effective_permissions
+
+# Permissions of the generated 'Administrator' role, so the sandbox pages are usable
+ADMIN_PERMISSIONS = [
+    ('auth', 'view_user'), ('auth', 'add_user'),
+    ('sandbox', 'view_role'), ('sandbox', 'add_role'), ('sandbox', 'change_role'), ('sandbox', 'delete_role'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Generates synthetic organizations, users, roles and memberships at production scale '
+        '(bulk inserts, deterministic seed, no per-row signals)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orgs', type=int, default=100)
+        parser.add_argument('--users', type=int, default=10000)
+        parser.add_argument('--memberships', type=int, default=50000, help='Target total of memberships.')
+        parser.add_argument(
+            '--distribution', choices=['pareto', 'uniform'], default='pareto',
+            help="Members per organization. 'pareto' gives a few whale tenants and a long tail."
+        )
+        parser.add_argument('--alpha', type=float, default=1.16, help='Pareto shape (1.16 ~ 80/20).')
+        parser.add_argument('--roles', type=int, default=5, help='Roles per organization (first one is Administrator).')
+        parser.add_argument('--perms-per-role', type=int, default=8)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='load', help='Prefix of generated names (used by --clear).')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--clear', action='store_true', help='Delete previously generated data with this prefix first.')
+
+    def handle(self, *args, **options):
+        if options['orgs'] < 1 or options['users'] < 1 or options['roles'] < 1:
+            raise CommandError('--orgs, --users and --roles must be at least 1.')
+
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        prefix = options['prefix']
+
+        if options['clear']:
+            self.step('Clearing previous data', lambda: self.clear(prefix))
+
+        # bulk_create sends no post_save: create_default_roles does not run
+        with transaction.atomic():
+            user_ids = self.step('Users', lambda: self.create_users(prefix, options['users']))
+            org_ids = self.step('Organizations', lambda: self.create_orgs(prefix, options['orgs']))
+            roles = self.step('Roles and permissions', lambda: self.create_roles(org_ids, options))
+            sizes = self.tenant_sizes(len(org_ids), len(user_ids), options)
+            total = self.step('Memberships', lambda: self.create_members(org_ids, user_ids, roles, sizes))
+            if get_effective_permission_model() is not None:
+                self.step('Effective permissions', lambda: self.sync_effective_permissions(org_ids))
+            invalidate_tenant_permissions(*org_ids)
+
+        biggest = sorted(sizes, reverse=True)[:5]
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(org_ids)} organizations, {len(user_ids)} users, {len(org_ids) * options["roles"]} roles, '
+            f'{total} memberships (largest tenants: {biggest}). Password of every user: password123'
+        ))
+
+    def step(self, label, func):
+        start = time.perf_counter()
+        result = func()
+        self.stdout.write(f'{label:24} {time.perf_counter() - start:7.1f}s')
+        return result
+
+    def batches(self, iterable):
+        batch = []
+        for item in iterable:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def create_users(self, prefix, count):
+        # Hashing once: a million PBKDF2 rounds would take hours
+        password = make_password('password123')
+        width = len(str(count))
+        users = (
+            User(username=f'{prefix}_user_{i:0{width}}', email=f'{prefix}_user_{i}@example.com', password=password)
+            for i in range(count)
+        )
+        for batch in self.batches(users):
+            User.objects.bulk_create(batch)
+        return list(
+            User.objects.filter(username__startswith=f'{prefix}_user_').order_by('pk').values_list('pk', flat=True)
+        )
+
+    def create_orgs(self, prefix, count):
+        width = len(str(count))
+        Organization.objects.bulk_create(
+            [Organization(name=f'{prefix} org {i:0{width}}') for i in range(count)], batch_size=self.batch_size
+        )
+        return list(
+            Organization.objects.filter(name__startswith=f'{prefix} org ').order_by('pk').values_list('pk', flat=True)
+        )
+
+    def create_roles(self, org_ids, options):
+        """Returns {org_id: [role_id, ...]} with the Administrator role first."""
+        permissions = {
+            (app_label, codename): pk
+            for pk, app_label, codename in Permission.objects.values_list('pk', 'content_type__app_label', 'codename')
+        }
+        admin_perms = [permissions[key] for key in ADMIN_PERMISSIONS if key in permissions]
+        pool = sorted(permissions.values())
+        per_role = min(options['perms_per_role'], len(pool))
+
+        grants = {}
+        objects = []
+        for org_id in org_ids:
+            for index in range(options['roles']):
+                perms = admin_perms if index == 0 else self.rng.sample(pool, per_role)
+                grants[(org_id, index)] = perms
+                objects.append(Role(
+                    organization_id=org_id,
+                    name='Administrator' if index == 0 else f'Role {index}',
+                    is_protected=index == 0,
+                    # Compiled here: no rebuild_permission_masks needed afterwards
+                    permissions_mask=mask_from_ids(perms),
+                ))
+        for batch in self.batches(objects):
+            Role.objects.bulk_create(batch)
+
+        roles = {org_id: [] for org_id in org_ids}
+        rows = Role.objects.filter(organization_id__in=org_ids).order_by('organization_id', 'pk')
+        for org_id, role_id in rows.values_list('organization_id', 'pk').iterator():
+            roles[org_id].append(role_id)
+
+        through = Role.permissions.through
+        links = (
+            through(role_id=role_ids[index], permission_id=perm_id)
+            for org_id, role_ids in roles.items()
+            for index in range(len(role_ids))
+            for perm_id in grants[(org_id, index)]
+        )
+        for batch in self.batches(links):
+            through.objects.bulk_create(batch)
+        return roles
+
+    def tenant_sizes(self, orgs, users, options):
+        if options['distribution'] == 'uniform':
+            weights = [1.0] * orgs
+        else:
+            weights = [self.rng.paretovariate(options['alpha']) for _ in range(orgs)]
+        total = sum(weights)
+        # Every tenant has at least one member; a tenant cannot have more members than users exist
+        return [min(users, max(1, round(options['memberships'] * weight / total))) for weight in weights]
+
+    def create_members(self, org_ids, user_ids, roles, sizes):
+        def members():
+            for org_id, size in zip(org_ids, sizes):
+                role_ids = roles[org_id]
+                # Few administrators, most members spread over the other roles
+                weights = [1] + [20] * (len(role_ids) - 1)
+                for position, user_id in enumerate(self.rng.sample(user_ids, size)):
+                    role_id = role_ids[0] if position == 0 else self.rng.choices(role_ids, weights)[0]
+                    yield Member(organization_id=org_id, user_id=user_id, role_id=role_id, is_protected=position == 0)
+
+        created = 0
+        for batch in self.batches(members()):
+            Member.objects.bulk_create(batch)
+            created += len(batch)
+        return created
+
+    def sync_effective_permissions(self, org_ids):
+        for org_id in org_ids:
+            sync_effective_permissions(org_id, member_model=Member, batch_size=self.batch_size)
+
+    def clear(self, prefix):
+        # Raw deletes: the ORM would collect and signal a million rows one by one
+        quote = connection.ops.quote_name
+        # '_' and '%' of the prefix are literal, not wildcards
+        escaped = prefix.replace('!', '!!').replace('_', '!_').replace('%', '!%')
+        orgs = f"SELECT id FROM {quote(Organization._meta.db_table)} WHERE name LIKE %s ESCAPE '!'"
+        role_ids = f"SELECT id FROM {quote(Role._meta.db_table)} WHERE organization_id IN ({orgs})"
+        statements = [(Role.permissions.through, f"role_id IN ({role_ids})", 1)]
+        for name in ('parents', 'ancestors'):
+            # Role hierarchy (RoleHierarchyMixin): both ends of each link are roles of these orgs
+            field = Role._meta.get_field(name)
+            statements.append((
+                field.remote_field.through,
+                f"{quote(field.m2m_column_name())} IN ({role_ids}) OR {quote(field.m2m_reverse_name())} IN ({role_ids})",
+                2,
+            ))
+        statements += [
+            (Member, f"organization_id IN ({orgs})", 1),
+            (EffectivePermission, f"organization_id IN ({orgs})", 1),
+            (AuditEvent, f"organization_id IN ({orgs})", 1),
+            (Role, f"organization_id IN ({orgs})", 1),
+            (Organization, "name LIKE %s ESCAPE '!'", 1),
+        ]
+        with transaction.atomic(), connection.cursor() as cursor:
+            for model, where, patterns in statements:
+                cursor.execute(f"DELETE FROM {quote(model._meta.db_table)} WHERE {where}", [f'{escaped} org %'] * patterns)
+            user_table = quote(User._meta.db_table)
+            users = f"SELECT id FROM {user_table} WHERE username LIKE %s ESCAPE '!'"
+            cursor.execute(f"DELETE FROM {quote(Member._meta.db_table)} WHERE user_id IN ({users})", [f'{escaped}!_user!_%'])
+            # Generated users have no groups, permissions or admin log entries
+            cursor.execute(f"DELETE FROM {user_table} WHERE username LIKE %s ESCAPE '!'", [f'{escaped}!_user!_%'])
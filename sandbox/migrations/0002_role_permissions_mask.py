@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-17 02:53
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def compile_role_masks(apps, schema_editor):
+    # Frozen copy of tenant_rbac.bitmask.compute_role_masks() as of this
+    # migration (no role hierarchy yet): bit N = Permission with id N
+    Role = apps.get_model('sandbox', 'Role')
+    masks = defaultdict(int)
+    for role_id, permission_id in Role.permissions.through.objects.values_list('role_id', 'permission_id').iterator():
+        masks[role_id] |= 1 << permission_id
+    for role_id, value in masks.items():
+        mask = value.to_bytes((value.bit_length() + 7) // 8, 'little')
+        Role._base_manager.filter(pk=role_id).update(permissions_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('sandbox', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='role',
+            options={'ordering': ['name'], 'verbose_name': 'Business Role', 'verbose_name_plural': 'Business Roles'},
+        ),
+        migrations.AddField(
+            model_name='role',
+            name='permissions_mask',
+            field=models.BinaryField(default=b'', help_text='Bitmask of the role permissions (bit N = Permission with id N).', verbose_name='Compiled permissions'),
+        ),
+        migrations.AlterField(
+            model_name='member',
+            name='user',
+            field=models.ForeignKey(help_text='The user belonging to this workspace.', on_delete=django.db.models.deletion.CASCADE, related_name='tenant_memberships', to=settings.AUTH_USER_MODEL, verbose_name='User'),
+        ),
+        migrations.AlterField(
+            model_name='role',
+            name='description',
+            field=models.TextField(blank=True, help_text='Brief description of the responsibilities of this role.', verbose_name='Description'),
+        ),
+        migrations.AlterField(
+            model_name='role',
+            name='name',
+            field=models.CharField(help_text='Example: Administrator, Salesperson, Editor', max_length=100, verbose_name='Role Name'),
+        ),
+        migrations.AlterField(
+            model_name='role',
+            name='permissions',
+            field=models.ManyToManyField(blank=True, help_text='Select specific permissions that this role will have within the tenant.', to='auth.permission', verbose_name='Permissions'),
+        ),
+        migrations.RunPython(compile_role_masks, migrations.RunPython.noop),
+    ]
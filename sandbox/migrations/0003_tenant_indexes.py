@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sandbox', '0002_role_permissions_mask'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['organization', 'role'], name='sandbox_mem_organiz_6f8dfa_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['organization', 'id'], name='sandbox_mem_organiz_904a51_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sandbox', '0003_tenant_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='role',
+            name='ancestors',
+            field=models.ManyToManyField(editable=False, related_name='descendants', to='sandbox.role', verbose_name='All inherited roles'),
+        ),
+        migrations.AddField(
+            model_name='role',
+            name='parents',
+            field=models.ManyToManyField(blank=True, help_text='Roles whose permissions this role also has.', related_name='children', to='sandbox.role', verbose_name='Inherits from'),
+        ),
+    ]
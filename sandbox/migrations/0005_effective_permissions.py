@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:30
+
+from collections import defaultdict
+from itertools import islice
+
+import django.db.models.deletion
+import django_multitenant.mixins
+import django_multitenant.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_effective_permissions(apps, schema_editor):
+    # Frozen copy of tenant_rbac.effective.sync_effective_permissions() as of this
+    # migration: once TENANT_RBAC_EFFECTIVE_PERMISSION_MODEL is set, permissions are
+    # read from this table only, so existing members must not start with no rows
+    Permission = apps.get_model('auth', 'Permission')
+    Role = apps.get_model('sandbox', 'Role')
+    Member = apps.get_model('sandbox', 'Member')
+    EffectivePermission = apps.get_model('sandbox', 'EffectivePermission')
+
+    keys = {
+        pk: f"{app_label}.{codename}"
+        for pk, app_label, codename in Permission.objects.values_list('pk', 'content_type__app_label', 'codename')
+    }
+    own = defaultdict(set)
+    for role_id, permission_id in Role.permissions.through.objects.values_list('role_id', 'permission_id').iterator():
+        own[role_id].add(keys[permission_id])
+    grants = defaultdict(set, {role_id: set(permission_keys) for role_id, permission_keys in own.items()})
+    for role_id, ancestor_id in Role.ancestors.through.objects.values_list('from_role_id', 'to_role_id').iterator():
+        grants[role_id] |= own.get(ancestor_id, set())
+
+    # Raw INSERTs: historical TenantModel instances cannot be built (django-multitenant)
+    # and (organization, user) is unique on Member, so the rows are unique too
+    rows = (
+        (organization_id, user_id, key)
+        for organization_id, user_id, role_id in Member._base_manager.filter(role__isnull=False).order_by().values_list(
+            'organization_id', 'user_id', 'role_id'
+        ).iterator()
+        for key in grants.get(role_id, ())
+    )
+    quote = schema_editor.connection.ops.quote_name
+    sql = (
+        f"INSERT INTO {quote(EffectivePermission._meta.db_table)} "
+        f"({quote('organization_id')}, {quote('user_id')}, {quote('permission_key')}) VALUES (%s, %s, %s)"
+    )
+    with schema_editor.connection.cursor() as cursor:
+        while batch := list(islice(rows, 1000)):
+            cursor.executemany(sql, batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sandbox', '0004_role_hierarchy'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EffectivePermission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('permission_key', models.CharField(help_text='"app_label.codename" of the permission.', max_length=255, verbose_name='Permission')),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='sandbox.organization')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='User')),
+            ],
+            options={
+                'verbose_name': 'Effective Permission',
+                'verbose_name_plural': 'Effective Permissions',
+                'abstract': False,
+                'indexes': [models.Index(fields=['organization', 'permission_key'], name='sandbox_eff_organiz_perm_idx')],
+                'unique_together': {('organization', 'user', 'permission_key')},
+            },
+            bases=(django_multitenant.mixins.TenantModelMixin, models.Model),
+            managers=[
+                ('objects', django_multitenant.models.TenantManager()),
+            ],
+        ),
+        migrations.RunPython(backfill_effective_permissions, migrations.RunPython.noop),
+    ]
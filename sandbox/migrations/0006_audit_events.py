@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:44
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+import django_multitenant.mixins
+import django_multitenant.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sandbox', '0005_effective_permissions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Timestamp')),
+                ('actor_id', models.CharField(blank=True, max_length=64, null=True, verbose_name='Actor')),
+                ('action', models.CharField(max_length=50, verbose_name='Action')),
+                ('target_type', models.CharField(blank=True, max_length=100, verbose_name='Target type')),
+                ('target_id', models.CharField(blank=True, max_length=64, verbose_name='Target')),
+                ('data', models.JSONField(blank=True, default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Details')),
+                ('organization', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='sandbox.organization')),
+            ],
+            options={
+                'verbose_name': 'Audit Event',
+                'verbose_name_plural': 'Audit Events',
+                'ordering': ['-timestamp'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['organization', 'timestamp'], name='sandbox_aud_organiz_ts_idx')],
+            },
+            bases=(django_multitenant.mixins.TenantModelMixin, models.Model),
+            managers=[
+                ('objects', django_multitenant.models.TenantManager()),
+            ],
+        ),
+    ]
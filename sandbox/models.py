@@ -1,6 +1,10 @@
 from django.db import models
 from django_multitenant.models import TenantModel
-from tenant_rbac.models import AbstractTenantRole, AbstractTenantMember
+from tenant_rbac.models import (
+    AbstractAuditEvent, AbstractTenantRole, AbstractTenantMember, AbstractTenantUserPermission, PermissionMaskMixin,
+    RoleHierarchyMixin,
+)
+from tenant_rbac.provisioning import provision_default_roles
 
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -13,7 +17,7 @@ class Organization(TenantModel):
     def __str__(self):
         return self.name
 
-class Role(AbstractTenantRole, TenantModel):
+class Role(RoleHierarchyMixin, PermissionMaskMixin, AbstractTenantRole, TenantModel):
     organization = models.ForeignKey(
         Organization, 
         on_delete=models.CASCADE, 
@@ -49,23 +53,57 @@ class Member(AbstractTenantMember, TenantModel):
 
     class Meta:
         unique_together = ('organization', 'user')
+        # Suggested by 'python manage.py tenant_indexes'
+        indexes = [
+            models.Index(fields=['organization', 'role'], name='sandbox_mem_organiz_6f8dfa_idx'),
+            models.Index(fields=['organization', 'id'], name='sandbox_mem_organiz_904a51_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user} in {self.organization}"
 
+class EffectivePermission(AbstractTenantUserPermission, TenantModel):
+    organization = models.ForeignKey(
+        Organization,
+        on_delete=models.CASCADE,
+        related_name="+"
+    )
+
+    tenant_id = 'organization_id'
+
+    class Meta(AbstractTenantUserPermission.Meta):
+        # Permission checks: (organization, user, permission_key)
+        unique_together = ('organization', 'user', 'permission_key')
+        # "Who can do X in this organization"
+        indexes = [
+            models.Index(fields=['organization', 'permission_key'], name='sandbox_eff_organiz_perm_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user}: {self.permission_key} in {self.organization}"
+
+class AuditEvent(AbstractAuditEvent, TenantModel):
+    # No database constraint: the history of a deleted organization is kept
+    organization = models.ForeignKey(
+        Organization,
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="+"
+    )
+
+    tenant_id = 'organization_id'
+
+    class Meta(AbstractAuditEvent.Meta):
+        # get_audit_events(): one organization, newest first
+        indexes = [
+            models.Index(fields=['organization', 'timestamp'], name='sandbox_aud_organiz_ts_idx'),
+        ]
+
 @receiver(post_save, sender=Organization)
 def create_default_roles(sender, instance, created, **kwargs):
+    # Roles come from settings.TENANT_RBAC_DEFAULT_ROLES.
+    # Bulk-created organizations: use tenant_rbac.provisioning.provision_tenants()
     if created:
-        Role.objects.get_or_create(
-            organization=instance, 
-            name="Administrator",
-            defaults={
-                'description': 'Full access.',
-                'is_protected': True
-            }
-        )
-        Role.objects.get_or_create(
-            organization=instance, 
-            name="Member",
-            defaults={'is_protected': False}
-        )
\ No newline at end of file
+        provision_default_roles([instance.pk], role_model=Role)
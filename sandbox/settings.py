@@ -53,7 +53,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'sandbox.middleware.SimpleTenantMiddleware',
+    'tenant_rbac.middleware.TenantMiddleware',
+    'tenant_rbac.instrumentation.TenantMetricsMiddleware',
 ]
 
 ROOT_URLCONF = 'sandbox.urls'
@@ -130,4 +131,43 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 LOGOUT_REDIRECT_URL = '/login/'
-LOGIN_URL = '/login/'
\ No newline at end of file
+LOGIN_URL = '/login/'
+
+# Share tenant permission sets across requests (see tenant_rbac/cache.py)
+TENANT_RBAC_CACHE = 'default'
+
+# Tenant resolution (see tenant_rbac/middleware.py)
+TENANT_RBAC_TENANT_MODEL = 'sandbox.Organization'
+TENANT_RBAC_TENANT_RESOLVERS = ['tenant_rbac.resolvers.URLKwargTenantResolver']
+
+# Keep django-multitenant's current tenant in a context-local (ASGI safe)
+TENANT_USE_ASGIREF = True
+
+# Log tenant views that look like N+1s (DEBUG only)
+TENANT_RBAC_QUERY_BUDGET_PER_OBJECT = 1
+
+# Bulk member operations (see tenant_rbac/members.py)
+TENANT_RBAC_MEMBER_MODEL = 'sandbox.Member'
+
+# Per-tenant request metrics ('python manage.py tenant_metrics'); removed from the stack when False
+TENANT_RBAC_METRICS = False
+
+# Roles created for every new organization (see tenant_rbac/provisioning.py)
+TENANT_RBAC_DEFAULT_ROLES = [
+    {'name': 'Administrator', 'description': 'Full access.', 'is_protected': True},
+    {'name': 'Member'},
+]
+
+# Materialized (organization, user, permission) rows (see tenant_rbac/effective.py);
+# fill existing data with 'python manage.py rebuild_effective_permissions'
+TENANT_RBAC_EFFECTIVE_PERMISSION_MODEL = 'sandbox.EffectivePermission'
+
+# Role, membership and denied access events, written in batches by a
+# background thread (see tenant_rbac/audit.py)
+TENANT_RBAC_AUDIT_MODEL = 'sandbox.AuditEvent'
+
+# warm_up() in wsgi.py/asgi.py caches the permission sets of the most recently
+# active members of these organizations (see tenant_rbac/warmup.py); the
+# local-memory cache keeps 300 entries
+TENANT_RBAC_WARM_UP_TENANTS = []
+TENANT_RBAC_WARM_UP_MAX_USERS = 100
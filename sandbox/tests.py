@@ -0,0 +1,256 @@
+from django.contrib.auth.models import Permission, User
+from django.core.signals import request_started
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from unittest import mock
+
+from tenant_rbac import audit
+from tenant_rbac.bitmask import permission_bits
+from tenant_rbac.checks import check_permission_mask_bits
+from tenant_rbac.instrumentation import TenantMetricsMiddleware
+from tenant_rbac.pagination import encode_cursor
+from tenant_rbac.provisioning import fan_out_role_templates
+from tenant_rbac.views import QueryCounter
+from tenant_rbac.permissions import load_tenant_permissions
+
+from .admin import RoleAdminForm
+from .forms import RoleForm
+from .models import EffectivePermission, Member, Organization, Role
+
+
+class RoleHierarchyDeleteTests(TestCase):
+    """Deleting a parent role revokes what its descendants inherited from it."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Hierarchy org')
+        self.parent = Role.objects.create(organization=self.org, name='Parent')
+        self.child = Role.objects.create(organization=self.org, name='Child')
+        self.parent.permissions.add(Permission.objects.get(codename='view_member', content_type__app_label='sandbox'))
+        self.child.parents.add(self.parent)
+        self.user = User.objects.create_user('hierarchy_user')
+        Member.objects.create(organization=self.org, user=self.user, role=self.child)
+
+    def child_mask(self):
+        return Role.objects.get(pk=self.child.pk).permissions_mask
+
+    def test_inherited_permission_is_granted(self):
+        self.assertTrue(permission_bits.has_permission(self.child_mask(), 'sandbox.view_member'))
+        self.assertIn('sandbox.view_member', load_tenant_permissions(self.user, self.org))
+
+    def test_deleting_parent_revokes_inherited_permission(self):
+        self.parent.delete()
+
+        self.assertFalse(self.child.ancestors.exists())
+        self.assertFalse(permission_bits.has_permission(self.child_mask(), 'sandbox.view_member'))
+        self.assertFalse(EffectivePermission.objects.filter(
+            organization=self.org, user=self.user, permission_key='sandbox.view_member'
+        ).exists())
+        self.assertNotIn('sandbox.view_member', load_tenant_permissions(self.user, self.org))
+
+
+class RoleAdminParentTests(TestCase):
+    """Invalid parents are form errors in the admin, not a ValidationError from save()."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Admin org')
+        self.other_org = Organization.objects.create(name='Other org')
+        self.role = Role.objects.create(organization=self.org, name='Role')
+        self.child = Role.objects.create(organization=self.org, name='Child')
+        self.child.parents.add(self.role)
+        self.foreign = Role.objects.create(organization=self.other_org, name='Foreign')
+        self.client.force_login(User.objects.create_superuser('admin_user'))
+
+    def post_parents(self, *parents):
+        return self.client.post(f'/admin/sandbox/role/{self.role.pk}/change/', {
+            'name': self.role.name,
+            'description': '',
+            'organization': self.org.pk,
+            'parents': [parent.pk for parent in parents],
+        })
+
+    def test_parent_choices_are_limited_to_the_workspace(self):
+        response = self.client.get(f'/admin/sandbox/role/{self.role.pk}/change/')
+        queryset = response.context['adminform'].form.fields['parents'].queryset
+        self.assertQuerySetEqual(
+            queryset, Role.objects.filter(organization=self.org).exclude(pk__in=[self.role.pk, self.child.pk]),
+            ordered=False,
+        )
+
+    def test_parent_from_another_workspace_is_a_form_error(self):
+        response = self.post_parents(self.foreign)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('parents', response.context['adminform'].form.errors)
+        self.assertFalse(self.role.parents.exists())
+
+    def test_descendant_parent_is_a_form_error(self):
+        response = self.post_parents(self.child)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('parents', response.context['adminform'].form.errors)
+        self.assertFalse(self.role.parents.exists())
+
+    def count_queries(self, url):
+        self.client.get(url)  # Session and catalog loaded
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        return len(queries)
+
+    def test_parent_choices_do_not_query_per_role(self):
+        urls = [f'/admin/sandbox/role/{self.role.pk}/change/', '/admin/sandbox/role/add/', f'/{self.org.pk}/roles/crear/']
+        before = [self.count_queries(url) for url in urls]
+        for i in range(10):
+            Role.objects.create(organization=self.org, name=f'Extra {i}')
+        self.assertEqual([self.count_queries(url) for url in urls], before)
+
+    def test_add_form_does_not_list_other_workspaces(self):
+        response = self.client.get('/admin/sandbox/role/add/')
+        self.assertNotContains(response, 'Foreign')
+
+    def test_new_role_with_parent_from_another_workspace(self):
+        form = RoleAdminForm(data={'name': 'New', 'organization': self.org.pk, 'parents': [self.foreign.pk]})
+        self.assertFalse(form.is_valid())
+        self.assertIn('parents', form.errors)
+
+
+class KeysetCursorTests(TestCase):
+    """A cursor whose values do not fit the ordering fields is a 404, not a 500."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Cursor org')
+        user = User.objects.create_superuser('cursor_user')
+        Member.objects.create(organization=self.org, user=user)
+        self.client.force_login(user)
+
+    def get_members(self, cursor):
+        return self.client.get(f'/{self.org.pk}/members/', {'cursor': cursor})
+
+    def test_valid_cursor(self):
+        self.assertEqual(self.get_members(encode_cursor([1, 1], 'n')).status_code, 200)
+
+    def test_wrongly_typed_cursor_values(self):
+        for values in ([1, 'abc'], [1, None], [1, [1]], [{'a': 1}, 1]):
+            with self.subTest(values=values):
+                self.assertEqual(self.get_members(encode_cursor(values, 'n')).status_code, 404)
+
+    def test_malformed_cursor(self):
+        self.assertEqual(self.get_members('not-a-cursor').status_code, 404)
+
+
+class PermissionMaskBitTests(TestCase):
+    """Permission ids above TENANT_RBAC_MAX_PERMISSION_BIT fail the check, not the save."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Mask org')
+        self.role = Role.objects.create(organization=self.org, name='Masked')
+        self.permission = Permission.objects.get(codename='view_member', content_type__app_label='sandbox')
+
+    def test_permission_above_max_bit_is_left_out_of_the_mask(self):
+        with override_settings(TENANT_RBAC_MAX_PERMISSION_BIT=self.permission.pk - 1):
+            with self.assertLogs('tenant_rbac', 'ERROR'):
+                self.role.permissions.add(self.permission)
+            errors = check_permission_mask_bits(databases=['default'])
+        self.assertEqual([error.id for error in errors], ['tenant_rbac.E002'])
+        mask = Role.objects.get(pk=self.role.pk).permissions_mask
+        self.assertFalse(permission_bits.has_permission(mask, 'sandbox.view_member'))
+
+    def test_no_error_below_max_bit(self):
+        self.assertEqual(check_permission_mask_bits(databases=['default']), [])
+
+
+class QueryBudgetTests(TestCase):
+    """The budget keeps counting once connection.queries_log is full."""
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Budget org')
+        self.client.force_login(User.objects.create_superuser('budget_user'))
+
+    def fill_queries_log(self, **kwargs):
+        # As after 9000 queries in one request (request_started has just reset the log)
+        connection.queries_log.extend({'sql': '', 'time': '0'} for _ in range(connection.queries_limit))
+
+    @override_settings(DEBUG=True, TENANT_RBAC_QUERY_BUDGET_PER_OBJECT=0, TENANT_RBAC_QUERY_BUDGET_BASE=0)
+    def test_warning_with_a_full_queries_log(self):
+        request_started.connect(self.fill_queries_log)
+        try:
+            with self.assertLogs('tenant_rbac.queries', 'WARNING'):
+                self.assertEqual(self.client.get(f'/{self.org.pk}/roles/').status_code, 200)
+        finally:
+            request_started.disconnect(self.fill_queries_log)
+            connection.queries_log.clear()
+        self.assertFalse(any(isinstance(wrapper, QueryCounter) for wrapper in connection.execute_wrappers))
+
+
+class PermissionChoiceIteratorTests(TestCase):
+
+    def test_form_without_request_renders_and_validates(self):
+        permission = Permission.objects.get(codename='view_member', content_type__app_label='sandbox')
+        form = RoleForm(data={'name': 'No request', 'permissions': [permission.pk]})
+        self.assertIn(f'value="{permission.pk}"', str(form['permissions']))
+        self.assertTrue(form.is_valid(), form.errors)
+
+    def test_len_counts_options_not_groups(self):
+        field = RoleForm().fields['permissions']
+        field.queryset = Permission.objects.all()
+        self.assertEqual(len(field.choices), Permission.objects.count())
+
+
+class RoleChangeListTests(TestCase):
+
+    def setUp(self):
+        self.org = Organization.objects.create(name='Changelist org')
+        self.client.force_login(User.objects.create_superuser('changelist_user'))
+
+    def test_counts_are_annotated_and_sortable(self):
+        for order in ('', '-3', '4'):
+            with self.subTest(order=order):
+                response = self.client.get('/admin/sandbox/role/', {'o': order} if order else {})
+                self.assertEqual(response.status_code, 200)
+                role = response.context['cl'].result_list[0]
+                self.assertEqual(role.member_count, role.members.count())
+
+
+@override_settings(TENANT_RBAC_DEFAULT_ROLES=[
+    {'name': 'Administrator', 'permissions': ['sandbox.view_role']},
+    {'name': 'Member'},
+])
+class ProvisioningAuditTests(TestCase):
+    """Bulk-provisioned roles and grants are audited, one event per tenant."""
+
+    def record_events(self, function):
+        with mock.patch.object(audit.audit_log, 'enqueue') as enqueue:
+            with self.captureOnCommitCallbacks(execute=True):
+                function()
+        return [(event.tenant_id, event.action, event.data) for (event,), _ in enqueue.call_args_list]
+
+    def test_organization_creation_records_its_default_roles(self):
+        events = self.record_events(lambda: Organization.objects.create(name='Audited org'))
+        org = Organization.objects.get(name='Audited org')
+        self.assertEqual(events, [
+            (org.pk, audit.ROLE_CREATE, {'roles': ['Administrator', 'Member']}),
+            (org.pk, audit.ROLE_GRANT, {'permissions': {'Administrator': ['sandbox.view_role']}}),
+        ])
+
+    def test_fan_out_records_created_roles_and_grants(self):
+        org = Organization.objects.create(name='Fan-out org')
+        Role.objects.filter(organization=org, name='Member').delete()
+        templates = [{'name': 'Member', 'permissions': ['sandbox.view_member']}]
+        with self.settings(TENANT_RBAC_DEFAULT_ROLES=templates):
+            events = self.record_events(fan_out_role_templates)
+        self.assertIn((org.pk, audit.ROLE_CREATE, {'roles': ['Member']}), events)
+        self.assertIn((org.pk, audit.ROLE_GRANT, {'permissions': {'Member': ['sandbox.view_member']}}), events)
+
+
+class BrokenExporter:
+    def export(self, snapshot):
+        raise RuntimeError('exporter down')
+
+
+@override_settings(TENANT_RBAC_METRICS=True, TENANT_RBAC_METRICS_EXPORTERS=['sandbox.tests.BrokenExporter'])
+class MetricsExportTests(TestCase):
+
+    def test_exporter_errors_are_logged(self):
+        middleware = TenantMetricsMiddleware(lambda request: None)
+        middleware.next_export = 0
+        with self.assertLogs('tenant_rbac.metrics', 'ERROR') as logs:
+            middleware.maybe_export()
+        self.assertIn('BrokenExporter', logs.output[0])
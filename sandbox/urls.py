@@ -19,7 +19,8 @@ from django.urls import path
 from django.contrib.auth.views import LoginView, LogoutView
 from .views import (
     DashboardView, RoleListView, RoleCreateView, RoleDeleteView, 
-    RoleDetailView, MemberListView, MemberUpdateView
+    RoleDetailView, MemberListView, MemberUpdateView,
+    MyPermissionsView, AsyncMyPermissionsView
 )
 
 urlpatterns = [
@@ -39,4 +40,8 @@ urlpatterns = [
     # Members
     path('<int:tenant_id>/members/', MemberListView.as_view(), name='member_list'),
     path('<int:tenant_id>/members/<int:pk>/editar/', MemberUpdateView.as_view(), name='member_update'),
+
+    # API (sync and async versions of the same endpoint)
+    path('<int:tenant_id>/api/permissions/', MyPermissionsView.as_view(), name='api_permissions'),
+    path('<int:tenant_id>/api/async/permissions/', AsyncMyPermissionsView.as_view(), name='api_permissions_async'),
 ]
\ No newline at end of file
@@ -1,8 +1,11 @@
+from django.http import Http404, JsonResponse
 from django.urls import reverse
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
 from tenant_rbac.mixins import TenantRBACMixin
-from tenant_rbac.views import TenantListView, TenantCreateView, TenantDeleteView, TenantDetailView, TenantUpdateView
+from tenant_rbac.pagination import InvalidCursor, KeysetPaginator
+from tenant_rbac.permissions import aget_tenant_permissions, get_tenant_permissions
+from tenant_rbac.views import AsyncTenantView, TenantListView, TenantCreateView, TenantDeleteView, TenantDetailView, TenantUpdateView
 from .models import Role, Member
 from .forms import RoleForm, MemberForm
 
@@ -23,11 +26,23 @@ class RoleDetailView(LoginRequiredMixin, TenantDetailView):
     template_name = "role_detail.html"
     context_object_name = "role"
     tenant_permission_required = 'sandbox.view_role'
+    list_prefetch_related = ['permissions', 'parents']
+    members_per_page = 50
+
+    def get_queryset(self):
+        # member_count / permission_count come with the role itself
+        return Role.with_summary(super().get_queryset())
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        # Add members of this role to context
-        context['members'] = self.object.members.all()
+        # Add a page of this role's members to context (cursor paginated, no COUNT)
+        members = self.object.members.filter(organization_id=self.request.tenant.pk).select_related('user')
+        paginator = KeysetPaginator(members, self.members_per_page, tenant_field='organization_id')
+        try:
+            context['members_page'] = paginator.page(self.request.GET.get('cursor'))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        context['members'] = context['members_page'].object_list
         return context
 
 class RoleDeleteView(TenantDeleteView):
@@ -43,6 +58,12 @@ class RoleListView(LoginRequiredMixin, TenantListView):
     template_name = "role_list.html"
     context_object_name = "roles"
     tenant_permission_required = 'sandbox.view_role'
+    paginate_by = 100
+    pagination_mode = 'keyset'
+    keyset_ordering = 'name'  # unique per organization
+
+    def get_queryset(self):
+        return Role.with_summary(super().get_queryset())
 
 class RoleCreateView(LoginRequiredMixin, TenantCreateView):
     model = Role
@@ -58,6 +79,11 @@ class MemberListView(LoginRequiredMixin, TenantListView):
     template_name = "member_list.html"
     context_object_name = "members"
     tenant_permission_required = 'auth.view_user' # Or a custom permission
+    paginate_by = 50
+    pagination_mode = 'keyset'
+    list_select_related = ['user', 'role']
+    # What each member can do here, evaluated for the whole page at once
+    row_permissions = ['auth.add_user', 'sandbox.add_role', 'sandbox.change_role', 'sandbox.delete_role']
 
 class MemberUpdateView(LoginRequiredMixin, TenantUpdateView):
     model = Member
@@ -67,4 +93,22 @@ class MemberUpdateView(LoginRequiredMixin, TenantUpdateView):
 
     def get_success_url(self):
         # Return to role detail if referred from there, or member list
-        return reverse('member_list', kwargs={'tenant_id': self.request.tenant.pk})
\ No newline at end of file
+        return reverse('member_list', kwargs={'tenant_id': self.request.tenant.pk})
+
+
+class MyPermissionsView(LoginRequiredMixin, TenantRBACMixin, View):
+    """JSON list of the current user's permissions in the tenant (sync)."""
+    tenant_permission_required = 'auth.view_user'
+
+    def get(self, request, *args, **kwargs):
+        permissions = get_tenant_permissions(request)
+        return JsonResponse({'tenant': request.tenant.pk, 'permissions': sorted(permissions)})
+
+
+class AsyncMyPermissionsView(AsyncTenantView):
+    """Same endpoint served natively under ASGI (no thread hops for the view)."""
+    tenant_permission_required = 'auth.view_user'
+
+    async def get(self, request, *args, **kwargs):
+        permissions = await aget_tenant_permissions(request)
+        return JsonResponse({'tenant': request.tenant.pk, 'permissions': sorted(permissions)})
\ No newline at end of file
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sandbox.settings')
 
 application = get_wsgi_application()
+
+# Load the permission registry (and cached permission sets) before the first request
+from tenant_rbac.warmup import warm_up  # noqa: E402
+
+warm_up()
@@ -0,0 +1,202 @@
+"""
+Admin bases that stay fast on tenants with many members.
+
+    from tenant_rbac.admin import AutocompleteFilter, TenantAdmin, TenantModelAdmin
+
+    @admin.register(Member)
+    class MemberAdmin(TenantModelAdmin):
+        list_display = ('user', 'role', 'organization')
+        list_filter = [('organization', AutocompleteFilter), ('role', AutocompleteFilter)]
+
+Relation fields use the admin autocomplete widget (the related admin needs
+search_fields) instead of a <select> with every row, the changelist joins
+the relations it displays and skips the unfiltered COUNT(*), and filters
+on relations never list every tenant or role.
+"""
+from django import forms
+from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.contrib.auth.models import Permission
+from django.db.models import Count
+from django.urls import NoReverseMatch, reverse
+from django.utils.html import format_html, format_html_join
+from django.utils.translation import gettext_lazy as _
+
+from .forms import PermissionChoiceField
+from .members import get_member_model, get_role_field
+
+
+class AutocompleteFilter(admin.RelatedFieldListFilter):
+    """
+    Filter on a ForeignKey rendered as an autocomplete box. Only the selected
+    object is loaded, so the sidebar does not list every tenant or role.
+    The related model admin needs search_fields.
+
+        list_filter = [('organization', AutocompleteFilter)]
+    """
+    template = 'tenant_rbac/admin/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        super().__init__(field, request, params, model, model_admin, field_path)
+        formfield = field.formfield(widget=AutocompleteSelect(field, model_admin.admin_site), required=False)
+        selected = self.selected_values()
+        self.widget_html = formfield.widget.render(f"{self.lookup_kwarg}_autocomplete", selected[-1] if selected else None)
+        self.query_string = ''
+
+    def selected_values(self):
+        # A list since Django 5.0, a string before
+        value = self.lookup_val
+        if value is None:
+            return []
+        return list(value) if isinstance(value, (list, tuple)) else [value]
+
+    def field_choices(self, field, request, model_admin):
+        values = self.selected_values()
+        if not values:
+            return []
+        return field.get_choices(
+            include_blank=False, limit_choices_to={f"{field.target_field.name}__in": values}
+        )
+
+    def has_output(self):
+        # The autocomplete box is shown even with nothing selected
+        return True
+
+    def choices(self, changelist):
+        # Read by the template after the choices are listed
+        self.query_string = changelist.get_query_string(remove=[self.lookup_kwarg, self.lookup_kwarg_isnull])
+        yield from super().choices(changelist)
+
+
+class TenantModelAdmin(admin.ModelAdmin):
+    """
+    Base ModelAdmin for tenant models:
+
+    *   ForeignKey / ManyToMany fields whose admin has search_fields use
+        autocomplete widgets (autocomplete_fields, when set, wins).
+    *   The relations in list_display are joined (list_select_related).
+    *   The tenant is joined too, here and on those relations, so __str__
+        methods that show it do not run one query per row (e.g. in
+        autocomplete results).
+    *   No unfiltered COUNT(*) on the changelist.
+    *   A 'permissions' M2M to Permission uses the cached permission catalog.
+    """
+    show_full_result_count = False
+
+    @staticmethod
+    def get_tenant_relation(model):
+        if not hasattr(model, 'tenant_id'):
+            return None
+        field = model._meta.get_field(model.tenant_id)
+        return field.name if field.is_relation else None
+
+    def get_queryset(self, request):
+        # Joined here, not only on the changelist: autocomplete results render __str__ too.
+        # (The changelist does not add its own select_related to a queryset that has one.)
+        queryset = super().get_queryset(request)
+        related = self.get_list_select_related(request)
+        if related is True:
+            return queryset.select_related()
+        return queryset.select_related(*related) if related else queryset
+
+    def get_autocomplete_fields(self, request):
+        if self.autocomplete_fields:
+            return self.autocomplete_fields
+        fields = []
+        for field in self.model._meta.get_fields():
+            if not (field.concrete and field.is_relation and (field.many_to_one or field.many_to_many)):
+                continue
+            if field.related_model is Permission:
+                # Rendered from the permission catalog instead (see formfield_for_manytomany)
+                continue
+            related_admin = self.admin_site._registry.get(field.related_model)
+            if field.editable and related_admin is not None and related_admin.search_fields:
+                fields.append(field.name)
+        return fields
+
+    def get_list_select_related(self, request):
+        if self.list_select_related is not False:
+            return self.list_select_related
+        names = {name for name in self.list_display if isinstance(name, str)}
+        tenant_relation = self.get_tenant_relation(self.model)
+        related = [tenant_relation] if tenant_relation else []
+        for field in self.model._meta.concrete_fields:
+            if field.name == tenant_relation:
+                continue
+            if field.many_to_one and field.name in names:
+                related_tenant = self.get_tenant_relation(field.related_model)
+                related.append(f"{field.name}__{related_tenant}" if related_tenant else field.name)
+        return related
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.related_model is Permission and db_field.name not in self.get_autocomplete_fields(request):
+            # Grouped checkboxes from the cached catalog instead of filter_horizontal over every permission
+            kwargs.setdefault('form_class', PermissionChoiceField)
+            kwargs.setdefault('widget', PermissionChoiceField.widget)
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+    @property
+    def media(self):
+        media = super().media
+        for list_filter in self.list_filter:
+            if isinstance(list_filter, (list, tuple)) and issubclass(list_filter[1], AutocompleteFilter):
+                field = self.model._meta.get_field(list_filter[0])
+                media += AutocompleteSelect(field, self.admin_site).media
+                media += forms.Media(js=['tenant_rbac/admin/autocomplete_filter.js'])
+                break
+        return media
+
+
+class TenantAdmin(admin.ModelAdmin):
+    """
+    Base ModelAdmin for the tenant model. Replaces a member inline (which
+    loads every member and a <select> with every user) with a read-only
+    summary: member count per role, linked to the paginated member changelist.
+
+        readonly_fields = ('member_summary',)
+
+    Uses TENANT_RBAC_MEMBER_MODEL.
+    """
+    member_summary_roles = 20
+    ordering = ('pk',)
+
+    @admin.display(description=_("Members"))
+    def member_summary(self, obj):
+        if obj is None or obj.pk is None:
+            return '-'
+        member_model = get_member_model()
+        role_field = get_role_field(member_model)
+        tenant_field = member_model._meta.get_field(getattr(member_model, 'tenant_id', 'tenant_id'))
+
+        # One grouped query on the (tenant, role) index
+        rows = list(
+            member_model._base_manager.filter(**{tenant_field.attname: obj.pk})
+            .values(role_field.attname, f"{role_field.name}__name")
+            .annotate(count=Count('*')).order_by('-count')
+        )
+        total = sum(row['count'] for row in rows)
+
+        tenant_filter = f"{tenant_field.name}__{tenant_field.target_field.name}__exact={obj.pk}"
+        role_filter = f"{role_field.name}__{role_field.target_field.name}__exact"
+        try:
+            changelist = reverse(
+                f"{self.admin_site.name}:{member_model._meta.app_label}_{member_model._meta.model_name}_changelist"
+            )
+        except NoReverseMatch:
+            changelist = None
+
+        def link(label, query):
+            if changelist is None:
+                return label
+            return format_html('<a href="{}?{}">{}</a>', changelist, query, label)
+
+        roles = format_html_join('', '<li>{}: {}</li>', (
+            (
+                link(row[f"{role_field.name}__name"], f"{tenant_filter}&{role_filter}={row[role_field.attname]}")
+                if row[role_field.attname] is not None
+                else link(_("No role"), f"{tenant_filter}&{role_field.name}__isnull=True"),
+                row['count'],
+            )
+            for row in rows[:self.member_summary_roles]
+        ))
+        return format_html('{}<ul>{}</ul>', link(_("%(count)s member(s)") % {'count': total}, tenant_filter), roles)
@@ -3,4 +3,23 @@ from django.apps import AppConfig
 class TenantRbacConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tenant_rbac'
-    verbose_name = "Tenant RBAC"
\ No newline at end of file
+    verbose_name = "Tenant RBAC"
+
+    def ready(self):
+        from django.contrib.auth.models import Permission
+        from django.core import checks
+        from django.db.models.signals import post_delete, post_migrate, post_save
+        from .catalog import permission_catalog
+        from .checks import check_permission_mask_bits, check_role_templates, check_view_permissions
+        from .signals import connect_signals
+
+        connect_signals()
+        checks.register(check_view_permissions, checks.Tags.urls)
+        checks.register(check_role_templates)
+        checks.register(check_permission_mask_bits, checks.Tags.database)
+        # The permission registry ("app_label.codename" <-> id, also the mask bits)
+        # is filled lazily on first use or by tenant_rbac.warmup, and dropped after
+        # migrations, which may create new permissions.
+        post_migrate.connect(permission_catalog.reset, dispatch_uid='tenant_rbac_reset_permission_catalog')
+        post_save.connect(permission_catalog.reset, sender=Permission, dispatch_uid='tenant_rbac_reset_permission_catalog')
+        post_delete.connect(permission_catalog.reset, sender=Permission, dispatch_uid='tenant_rbac_reset_permission_catalog')
@@ -0,0 +1,269 @@
+"""
+Asynchronous, batched RBAC audit log (optional).
+
+    class AuditEvent(AbstractAuditEvent, TenantModel):
+        organization = models.ForeignKey(
+            Organization, null=True, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+'
+        )
+        tenant_id = 'organization_id'
+
+        class Meta(AbstractAuditEvent.Meta):
+            indexes = [models.Index(fields=['organization', 'timestamp'])]
+
+    TENANT_RBAC_AUDIT_MODEL = 'sandbox.AuditEvent'
+
+Role grants and revokes, role and membership changes and denied accesses
+are recorded with audit_log.record(), which only puts a tuple on a bounded
+in-process queue. One writer thread per process inserts them with
+bulk_create every TENANT_RBAC_AUDIT_BATCH_SIZE events (default 500) or
+TENANT_RBAC_AUDIT_FLUSH_INTERVAL seconds (default 1), and drains the queue
+at shutdown. The request never waits for the audit INSERT.
+
+When the queue (TENANT_RBAC_AUDIT_QUEUE_SIZE, default 10000) is full,
+TENANT_RBAC_AUDIT_POLICY decides:
+
+    'drop'    the event is dropped and counted (default)
+    'block'   the caller waits up to TENANT_RBAC_AUDIT_BLOCK_TIMEOUT seconds, then drops
+    'sample'  past half the queue, only TENANT_RBAC_AUDIT_SAMPLE_RATE of the events are kept
+
+Without TENANT_RBAC_AUDIT_MODEL nothing is recorded and record() returns at once.
+"""
+import atexit
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from collections import namedtuple
+from functools import partial
+
+from django.apps import apps
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.utils import timezone
+
+from . import context
+
+logger = logging.getLogger('tenant_rbac.audit')
+
+ROLE_CREATE = 'role.create'
+ROLE_DELETE = 'role.delete'
+ROLE_GRANT = 'role.grant'
+ROLE_REVOKE = 'role.revoke'
+ROLE_PARENTS = 'role.parents'
+MEMBER_ADD = 'member.add'
+MEMBER_CHANGE = 'member.change'
+MEMBER_REMOVE = 'member.remove'
+MEMBER_ASSIGN = 'member.assign'
+ACCESS_DENIED = 'access.denied'
+
+AuditRecord = namedtuple(
+    'AuditRecord', ['timestamp', 'tenant_id', 'actor_id', 'action', 'target_type', 'target_id', 'data']
+)
+
+_STOP = object()
+
+
+def get_audit_model():
+    """The configured audit event model, or None if the audit log is off."""
+    model_path = getattr(settings, 'TENANT_RBAC_AUDIT_MODEL', None)
+    return apps.get_model(model_path) if model_path else None
+
+
+def _actor_id(actor):
+    if actor is None:
+        # Set by TenantMiddleware for the current request
+        actor = getattr(context.get_current_request(), 'user', None)
+    if actor is None or not getattr(actor, 'is_authenticated', False):
+        return None
+    return actor.pk
+
+
+class AuditLog:
+    """
+    Bounded queue and writer thread of one process. The thread is started
+    on the first event (again in a forked child) and flushed at exit.
+    """
+    def __init__(self):
+        self.stats = {'queued': 0, 'written': 0, 'dropped': 0, 'sampled_out': 0, 'failed': 0}
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._atexit = False
+
+    def record(self, action, tenant=None, actor=None, target=None, on_commit=True, **data):
+        """
+        Queues an event. 'tenant' and 'target' are instances or pks, 'actor'
+        defaults to the user of the current request and 'data' must be JSON
+        serializable. With on_commit=True (changes) the event is queued only
+        if the current transaction commits; denials use on_commit=False.
+        Returns False if the audit log is off.
+        """
+        if get_audit_model() is None:
+            return False
+        event = AuditRecord(
+            timezone.now(),
+            getattr(tenant, 'pk', tenant),
+            _actor_id(actor),
+            action,
+            target._meta.label_lower if hasattr(target, '_meta') else '',
+            str(getattr(target, 'pk', target)) if target is not None else '',
+            data,
+        )
+        if on_commit:
+            transaction.on_commit(partial(self.enqueue, event))
+        else:
+            self.enqueue(event)
+        return True
+
+    def enqueue(self, event):
+        """Applies the backpressure policy; returns True if the event was queued."""
+        events = self._start()
+        policy = getattr(settings, 'TENANT_RBAC_AUDIT_POLICY', 'drop')
+        if policy == 'sample' and events.qsize() >= events.maxsize // 2:
+            if random.random() >= getattr(settings, 'TENANT_RBAC_AUDIT_SAMPLE_RATE', 0.1):
+                self._count('sampled_out')
+                return False
+        try:
+            if policy == 'block':
+                events.put(event, timeout=getattr(settings, 'TENANT_RBAC_AUDIT_BLOCK_TIMEOUT', 0.5))
+            else:
+                events.put_nowait(event)
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('queued')
+        return True
+
+    def flush(self, timeout=None):
+        """Waits until every event queued so far is written (e.g. in tests and commands)."""
+        if self._queue is None or self._pid != os.getpid():
+            return True
+        done = threading.Event()
+        self._queue.put(done, timeout=timeout)
+        return done.wait(timeout)
+
+    def shutdown(self, timeout=5):
+        """Writes the pending events and stops the writer thread."""
+        with self._lock:
+            thread, events = self._thread, self._queue
+            self._thread = self._queue = None
+        if thread is None or self._pid != os.getpid():
+            return
+        try:
+            events.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+    def _count(self, name, value=1):
+        with self._lock:
+            self.stats[name] += value
+
+    def _start(self):
+        with self._lock:
+            if self._queue is None or self._pid != os.getpid():
+                # First event, or a forked worker: the parent's thread does not exist here
+                self._pid = os.getpid()
+                self._queue = queue.Queue(getattr(settings, 'TENANT_RBAC_AUDIT_QUEUE_SIZE', 10000))
+                self._thread = threading.Thread(
+                    target=self._run, args=(self._queue,), name='tenant-rbac-audit', daemon=True
+                )
+                self._thread.start()
+                if not self._atexit:
+                    atexit.register(self.shutdown)
+                    self._atexit = True
+            return self._queue
+
+    def _run(self, events):
+        batch_size = getattr(settings, 'TENANT_RBAC_AUDIT_BATCH_SIZE', 500)
+        interval = getattr(settings, 'TENANT_RBAC_AUDIT_FLUSH_INTERVAL', 1.0)
+        batch, deadline = [], None
+        try:
+            while True:
+                try:
+                    item = events.get(timeout=max(deadline - time.monotonic(), 0) if batch else None)
+                except queue.Empty:
+                    item = None
+                if isinstance(item, AuditRecord):
+                    if not batch:
+                        deadline = time.monotonic() + interval
+                    batch.append(item)
+                    if len(batch) < batch_size:
+                        continue
+                # Full batch, interval elapsed, flush() or shutdown()
+                if batch:
+                    self._write(batch)
+                    batch = []
+                if isinstance(item, threading.Event):
+                    item.set()
+                elif item is _STOP:
+                    return
+        finally:
+            connections.close_all()
+
+    def _write(self, batch):
+        model = get_audit_model()
+        tenant_field = getattr(model, 'tenant_id', 'tenant_id')
+        close_old_connections()
+        objs = [
+            model(**{
+                tenant_field: event.tenant_id, 'timestamp': event.timestamp, 'actor_id': event.actor_id,
+                'action': event.action, 'target_type': event.target_type, 'target_id': event.target_id,
+                'data': event.data,
+            })
+            for event in batch
+        ]
+        try:
+            model._base_manager.bulk_create(objs)
+            self._count('written', len(objs))
+        except Exception:
+            # One bad event must not lose the batch
+            for obj in objs:
+                try:
+                    obj.save(force_insert=True)
+                    self._count('written')
+                except Exception:
+                    logger.exception('Could not write audit event %s', obj.action)
+                    self._count('failed')
+
+
+audit_log = AuditLog()
+
+
+def record_denied(request, reason, actor=None, target=None, **data):
+    """Records a PermissionDenied of a request (not tied to the transaction, which rolls back)."""
+    match = getattr(request, 'resolver_match', None)
+    return audit_log.record(
+        ACCESS_DENIED,
+        tenant=getattr(request, 'tenant', None),
+        actor=actor if actor is not None else getattr(request, 'user', None),
+        target=target,
+        on_commit=False,
+        reason=reason,
+        method=request.method,
+        path=request.path,
+        view=match.view_name if match else None,
+        **data,
+    )
+
+
+def get_audit_events(tenant, since=None, until=None, actions=None, actor=None):
+    """
+    Events of a tenant, newest first, as a queryset on the (tenant,
+    timestamp) index. 'actions' is an iterable of action names and 'actor'
+    a user or user id.
+    """
+    model = get_audit_model()
+    events = model._base_manager.filter(**{getattr(model, 'tenant_id', 'tenant_id'): getattr(tenant, 'pk', tenant)})
+    if since is not None:
+        events = events.filter(timestamp__gte=since)
+    if until is not None:
+        events = events.filter(timestamp__lt=until)
+    if actions is not None:
+        events = events.filter(action__in=list(actions))
+    if actor is not None:
+        events = events.filter(actor_id=str(getattr(actor, 'pk', actor)))
+    return events.order_by('-timestamp', '-pk')
@@ -0,0 +1,152 @@
+"""
+Compiled permission bitmasks for roles (optional).
+
+Each Permission owns a stable bit: its primary key. A role that inherits
+from PermissionMaskMixin stores the OR of its permission bits in
+'permissions_mask' (little-endian bytes), which is kept in sync with the
+'permissions' M2M. Resolving a membership then reads Member -> Role only,
+without touching role_permissions, Permission or ContentType.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+
+from .catalog import permission_catalog
+from .hierarchy import get_closure_map, get_descendant_ids, uses_role_hierarchy
+
+logger = logging.getLogger('tenant_rbac')
+
+
+def get_max_permission_bit():
+    # 65535 bits = 8 KB per role at most
+    return getattr(settings, 'TENANT_RBAC_MAX_PERMISSION_BIT', 65535)
+
+
+def mask_from_ids(permission_ids):
+    """
+    Compiles an iterable of Permission ids into a little-endian bytes mask.
+    Ids above TENANT_RBAC_MAX_PERMISSION_BIT are left out (their permission
+    is denied) and logged; the tenant_rbac.E002 check reports them at startup.
+    """
+    max_bit = get_max_permission_bit()
+    value = 0
+    for pk in permission_ids:
+        if pk > max_bit:
+            # Called from signals: denying is safer than failing the save
+            logger.error(
+                "Permission id %s exceeds TENANT_RBAC_MAX_PERMISSION_BIT (%s) and is left out of the mask.",
+                pk, max_bit,
+            )
+            continue
+        value |= 1 << pk
+    return value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+
+def ids_from_mask(mask):
+    """Yields the Permission ids whose bit is set in a mask."""
+    value = int.from_bytes(bytes(mask or b''), 'little')
+    while value:
+        lowest = value & -value
+        yield lowest.bit_length() - 1
+        value ^= lowest
+
+
+def mask_has_bit(mask, bit):
+    """Tests one bit without decoding the whole mask."""
+    if mask is None or bit is None:
+        return False
+    byte_index, offset = divmod(bit, 8)
+    return byte_index < len(mask) and bool(mask[byte_index] >> offset & 1)
+
+
+class PermissionBitRegistry:
+    """
+    Maps "app_label.codename" to its bit index and back. Bits are Permission
+    ids, so this is a view over permission_catalog: one registry, loaded
+    lazily and reset after every migrate.
+    """
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def reset(self, **kwargs):
+        self.catalog.reset()
+
+    def bit_for(self, permission_key):
+        return self.catalog.id_for(permission_key)
+
+    def keys_for_mask(self, mask):
+        # Bits of deleted permissions are ignored
+        return self.catalog.keys_for_ids(ids_from_mask(mask))
+
+    async def akeys_for_mask(self, mask):
+        """Async version of keys_for_mask(); only goes to a thread when a (re)load is needed."""
+        return await self.catalog.akeys_for_ids(ids_from_mask(mask))
+
+    def has_permission(self, mask, permission_key):
+        return mask_has_bit(mask, self.bit_for(permission_key))
+
+
+permission_bits = PermissionBitRegistry(permission_catalog)
+
+
+def uses_permission_mask(role_model):
+    return any(field.name == 'permissions_mask' for field in role_model._meta.concrete_fields)
+
+
+def compute_role_grants(role_model, role_ids=None):
+    """
+    Reads the role_permissions table and returns {role_id: {permission_id, ...}}
+    for the given roles (or all roles), including the permissions inherited
+    from ancestor roles (RoleHierarchyMixin). Works with historical models
+    in migrations.
+    """
+    through = role_model.permissions.through
+    role_column = role_model.permissions.field.m2m_field_name()
+    perm_column = role_model.permissions.field.m2m_reverse_field_name()
+
+    rows = through.objects.all()
+    roles = role_model._base_manager.all()
+    if role_ids is not None:
+        roles = roles.filter(pk__in=role_ids)
+    ancestors = get_closure_map(role_model, role_ids) if uses_role_hierarchy(role_model) else {}
+    if role_ids is not None:
+        # Grants of the roles and of everything they inherit from
+        rows = rows.filter(**{f"{role_column}__in": set(role_ids).union(*ancestors.values())})
+
+    own = defaultdict(set)
+    for role_id, permission_id in rows.values_list(f"{role_column}_id", f"{perm_column}_id").iterator():
+        own[role_id].add(permission_id)
+
+    return {
+        role_id: own.get(role_id, set()).union(*(own.get(ancestor, ()) for ancestor in ancestors.get(role_id, ())))
+        for role_id in roles.values_list('pk', flat=True)
+    }
+
+
+def compute_role_masks(role_model, role_ids=None):
+    """Returns {role_id: mask} for the given roles (or all roles), inherited permissions included."""
+    return {role_id: mask_from_ids(ids) for role_id, ids in compute_role_grants(role_model, role_ids).items()}
+
+
+def sync_role_masks(role_model, role_ids=None):
+    """Recompiles and stores the masks of the given roles (or all roles) and of the roles inheriting from them."""
+    if role_ids is not None and uses_role_hierarchy(role_model):
+        role_ids = set(role_ids) | get_descendant_ids(role_model, role_ids)
+    masks = compute_role_masks(role_model, role_ids)
+    by_mask = defaultdict(list)
+    for role_id, mask in masks.items():
+        by_mask[mask].append(role_id)
+
+    # No save(): no post_save and no extra cache invalidation. Roles sharing a
+    # mask (e.g. every tenant's Administrator) get one UPDATE ... WHERE pk IN;
+    # the rest one bulk_update() (CASE over the pks) per batch.
+    unique = []
+    for mask, ids in by_mask.items():
+        if len(ids) == 1:
+            unique.append(role_model(pk=ids[0], permissions_mask=mask))
+            continue
+        for start in range(0, len(ids), 500):
+            role_model._base_manager.filter(pk__in=ids[start:start + 500]).update(permissions_mask=mask)
+    role_model._base_manager.bulk_update(unique, ['permissions_mask'], batch_size=500)
+    return masks
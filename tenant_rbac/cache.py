@@ -0,0 +1,141 @@
+"""
+Optional cross-request cache for tenant permission sets.
+
+Enable it by pointing TENANT_RBAC_CACHE to a cache alias in your settings:
+
+    TENANT_RBAC_CACHE = 'default'
+    TENANT_RBAC_CACHE_TIMEOUT = 3600  # seconds (optional)
+
+Entries are keyed by a per-tenant version stamp. Any change to the roles,
+grants or memberships of a tenant replaces the stamp, so old entries are
+never read again and simply expire.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+KEY_PREFIX = 'tenant_rbac'
+
+
+def get_permission_cache():
+    """Returns the configured cache backend, or None if caching is disabled."""
+    alias = getattr(settings, 'TENANT_RBAC_CACHE', None)
+    if not alias:
+        return None
+    return caches[alias]
+
+
+def get_cache_timeout():
+    return getattr(settings, 'TENANT_RBAC_CACHE_TIMEOUT', 3600)
+
+
+def _version_key(tenant_pk):
+    return f"{KEY_PREFIX}:version:{tenant_pk}"
+
+
+def _permissions_key(tenant_pk, version, user_pk):
+    return f"{KEY_PREFIX}:perms:{tenant_pk}:{version}:{user_pk}"
+
+
+def get_tenant_version(cache, tenant_pk):
+    """
+    Returns the current version stamp of a tenant.
+    Stamps are random tokens (not counters), so an evicted stamp can never
+    be re-created with a value that matches old entries.
+    """
+    key = _version_key(tenant_pk)
+    version = cache.get(key)
+    if version is None:
+        # add() is atomic: if another process created the stamp first, we read theirs
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def get_cached_permissions(user, tenant, loader):
+    """
+    Returns the permission set of (tenant, user) from the cache, calling
+    loader(user, tenant) and storing the result on a miss.
+    """
+    cache = get_permission_cache()
+    if cache is None or not tenant or not user.is_authenticated or user.is_superuser:
+        return loader(user, tenant)
+
+    version = get_tenant_version(cache, tenant.pk)
+    key = _permissions_key(tenant.pk, version, user.pk)
+
+    permissions = cache.get(key)
+    if permissions is None:
+        permissions = loader(user, tenant)
+        cache.set(key, permissions, get_cache_timeout())
+    return permissions
+
+
+def prime_cached_permissions(tenant_pk, loader):
+    """
+    Stores the {user_pk: permission set} returned by loader() for a tenant
+    in one set_many() (see tenant_rbac.warmup). The version is read first,
+    as in get_cached_permissions(), so a change made meanwhile wins.
+    Returns the number of entries written.
+    """
+    cache = get_permission_cache()
+    if cache is None:
+        return 0
+    version = get_tenant_version(cache, tenant_pk)
+    permission_sets = loader()
+    cache.set_many(
+        {_permissions_key(tenant_pk, version, user_pk): permissions for user_pk, permissions in permission_sets.items()},
+        get_cache_timeout(),
+    )
+    return len(permission_sets)
+
+
+async def aget_tenant_version(cache, tenant_pk):
+    key = _version_key(tenant_pk)
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, uuid.uuid4().hex, None)
+        version = await cache.aget(key)
+    return version
+
+
+async def aget_cached_permissions(user, tenant, loader):
+    """Async version of get_cached_permissions(); 'loader' is a coroutine function."""
+    cache = get_permission_cache()
+    if cache is None or not tenant or not user.is_authenticated or user.is_superuser:
+        return await loader(user, tenant)
+
+    version = await aget_tenant_version(cache, tenant.pk)
+    key = _permissions_key(tenant.pk, version, user.pk)
+
+    permissions = await cache.aget(key)
+    if permissions is None:
+        permissions = await loader(user, tenant)
+        await cache.aset(key, permissions, get_cache_timeout())
+    return permissions
+
+
+def _bump_versions(tenant_pks):
+    cache = get_permission_cache()
+    if cache is None:
+        return
+    cache.set_many({_version_key(pk): uuid.uuid4().hex for pk in tenant_pks}, None)
+
+
+def invalidate_tenant_permissions(*tenant_pks):
+    """
+    Invalidates every cached permission set of the given tenants.
+
+    The stamp is replaced immediately and once more after the current
+    transaction commits, so no reader can cache data that was read
+    before the change became visible.
+    Call it manually after bulk operations that bypass model signals
+    (queryset.update(), bulk_create(), raw SQL...).
+    """
+    tenant_pks = {pk for pk in tenant_pks if pk is not None}
+    if not tenant_pks or get_permission_cache() is None:
+        return
+    _bump_versions(tenant_pks)
+    transaction.on_commit(lambda: _bump_versions(tenant_pks))
@@ -0,0 +1,116 @@
+"""
+Process-wide registry of Django permissions: "app_label.codename" <->
+Permission id, grouped by app and model.
+
+The catalog is created at TenantRbacConfig.ready() and loaded with a
+single query (permissions + content types) on first use, since Django
+discourages queries in ready(); it is dropped after migrate or when a
+Permission is saved or deleted. Permission checks and the role editor
+then work on integer ids without joining Permission and ContentType.
+tenant_rbac.warmup loads it before a worker takes traffic.
+"""
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import Permission
+
+CatalogEntry = namedtuple('CatalogEntry', ['pk', 'key', 'name', 'codename', 'group'])
+
+
+class PermissionCatalog:
+    def __init__(self):
+        self.reset()
+
+    def load(self):
+        permissions = Permission.objects.select_related('content_type').order_by(
+            'content_type__app_label', 'content_type__model', 'codename'
+        )
+        entries = []
+        for permission in permissions:
+            content_type = permission.content_type
+            entries.append(CatalogEntry(
+                pk=permission.pk,
+                key=f"{content_type.app_label}.{permission.codename}",
+                name=permission.name,
+                codename=permission.codename,
+                # e.g. "Sandbox | role"; resolved from the app registry, no query
+                group=content_type.app_labeled_name,
+            ))
+        # Assign both at once so concurrent readers never see a half-built catalog
+        self._entries, self._by_key, self._by_pk = (
+            entries, {entry.key: entry for entry in entries}, {entry.pk: entry for entry in entries}
+        )
+        self._unknown = set()
+
+    def reset(self, **kwargs):
+        self._entries = None
+        self._by_key = None
+        self._by_pk = None
+        # Keys/ids still missing after a reload (misspelled or deleted permissions),
+        # remembered so they do not trigger a reload on every check.
+        self._unknown = set()
+
+    def _lookup(self, index, values):
+        """
+        Returns the '_by_key' or '_by_pk' index, loading the catalog first and
+        reloading it once for values created after it was loaded.
+        """
+        if self._entries is None:
+            self.load()
+        missing = {value for value in values if value not in getattr(self, index)} - self._unknown
+        if missing:
+            unknown = self._unknown | missing
+            self.load()
+            self._unknown = {value for value in unknown if value not in self._by_key and value not in self._by_pk}
+        return getattr(self, index)
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self.load()
+        return self._entries
+
+    def id_for(self, permission_key):
+        """Permission id of an "app_label.codename" string, or None."""
+        entry = self._lookup('_by_key', [permission_key]).get(permission_key)
+        return entry.pk if entry is not None else None
+
+    def ids_for_keys(self, permission_keys):
+        """Maps "app_label.codename" strings to Permission ids (unknown keys are skipped)."""
+        permission_keys = list(permission_keys)
+        by_key = self._lookup('_by_key', permission_keys)
+        return {by_key[key].pk for key in permission_keys if key in by_key}
+
+    def keys_for_ids(self, permission_ids):
+        """Maps Permission ids to "app_label.codename" strings (unknown ids are skipped)."""
+        permission_ids = list(permission_ids)
+        by_pk = self._lookup('_by_pk', permission_ids)
+        return frozenset(by_pk[pk].key for pk in permission_ids if pk in by_pk)
+
+    async def akeys_for_ids(self, permission_ids):
+        """Async version of keys_for_ids(); only goes to a thread when a (re)load is needed."""
+        permission_ids = list(permission_ids)
+        if self._by_pk is None or any(pk not in self._by_pk and pk not in self._unknown for pk in permission_ids):
+            return await sync_to_async(self.keys_for_ids)(permission_ids)
+        return self.keys_for_ids(permission_ids)
+
+    def grouped(self, allowed_ids=None):
+        """Returns [(group_label, [CatalogEntry, ...]), ...], optionally restricted to some ids."""
+        groups = []
+        for entry in self.entries:
+            if allowed_ids is not None and entry.pk not in allowed_ids:
+                continue
+            if not groups or groups[-1][0] != entry.group:
+                groups.append((entry.group, []))
+            groups[-1][1].append(entry)
+        return groups
+
+    def grouped_choices(self, allowed_ids=None):
+        """Choices with optgroups for a ChoiceField: [(group_label, [(pk, name), ...]), ...]."""
+        return [
+            (group, [(entry.pk, entry.name) for entry in entries])
+            for group, entries in self.grouped(allowed_ids)
+        ]
+
+
+permission_catalog = PermissionCatalog()
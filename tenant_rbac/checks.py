@@ -0,0 +1,129 @@
+"""
+Startup validation of tenant_permission_required and of the permission masks.
+
+A misspelled permission is never granted, so the view silently denies
+everyone but superusers. check_view_permissions() (registered as a system
+check in TenantRbacConfig.ready(), run by runserver, migrate and 'manage.py
+check') reports every view in the URLconf whose permission does not match
+a model permission. It reads the model registry only, no database.
+
+Permissions created at runtime rather than from a model Meta can be
+allowed with SILENCED_SYSTEM_CHECKS = ['tenant_rbac.E001'].
+
+check_role_templates() reports every permission of a default role template
+(TENANT_RBAC_DEFAULT_ROLES or role_templates.register()) that is not a model
+permission; provisioning would skip it without a word.
+
+check_permission_mask_bits() (a database check, run by migrate and
+'manage.py check --database default') reports Permission ids above
+TENANT_RBAC_MAX_PERMISSION_BIT when a role model stores compiled masks:
+those permissions cannot be granted through a mask.
+"""
+from django.apps import apps
+from django.contrib.auth.models import Permission
+from django.core import checks
+from django.db import DatabaseError
+from django.urls import URLResolver, get_resolver
+
+from .bitmask import get_max_permission_bit, uses_permission_mask
+from .models import AbstractTenantRole
+
+
+def iter_permission_views(patterns=None):
+    """Yields (view class, route, permission) for every class-based view of the URLconf with tenant_permission_required."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_permission_views(pattern.url_patterns)
+            continue
+        view_class = getattr(pattern.callback, 'view_class', None)
+        if view_class is None:
+            continue
+        # as_view(tenant_permission_required=...) wins over the class attribute
+        initkwargs = getattr(pattern.callback, 'view_initkwargs', {})
+        permission = initkwargs.get('tenant_permission_required', getattr(view_class, 'tenant_permission_required', None))
+        if permission:
+            yield view_class, str(pattern.pattern), permission
+
+
+def model_permission_keys():
+    """"app_label.codename" of every permission the installed models declare (what migrate creates)."""
+    keys = set()
+    for model in apps.get_models():
+        opts = model._meta
+        keys.update(f"{opts.app_label}.{action}_{opts.model_name}" for action in opts.default_permissions)
+        keys.update(f"{opts.app_label}.{codename}" for codename, _ in opts.permissions)
+    return keys
+
+
+def check_view_permissions(app_configs=None, **kwargs):
+    errors = []
+    known = model_permission_keys()
+    for view_class, route, permission in iter_permission_views():
+        if permission not in known:
+            errors.append(checks.Error(
+                f"{view_class.__module__}.{view_class.__qualname__} (route '{route}') requires "
+                f"the unknown permission '{permission}'; it will deny everyone but superusers.",
+                hint="Use \"app_label.codename\" of a model permission.",
+                obj=view_class,
+                id='tenant_rbac.E001',
+            ))
+    return errors
+
+
+def check_role_templates(app_configs=None, **kwargs):
+    from .provisioning import get_default_role_templates
+
+    try:
+        templates = get_default_role_templates()
+    except (KeyError, TypeError) as error:
+        return [checks.Error(
+            f"TENANT_RBAC_DEFAULT_ROLES is not valid: {error!r}.",
+            hint="Each role is a dict with 'name' and optionally 'description', 'is_protected' and 'permissions'.",
+            id='tenant_rbac.E003',
+        )]
+    errors = []
+    known = model_permission_keys()
+    for template in templates:
+        unknown = [permission for permission in template.permissions if permission not in known]
+        if unknown:
+            errors.append(checks.Error(
+                f"Role template '{template.name}' grants the unknown permission(s) {', '.join(unknown)}; "
+                f"they would not be granted.",
+                hint="Use \"app_label.codename\" of a model permission.",
+                obj=template,
+                id='tenant_rbac.E003',
+            ))
+    return errors
+
+
+def check_permission_mask_bits(app_configs=None, databases=None, **kwargs):
+    if not databases:
+        return []
+    role_models = [
+        model for model in apps.get_models()
+        if issubclass(model, AbstractTenantRole) and uses_permission_mask(model)
+    ]
+    if not role_models:
+        return []
+
+    errors = []
+    max_bit = get_max_permission_bit()
+    for alias in databases:
+        try:
+            too_large = list(
+                Permission.objects.using(alias).filter(pk__gt=max_bit).order_by('pk').values_list('pk', flat=True)[:5]
+            )
+        except DatabaseError:
+            # Not migrated yet
+            continue
+        if too_large:
+            errors.append(checks.Error(
+                f"Permission ids {too_large} (database '{alias}') exceed TENANT_RBAC_MAX_PERMISSION_BIT "
+                f"({max_bit}); the compiled masks of {', '.join(model._meta.label for model in role_models)} "
+                f"cannot grant them.",
+                hint="Raise TENANT_RBAC_MAX_PERMISSION_BIT or remove PermissionMaskMixin from the role model.",
+                id='tenant_rbac.E002',
+            ))
+    return errors
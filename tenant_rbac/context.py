@@ -0,0 +1,41 @@
+"""
+Current tenant (and request) held in ContextVars.
+
+Unlike a thread-local, a ContextVar follows the request across awaits
+under ASGI and is copied into the worker thread when a sync view runs
+through sync_to_async, so concurrent requests on the same event loop
+never see each other's tenant.
+"""
+from contextvars import ContextVar
+
+_current_tenant = ContextVar('tenant_rbac_current_tenant', default=None)
+# Read by the audit log to attribute changes made through signals. The request,
+# not request.user: asgiref inspects context values when switching between sync
+# and async, which would evaluate the lazy user (a query) on the event loop.
+_current_request = ContextVar('tenant_rbac_current_request', default=None)
+
+
+def get_current_tenant():
+    return _current_tenant.get()
+
+
+def set_current_tenant(tenant):
+    """Sets the tenant and returns a token for reset_current_tenant()."""
+    return _current_tenant.set(tenant)
+
+
+def reset_current_tenant(token):
+    _current_tenant.reset(token)
+
+
+def get_current_request():
+    return _current_request.get()
+
+
+def set_current_request(request):
+    """Sets the request and returns a token for reset_current_request()."""
+    return _current_request.set(request)
+
+
+def reset_current_request(token):
+    _current_request.reset(token)
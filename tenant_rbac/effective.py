@@ -0,0 +1,182 @@
+"""
+Materialized effective permissions (optional).
+
+One row per (tenant, user, "app_label.codename") that a user has through
+their membership, inherited permissions included. Resolving permissions
+then reads one covering index, filtered on the tenant column first,
+instead of joining Member -> Role -> role_permissions -> Permission ->
+ContentType:
+
+    class EffectivePermission(AbstractTenantUserPermission, TenantModel):
+        organization = models.ForeignKey(Organization, on_delete=models.CASCADE)
+        tenant_id = 'organization_id'
+
+        class Meta:
+            unique_together = ('organization', 'user', 'permission_key')     # checks
+            indexes = [models.Index(fields=['organization', 'permission_key'])]  # "who can do X"
+
+    TENANT_RBAC_EFFECTIVE_PERMISSION_MODEL = 'sandbox.EffectivePermission'
+    TENANT_RBAC_MEMBER_MODEL = 'sandbox.Member'
+
+The signals in tenant_rbac.signals and the bulk helpers keep the table in
+sync; 'python manage.py rebuild_effective_permissions' rebuilds or checks it.
+"""
+from collections import namedtuple
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+
+from .bitmask import compute_role_grants, permission_bits, uses_permission_mask
+from .catalog import permission_catalog
+from .hierarchy import get_descendant_ids, uses_role_hierarchy
+from .members import get_member_model, get_role_field
+
+EffectiveSyncResult = namedtuple('EffectiveSyncResult', ['added', 'removed'])
+
+
+def get_effective_permission_model():
+    """The configured effective permission model, or None if the table is not used."""
+    model_path = getattr(settings, 'TENANT_RBAC_EFFECTIVE_PERMISSION_MODEL', None)
+    return apps.get_model(model_path) if model_path else None
+
+
+def _tenant_field(model):
+    return getattr(model, 'tenant_id', 'tenant_id')
+
+
+def _role_keys(role_model, role_ids):
+    """{role_id: frozenset of "app_label.codename"}, inherited permissions included."""
+    if uses_permission_mask(role_model):
+        rows = role_model._base_manager.filter(pk__in=role_ids).values_list('pk', 'permissions_mask')
+        return {role_id: permission_bits.keys_for_mask(mask) for role_id, mask in rows}
+    return {
+        role_id: permission_catalog.keys_for_ids(ids)
+        for role_id, ids in compute_role_grants(role_model, role_ids).items()
+    }
+
+
+def _sync(model, role_model, memberships, rows, scope, batch_size, dry_run):
+    """
+    Writes the difference between the rows the memberships imply and the
+    stored ones. 'memberships' are (tenant, user, role) tuples, 'rows' the
+    stored rows to compare and 'scope' the (tenant, user) pairs they are
+    restricted to (None: all of them).
+    """
+    memberships = list(memberships)
+    keys = _role_keys(role_model, {role_id for _, _, role_id in memberships if role_id is not None})
+    expected = {
+        (tenant_pk, user_id, key)
+        for tenant_pk, user_id, role_id in memberships
+        for key in keys.get(role_id, ())
+    }
+
+    stale = []
+    for pk, tenant_pk, user_id, key in rows.values_list(
+        'pk', _tenant_field(model), 'user_id', 'permission_key'
+    ).iterator():
+        if scope is not None and (tenant_pk, user_id) not in scope:
+            continue
+        if (tenant_pk, user_id, key) in expected:
+            expected.discard((tenant_pk, user_id, key))
+        else:
+            stale.append(pk)
+
+    if not dry_run and (stale or expected):
+        # One transaction: readers never see the revoked rows gone but the new ones missing
+        with transaction.atomic():
+            for start in range(0, len(stale), batch_size):
+                model._base_manager.filter(pk__in=stale[start:start + batch_size]).delete()
+            model._base_manager.bulk_create(
+                [model(**{_tenant_field(model): tenant_pk, 'user_id': user_id, 'permission_key': key})
+                 for tenant_pk, user_id, key in expected],
+                batch_size=batch_size,
+                ignore_conflicts=True,
+            )
+    return EffectiveSyncResult(len(expected), len(stale))
+
+
+def _memberships(member_model, **filters):
+    role_field = get_role_field(member_model)
+    return member_model._base_manager.filter(**filters).order_by().values_list(
+        _tenant_field(member_model), 'user_id', role_field.attname
+    )
+
+
+def sync_effective_permissions(tenant_pk, user_ids=None, member_model=None, batch_size=1000, dry_run=False):
+    """
+    Recomputes the rows of the members of a tenant (all of them or the given
+    users) and writes only the difference. Users with no membership lose
+    their rows. Returns an EffectiveSyncResult.
+    """
+    model = get_effective_permission_model()
+    if model is None:
+        return EffectiveSyncResult(0, 0)
+    member_model = member_model or get_member_model()
+    role_model = get_role_field(member_model).related_model
+    members = {_tenant_field(member_model): tenant_pk}
+    rows = model._base_manager.filter(**{_tenant_field(model): tenant_pk}).order_by()
+
+    if user_ids is None:
+        return _sync(model, role_model, _memberships(member_model, **members), rows, None, batch_size, dry_run)
+
+    added = removed = 0
+    iterator = iter(user_ids)
+    while chunk := list(islice(iterator, batch_size)):
+        result = _sync(
+            model, role_model, _memberships(member_model, user_id__in=chunk, **members),
+            rows.filter(user_id__in=chunk), None, batch_size, dry_run,
+        )
+        added += result.added
+        removed += result.removed
+    return EffectiveSyncResult(added, removed)
+
+
+def sync_role_effective_permissions(role_model, role_ids, member_model=None, batch_size=1000):
+    """
+    After the permissions (or parents) of roles changed: syncs the rows of
+    their members and of the members of their descendants, across tenants,
+    with a few queries per batch of roles.
+    """
+    model = get_effective_permission_model()
+    if model is None or not role_ids:
+        return EffectiveSyncResult(0, 0)
+    member_model = member_model or get_member_model()
+    role_ids = set(role_ids)
+    if uses_role_hierarchy(role_model):
+        role_ids |= get_descendant_ids(role_model, role_ids)
+
+    added = removed = 0
+    iterator = iter(sorted(role_ids))
+    while chunk := list(islice(iterator, batch_size)):
+        holders = _memberships(member_model, **{f"{get_role_field(member_model).attname}__in": chunk})
+        memberships = list(holders)
+        if not memberships:
+            continue
+        # Superset of the rows of these members, narrowed to their (tenant, user) pairs in _sync
+        rows = model._base_manager.filter(**{
+            f"{_tenant_field(model)}__in": holders.values(_tenant_field(member_model)),
+            'user_id__in': holders.values('user_id'),
+        }).order_by()
+        scope = {(tenant_pk, user_id) for tenant_pk, user_id, _ in memberships}
+        result = _sync(model, role_model, memberships, rows, scope, batch_size, False)
+        added += result.added
+        removed += result.removed
+    return EffectiveSyncResult(added, removed)
+
+
+def has_effective_permission(user, tenant, permission_key):
+    """Single check as one EXISTS on the (tenant, user, permission_key) index, without loading the set."""
+    model = get_effective_permission_model()
+    return model._base_manager.filter(
+        **{_tenant_field(model): tenant.pk, 'user_id': user.pk, 'permission_key': permission_key}
+    ).exists()
+
+
+def users_with_permission(tenant, permission_key):
+    """Users that have a permission in a tenant (superusers aside), as a queryset."""
+    model = get_effective_permission_model()
+    rows = model._base_manager.filter(**{_tenant_field(model): tenant.pk, 'permission_key': permission_key})
+    return get_user_model()._default_manager.filter(pk__in=rows.values('user_id'))
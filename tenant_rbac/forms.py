@@ -1,5 +1,12 @@
 from django import forms
 from django.contrib.auth.models import Permission
+from django.core.exceptions import ValidationError
+from django.forms.models import ModelChoiceIterator
+
+from .bitmask import compute_role_grants, ids_from_mask, uses_permission_mask
+from .catalog import permission_catalog
+from .hierarchy import check_parents
+from .permissions import get_tenant_permissions
 
 class TenantModelForm(forms.ModelForm):
     """
@@ -18,18 +25,53 @@ class TenantModelForm(forms.ModelForm):
         
         if tenant:
             # 1. INTEGRITY: Filter all ForeignKeys to show only data from the tenant
-            for field_name, field in self.fields.items():
-                if isinstance(field, (forms.ModelChoiceField, forms.ModelMultipleChoiceField)):
-                    # Security check in case the field has no queryset defined
-                    if not hasattr(field, 'queryset') or field.queryset is None:
-                        continue
-
-                    model = field.queryset.model
-                    # If the related model has tenant_id, we filter
-                    if hasattr(model, 'tenant_id'):
-                        tenant_field = getattr(model, 'tenant_id', 'tenant_id')
-                        # Dynamic filter: organization_id=1
-                        field.queryset = field.queryset.filter(**{tenant_field: tenant.pk})
+            # (querysets built once per request and shared by every form of a formset)
+            for field_name, queryset in self.get_tenant_querysets(tenant).items():
+                self.fields[field_name].queryset = queryset
+
+    @classmethod
+    def get_tenant_scoped_fields(cls):
+        """
+        Returns ((field_name, tenant_field), ...) for every choice field whose
+        related model has tenant_id. Computed once per form class.
+        """
+        # Read cls.__dict__ so that subclasses do not inherit their parent's result
+        scoped_fields = cls.__dict__.get('_tenant_scoped_fields')
+        if scoped_fields is None:
+            scoped_fields = []
+            for field_name, field in cls.base_fields.items():
+                if not isinstance(field, (forms.ModelChoiceField, forms.ModelMultipleChoiceField)):
+                    continue
+                # Security check in case the field has no queryset defined
+                if getattr(field, 'queryset', None) is None:
+                    continue
+
+                model = field.queryset.model
+                # If the related model has tenant_id, we filter
+                if hasattr(model, 'tenant_id'):
+                    scoped_fields.append((field_name, getattr(model, 'tenant_id', 'tenant_id')))
+            scoped_fields = tuple(scoped_fields)
+            cls._tenant_scoped_fields = scoped_fields
+        return scoped_fields
+
+    def get_tenant_querysets(self, tenant):
+        """
+        Returns {field_name: filtered queryset} for the current tenant,
+        memoized on the request per form class.
+        """
+        cache = getattr(self.request, '_tenant_rbac_form_querysets', None)
+        if cache is None:
+            cache = {}
+            self.request._tenant_rbac_form_querysets = cache
+
+        key = (type(self), tenant.pk)
+        if key not in cache:
+            cache[key] = {
+                # Dynamic filter: organization_id=1
+                field_name: self.fields[field_name].queryset.filter(**{tenant_field: tenant.pk})
+                for field_name, tenant_field in self.get_tenant_scoped_fields()
+            }
+        return cache[key]
 
     def save(self, commit=True):
         # Automatic assignment of the tenant on save (if it is creation)
@@ -41,6 +83,44 @@ class TenantModelForm(forms.ModelForm):
         return super().save(commit)
 
 
+class PermissionChoiceIterator(ModelChoiceIterator):
+    """
+    Lazy grouped choices [(group, [(pk, name), ...]), ...] evaluated at render
+    time from the permission catalog.
+    """
+    def __iter__(self):
+        allowed_ids = self.field.allowed_permission_ids
+        if allowed_ids is None:
+            if self.queryset.query.has_filters():
+                allowed_ids = set(self.queryset.values_list('pk', flat=True))
+            else:
+                # Every permission: already in the catalog, no query
+                allowed_ids = {entry.pk for entry in permission_catalog.entries}
+        yield from permission_catalog.grouped_choices(allowed_ids)
+
+    def __len__(self):
+        # Number of options, not of groups
+        return sum(len(options) for _, options in self)
+
+
+class PermissionChoiceField(forms.ModelMultipleChoiceField):
+    """
+    Permission selector grouped by app/model (rendered as optgroups).
+    Choices come from the process-wide permission catalog, so rendering
+    does not run one query per permission.
+    """
+    widget = forms.CheckboxSelectMultiple
+    iterator = PermissionChoiceIterator
+
+    def __init__(self, queryset=None, **kwargs):
+        # Ids the user may choose from; None means "read them from the queryset"
+        self.allowed_permission_ids = None
+        if queryset is None:
+            # Every permission until e.g. RoleFormMixin narrows it to what the user may grant
+            queryset = Permission.objects.all()
+        super().__init__(queryset, **kwargs)
+
+
 class RoleFormMixin(TenantModelForm):
     """
     Security mixin to prevent Privilege Escalation.
@@ -48,36 +128,93 @@ class RoleFormMixin(TenantModelForm):
     """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        
+
+        if 'parents' in self.fields:
+            field = self.fields['parents']
+            tenant_field = field.queryset.model._meta.get_field(getattr(field.queryset.model, 'tenant_id', 'tenant_id'))
+            if tenant_field.is_relation:
+                # Role.__str__ usually shows the tenant: one query for the options, not one per option
+                field.queryset = field.queryset.select_related(tenant_field.name)
+            if self.request:
+                self.limit_parent_roles()
+
         # If the form has no 'permissions' field, we do nothing
         if not self.request or 'permissions' not in self.fields:
             return
 
         user = self.request.user
+        field = self.fields['permissions']
         
         # Global superuser sees everything
         if user.is_superuser:
             return
 
         # 2. ANTI-ESCALATION: Calculate allowed permissions
-        allowed_permissions_qs = Permission.objects.none()
+        allowed_ids = set()
         
         tenant = getattr(self.request, 'tenant', None)
         if tenant:
-            # Search for the current user's membership
-            # Verify that the user has the 'tenant_memberships' relation
-            if hasattr(user, 'tenant_memberships'):
-                membership_model = user.tenant_memberships.model
-                tenant_fk_name = getattr(membership_model, 'tenant_id', 'tenant_id')
-                
-                # Search for the membership in THIS tenant
-                membership = user.tenant_memberships.filter(
-                    **{tenant_fk_name: tenant.pk}
-                ).select_related('role').first()
-
-                if membership and membership.role:
-                    # The user can ONLY see/assign permissions that THEY HAVE
-                    allowed_permissions_qs = membership.role.permissions.all()
+            # The user can ONLY see/assign permissions that THEY HAVE in THIS tenant
+            # (same set used by TenantRBACMixin, already memoized on the request)
+            allowed_ids = permission_catalog.ids_for_keys(get_tenant_permissions(self.request, tenant))
 
         # Intercept the QuerySet of the permissions field
-        self.fields['permissions'].queryset = allowed_permissions_qs
\ No newline at end of file
+        field.queryset = Permission.objects.filter(pk__in=allowed_ids)
+        if isinstance(field, PermissionChoiceField):
+            field.allowed_permission_ids = allowed_ids
+
+    def limit_parent_roles(self):
+        """
+        Parent role choices (RoleHierarchyMixin): never this role or one that
+        inherits from it (cycles) and, for non-superusers, only roles whose
+        permissions (inherited included) the user has, since inheriting a
+        role grants all of them.
+        """
+        field = self.fields['parents']
+        queryset = field.queryset
+        if self.instance.pk:
+            queryset = queryset.exclude(pk=self.instance.pk).exclude(ancestors=self.instance.pk)
+
+        user = self.request.user
+        if not user.is_superuser:
+            tenant = getattr(self.request, 'tenant', None)
+            if not tenant:
+                field.queryset = queryset.none()
+                return
+            allowed_ids = permission_catalog.ids_for_keys(get_tenant_permissions(self.request, tenant))
+            if uses_permission_mask(queryset.model):
+                # Masks already include inherited permissions: one query
+                grants = {pk: set(ids_from_mask(mask)) for pk, mask in queryset.values_list('pk', 'permissions_mask')}
+            else:
+                grants = compute_role_grants(queryset.model, list(queryset.values_list('pk', flat=True)))
+            queryset = queryset.filter(pk__in=[pk for pk, ids in grants.items() if ids <= allowed_ids])
+        field.queryset = queryset
+
+    def clean(self):
+        cleaned_data = super().clean()
+        parents = cleaned_data.get('parents')
+        if parents:
+            try:
+                self.check_parent_roles(parents, cleaned_data)
+            except ValidationError as error:
+                self.add_error('parents', error)
+        return cleaned_data
+
+    def check_parent_roles(self, parents, cleaned_data):
+        """
+        Same rules as the m2m_changed handler (same workspace, no cycles),
+        checked here so that the form shows an error instead of save() raising.
+        Runs in clean() because the tenant field may come after 'parents'.
+        """
+        role_model = self._meta.model
+        tenant_field = role_model._meta.get_field(getattr(role_model, 'tenant_id', 'tenant_id'))
+        if tenant_field.name in cleaned_data:
+            tenant_pk = getattr(cleaned_data[tenant_field.name], 'pk', cleaned_data[tenant_field.name])
+        else:
+            tenant_pk = getattr(self.instance, tenant_field.attname, None)
+        if tenant_pk is None and self.request:
+            tenant_pk = getattr(getattr(self.request, 'tenant', None), 'pk', None)
+        if tenant_pk is not None and any(getattr(role, tenant_field.attname) != tenant_pk for role in parents):
+            raise ValidationError("A role can only inherit from roles of the same workspace.")
+        if self.instance.pk:
+            check_parents(role_model, [self.instance.pk], [role.pk for role in parents])
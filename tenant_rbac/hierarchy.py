@@ -0,0 +1,175 @@
+"""
+Role hierarchy (optional, see RoleHierarchyMixin).
+
+A role inherits every permission of its parent roles, transitively. The
+transitive closure is materialized in the 'ancestors' M2M (one row per
+role and ancestor, the role itself excluded), so resolving permissions
+joins it once instead of walking the hierarchy:
+
+    Member -> Role -> role_ancestors -> role_permissions
+
+Compiled permission masks include the inherited permissions, so with
+PermissionMaskMixin a check is still a single read of Member -> Role.
+The signals in tenant_rbac.signals keep the closure in sync; the
+verify_role_hierarchy command checks (and repairs) it.
+"""
+from collections import defaultdict, namedtuple
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+HierarchyReport = namedtuple('HierarchyReport', ['cycles', 'cross_tenant', 'stale'])
+
+
+def uses_role_hierarchy(role_model):
+    return any(field.name == 'ancestors' for field in role_model._meta.many_to_many)
+
+
+def _edge_columns(field):
+    return f"{field.m2m_field_name()}_id", f"{field.m2m_reverse_field_name()}_id"
+
+
+def get_parents_map(role_model, tenant_pks=None):
+    """{role_id: {parent_id, ...}} of the given tenants (or all of them)."""
+    field = role_model._meta.get_field('parents')
+    child_column, parent_column = _edge_columns(field)
+    rows = field.remote_field.through._base_manager.all()
+    if tenant_pks is not None:
+        tenant_field = getattr(role_model, 'tenant_id', 'tenant_id')
+        rows = rows.filter(**{f"{field.m2m_field_name()}__{tenant_field}__in": tenant_pks})
+    parents = defaultdict(set)
+    for child_id, parent_id in rows.values_list(child_column, parent_column).iterator():
+        parents[child_id].add(parent_id)
+    return parents
+
+
+def get_closure_map(role_model, role_ids=None):
+    """{role_id: {ancestor_id, ...}} as stored in the closure."""
+    field = role_model._meta.get_field('ancestors')
+    role_column, ancestor_column = _edge_columns(field)
+    rows = field.remote_field.through._base_manager.all()
+    if role_ids is not None:
+        rows = rows.filter(**{f"{role_column}__in": role_ids})
+    ancestors = defaultdict(set)
+    for role_id, ancestor_id in rows.values_list(role_column, ancestor_column).iterator():
+        ancestors[role_id].add(ancestor_id)
+    return ancestors
+
+
+def _reachable(parents, role_id):
+    seen, stack = set(), list(parents.get(role_id, ()))
+    while stack:
+        ancestor_id = stack.pop()
+        if ancestor_id not in seen:
+            seen.add(ancestor_id)
+            stack.extend(parents.get(ancestor_id, ()))
+    return seen
+
+
+def compute_ancestors(parents, role_ids):
+    """{role_id: {ancestor_id, ...}} from a parents map. Cycles do not loop forever."""
+    return {role_id: _reachable(parents, role_id) - {role_id} for role_id in role_ids}
+
+
+def find_cycles(parents):
+    """Returns the roles that are their own ancestor, as sorted lists of role ids (one per cycle)."""
+    reachable = {role_id: _reachable(parents, role_id) for role_id in parents}
+    cycles, assigned = [], set()
+    for role_id in sorted(parents):
+        if role_id in assigned or role_id not in reachable[role_id]:
+            continue
+        cycle = {other for other in reachable[role_id] if role_id in reachable.get(other, ())}
+        cycles.append(sorted(cycle))
+        assigned |= cycle
+    return cycles
+
+
+def get_descendant_ids(role_model, role_ids):
+    """Ids of the roles that inherit from any of the given roles, from the closure."""
+    field = role_model._meta.get_field('ancestors')
+    role_column, ancestor_column = _edge_columns(field)
+    rows = field.remote_field.through._base_manager.filter(**{f"{ancestor_column}__in": role_ids})
+    return set(rows.values_list(role_column, flat=True))
+
+
+def check_parents(role_model, child_ids, parent_ids):
+    """
+    Raises ValidationError if making every parent_ids role a parent of every
+    child_ids role crosses tenants or creates a cycle. One query for each.
+    """
+    tenant_field = getattr(role_model, 'tenant_id', 'tenant_id')
+    child_ids, parent_ids = set(child_ids), set(parent_ids)
+    tenants = set(
+        role_model._base_manager.filter(pk__in=child_ids | parent_ids).order_by().values_list(tenant_field, flat=True)
+    )
+    if len(tenants) > 1:
+        raise ValidationError("A role can only inherit from roles of the same workspace.")
+
+    # A cycle appears if a child is one of the parents or already an ancestor of one
+    field = role_model._meta.get_field('ancestors')
+    role_column, ancestor_column = _edge_columns(field)
+    if child_ids & parent_ids or field.remote_field.through._base_manager.filter(
+        **{f"{role_column}__in": parent_ids, f"{ancestor_column}__in": child_ids}
+    ).exists():
+        raise ValidationError("A role cannot inherit from itself or from a role that inherits from it.")
+
+
+def rebuild_role_closure(role_model, role_ids=None):
+    """
+    Recomputes the stored ancestors of the given roles (or of every role)
+    from the parents M2M and writes only the difference. The caller passes
+    the descendants too: their ancestors change with those of the role.
+    Returns {role_id: tenant} of the roles whose closure changed.
+    """
+    field = role_model._meta.get_field('ancestors')
+    role_column, ancestor_column = _edge_columns(field)
+    through = field.remote_field.through
+    tenant_field = getattr(role_model, 'tenant_id', 'tenant_id')
+
+    roles = role_model._base_manager.order_by()
+    if role_ids is not None:
+        roles = roles.filter(pk__in=role_ids)
+    tenant_by_role = dict(roles.values_list('pk', tenant_field))
+    if not tenant_by_role:
+        return {}
+
+    tenant_pks = None if role_ids is None else set(tenant_by_role.values())
+    expected = compute_ancestors(get_parents_map(role_model, tenant_pks), tenant_by_role)
+    stored = get_closure_map(role_model, None if role_ids is None else list(tenant_by_role))
+
+    to_add, to_delete = [], defaultdict(set)
+    for role_id, ancestors in expected.items():
+        current = stored.get(role_id, set())
+        to_add.extend((role_id, ancestor_id) for ancestor_id in ancestors - current)
+        if current - ancestors:
+            to_delete[role_id] = current - ancestors
+
+    if to_delete:
+        through._base_manager.filter(reduce(or_, (
+            Q(**{role_column: role_id, f"{ancestor_column}__in": ancestor_ids})
+            for role_id, ancestor_ids in to_delete.items()
+        ))).delete()
+    through._base_manager.bulk_create(
+        [through(**{role_column: role_id, ancestor_column: ancestor_id}) for role_id, ancestor_id in to_add],
+        batch_size=1000,
+    )
+    return {role_id: tenant_by_role[role_id] for role_id in {role_id for role_id, _ in to_add} | set(to_delete)}
+
+
+def verify_role_hierarchy(role_model):
+    """Returns a HierarchyReport: cycles, parent links across tenants and roles with a stale closure."""
+    tenant_field = getattr(role_model, 'tenant_id', 'tenant_id')
+    tenant_by_role = dict(role_model._base_manager.order_by().values_list('pk', tenant_field).iterator())
+    parents = get_parents_map(role_model)
+    cross_tenant = [
+        (child_id, parent_id)
+        for child_id, parent_ids in parents.items()
+        for parent_id in parent_ids
+        if tenant_by_role.get(child_id) != tenant_by_role.get(parent_id)
+    ]
+    expected = compute_ancestors(parents, tenant_by_role)
+    stored = get_closure_map(role_model)
+    stale = sorted(role_id for role_id, ancestors in expected.items() if stored.get(role_id, set()) != ancestors)
+    return HierarchyReport(find_cycles(parents), cross_tenant, stale)
@@ -0,0 +1,147 @@
+"""
+Tenant index advisor.
+
+tenant_rbac filters every query on the model's tenant column first, so
+the composite indexes worth having lead with it:
+
+* (tenant, fk) for every other foreign key: related lookups and the
+  correlated member counts of AbstractTenantRole.with_summary();
+* (tenant, ordering) for Meta.ordering and for the keyset_ordering of
+  keyset-paginated views (the sort column, or the pk).
+
+suggest_tenant_indexes() compares those patterns with the indexes found
+in the database and the ones declared on the models. On Citus, a unique
+index must contain the distribution column, which check_tenant_indexes()
+also reports.
+"""
+from collections import namedtuple
+
+from django.apps import apps
+from django.db import connection
+from django.db.models import UniqueConstraint
+from django.urls import URLPattern, URLResolver, get_resolver
+
+from .pagination import KeysetPaginationMixin
+
+IndexSuggestion = namedtuple('IndexSuggestion', ['model', 'fields', 'reasons'])
+
+
+def get_tenant_field(model):
+    """The tenant ForeignKey of a model, or None (tenant models, plain models)."""
+    if not hasattr(model, 'tenant_id'):
+        return None
+    field = model._meta.get_field(model.tenant_id)
+    return None if field.primary_key else field
+
+
+def get_tenant_models():
+    return [
+        model for model in apps.get_models()
+        if model._meta.managed and not model._meta.proxy and get_tenant_field(model) is not None
+    ]
+
+
+def _columns(model, field_names):
+    return tuple(model._meta.get_field(name).column for name in field_names)
+
+
+def get_existing_indexes(model):
+    """
+    Column tuples of the indexes and unique constraints of a model, from the
+    database (if the table exists) and from its Meta (not migrated yet).
+    Returns {columns: unique}.
+    """
+    indexes = {}
+    with connection.cursor() as cursor:
+        if model._meta.db_table in connection.introspection.table_names(cursor):
+            for constraint in connection.introspection.get_constraints(cursor, model._meta.db_table).values():
+                if (constraint['index'] or constraint['unique']) and constraint['columns']:
+                    columns = tuple(constraint['columns'])
+                    indexes[columns] = indexes.get(columns, False) or bool(constraint['unique'])
+
+    for field_names in model._meta.unique_together:
+        indexes[_columns(model, field_names)] = True
+    for index in model._meta.indexes:
+        if index.fields and index.condition is None:
+            indexes.setdefault(_columns(model, [name.lstrip('-') for name in index.fields]), False)
+    for constraint in model._meta.constraints:
+        if isinstance(constraint, UniqueConstraint) and constraint.fields and constraint.condition is None:
+            indexes[_columns(model, constraint.fields)] = True
+    return indexes
+
+
+def _iter_views(patterns):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _iter_views(pattern.url_patterns)
+        elif isinstance(pattern, URLPattern):
+            view_class = getattr(pattern.callback, 'view_class', None)
+            if view_class is not None:
+                yield view_class
+
+
+def get_keyset_orderings():
+    """{model: {(sort_field, view name), ...}} of the keyset-paginated views in the URLconf."""
+    orderings = {}
+    for view_class in _iter_views(get_resolver().url_patterns):
+        if not issubclass(view_class, KeysetPaginationMixin) or view_class.pagination_mode != 'keyset':
+            continue
+        model = view_class.model or (view_class.queryset.model if view_class.queryset is not None else None)
+        if model is None:
+            continue
+        sort_field = view_class.keyset_ordering.lstrip('-')
+        orderings.setdefault(model, set()).add((sort_field, view_class.__name__))
+    return orderings
+
+
+def _query_patterns(model, tenant_field, keyset_orderings):
+    """Yields (field names, reason) of the tenant-scoped lookups made on a model."""
+    for field in model._meta.concrete_fields:
+        if field.many_to_one and field != tenant_field:
+            yield [tenant_field.name, field.name], f"lookups by {field.name}"
+
+    ordering = [name.lstrip('-') for name in model._meta.ordering if isinstance(name, str)]
+    if ordering and all('__' not in name and name != '?' for name in ordering):
+        yield [tenant_field.name, *ordering], 'Meta.ordering'
+
+    for sort_field, view_name in sorted(keyset_orderings.get(model, ())):
+        if '__' in sort_field:
+            continue
+        sort_field = model._meta.pk.name if sort_field == 'pk' else sort_field
+        yield [tenant_field.name, sort_field], f"keyset pagination of {view_name}"
+
+
+def suggest_tenant_indexes(models=None):
+    """Returns the missing tenant-leading composite indexes as IndexSuggestion tuples."""
+    keyset_orderings = get_keyset_orderings()
+    suggestions = []
+    for model in models or get_tenant_models():
+        tenant_field = get_tenant_field(model)
+        existing = get_existing_indexes(model)
+        missing = {}
+        for fields, reason in _query_patterns(model, tenant_field, keyset_orderings):
+            columns = _columns(model, fields)
+            # An index also serves every prefix of its columns
+            if any(index[:len(columns)] == columns for index in existing):
+                continue
+            missing.setdefault(tuple(fields), []).append(reason)
+        suggestions.extend(IndexSuggestion(model, list(fields), reasons) for fields, reasons in missing.items())
+    return suggestions
+
+
+def check_tenant_indexes(models=None):
+    """Returns (model, message) pairs for structures that cannot lead with the tenant column."""
+    problems = []
+    for model in models or get_tenant_models():
+        tenant_column = get_tenant_field(model).column
+        for columns, unique in get_existing_indexes(model).items():
+            if unique and tenant_column not in columns and columns != (model._meta.pk.column,):
+                problems.append((model, f"unique index on ({', '.join(columns)}) lacks the tenant column"))
+        for field in model._meta.local_many_to_many:
+            through = field.remote_field.through
+            if through._meta.auto_created and get_tenant_field(through) is None:
+                problems.append((model, (
+                    f"'{field.name}' table {through._meta.db_table} has no tenant column: its lookups cannot "
+                    f"lead with it (on Citus, use a through model with the tenant ForeignKey)"
+                )))
+    return problems
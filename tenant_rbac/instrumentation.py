@@ -0,0 +1,266 @@
+"""
+Opt-in per-tenant request instrumentation.
+
+    MIDDLEWARE = [..., 'tenant_rbac.middleware.TenantMiddleware', 'tenant_rbac.instrumentation.TenantMetricsMiddleware', ...]
+    TENANT_RBAC_METRICS = True
+
+For every request it records the SQL count and DB time (through
+connection.execute_wrapper), the time spent in has_tenant_permission and
+the view time (view + template rendering), tagged with tenant id and view
+name, into bounded in-process histograms (tenant_metrics).
+
+Every TENANT_RBAC_METRICS_EXPORT_INTERVAL seconds the snapshot of the
+process is handed to the exporters in TENANT_RBAC_METRICS_EXPORTERS (see
+BaseMetricsExporter). The default CacheMetricsExporter is what the
+'tenant_metrics' management command reads.
+
+With TENANT_RBAC_METRICS = False the middleware removes itself
+(MiddlewareNotUsed) and the only cost left is one getattr per permission check.
+"""
+import bisect
+import logging
+import os
+import socket
+import threading
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger('tenant_rbac.metrics')
+
+REQUEST_METRICS_ATTR = '_tenant_rbac_metrics'
+
+TIME_BUCKETS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)  # ms
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+METRICS = {
+    'sql_count': COUNT_BUCKETS,
+    'db_ms': TIME_BUCKETS,
+    'auth_ms': TIME_BUCKETS,
+    'view_ms': TIME_BUCKETS,
+}
+
+OVERFLOW_TENANT = 'other'
+
+
+class Histogram:
+    """Fixed buckets: constant memory whatever the number of samples."""
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def as_dict(self):
+        return {'buckets': list(self.buckets), 'count': self.count, 'sum': self.sum, 'max': self.max}
+
+
+def merge_histograms(left, right):
+    """Adds two Histogram.as_dict() snapshots."""
+    return {
+        'buckets': [a + b for a, b in zip(left['buckets'], right['buckets'])],
+        'count': left['count'] + right['count'],
+        'sum': left['sum'] + right['sum'],
+        'max': max(left['max'], right['max']),
+    }
+
+
+def percentile(snapshot, bounds, q):
+    """Upper bound of the bucket holding the q-th quantile (capped at the max seen)."""
+    if not snapshot['count']:
+        return 0.0
+    target, seen = q * snapshot['count'], 0
+    for bound, count in zip(bounds + (snapshot['max'],), snapshot['buckets']):
+        seen += count
+        if seen >= target:
+            return min(bound, snapshot['max'])
+    return snapshot['max']
+
+
+class MetricsRegistry:
+    """
+    Histograms per (tenant id, view name). The number of series is bounded by
+    TENANT_RBAC_METRICS_MAX_SERIES; tenants beyond it are counted as 'other'.
+    """
+    def __init__(self, max_series=1000):
+        self.max_series = max_series
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def record(self, tenant_id, view_name, values):
+        key = (str(tenant_id), view_name)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= self.max_series:
+                    key = (OVERFLOW_TENANT, view_name)
+                series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = {name: Histogram(bounds) for name, bounds in METRICS.items()}
+            for name, value in values.items():
+                series[name].add(value)
+
+    def snapshot(self):
+        """{'tenant|view': {metric: histogram dict}}: plain data, ready for any exporter."""
+        with self._lock:
+            return {
+                f'{tenant}|{view}': {name: histogram.as_dict() for name, histogram in series.items()}
+                for (tenant, view), series in self._series.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+tenant_metrics = MetricsRegistry()
+
+
+class BaseMetricsExporter:
+    """
+    Receives the snapshot of this process (MetricsRegistry.snapshot()) every
+    TENANT_RBAC_METRICS_EXPORT_INTERVAL seconds. Subclass it to push the
+    histograms to StatsD, Prometheus, logs...
+    """
+    def export(self, snapshot):
+        raise NotImplementedError
+
+
+class CacheMetricsExporter(BaseMetricsExporter):
+    """
+    Stores the snapshot of each process in TENANT_RBAC_METRICS_CACHE (default
+    'default'), where the 'tenant_metrics' command merges them. Use a shared
+    cache backend when running several workers.
+    """
+    index_key = 'tenant_rbac:metrics:processes'
+    timeout = 24 * 3600
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, 'TENANT_RBAC_METRICS_CACHE', 'default')]
+        self.key = f'tenant_rbac:metrics:{socket.gethostname()}:{os.getpid()}'
+
+    def export(self, snapshot):
+        self.cache.set(self.key, snapshot, self.timeout)
+        processes = self.cache.get(self.index_key) or []
+        if self.key not in processes:
+            self.cache.set(self.index_key, processes + [self.key], self.timeout)
+
+    def collect(self):
+        """Merged snapshot of every process that exported."""
+        merged = {}
+        for snapshot in self.cache.get_many(self.cache.get(self.index_key) or []).values():
+            for series, histograms in snapshot.items():
+                if series in merged:
+                    histograms = {
+                        name: merge_histograms(merged[series][name], histogram)
+                        for name, histogram in histograms.items()
+                    }
+                merged[series] = histograms
+        return merged
+
+    def clear(self):
+        self.cache.delete_many((self.cache.get(self.index_key) or []) + [self.index_key])
+
+
+class RequestMetrics:
+    """Counters of one request; DB statements are counted by __call__ (execute_wrapper)."""
+    __slots__ = ('sql_count', 'db_time', 'auth_time')
+
+    def __init__(self):
+        self.sql_count = 0
+        self.db_time = 0.0
+        self.auth_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.sql_count += 1
+
+
+def get_request_metrics(request):
+    """RequestMetrics of the request, or None when instrumentation is off."""
+    return getattr(request, REQUEST_METRICS_ATTR, None)
+
+
+class TenantMetricsMiddleware:
+    """
+    Place it after TenantMiddleware. Runs as sync middleware (under ASGI
+    Django adapts it), since DB wrappers are installed per thread.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'TENANT_RBAC_METRICS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        tenant_metrics.max_series = getattr(settings, 'TENANT_RBAC_METRICS_MAX_SERIES', 1000)
+        self.exporters = [
+            import_string(path)()
+            for path in getattr(
+                settings, 'TENANT_RBAC_METRICS_EXPORTERS', ['tenant_rbac.instrumentation.CacheMetricsExporter']
+            )
+        ]
+        self.export_interval = getattr(settings, 'TENANT_RBAC_METRICS_EXPORT_INTERVAL', 10)
+        self.next_export = time.monotonic() + self.export_interval
+        self.export_lock = threading.Lock()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        setattr(request, REQUEST_METRICS_ATTR, metrics)
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(metrics))
+            response = self.get_response(request)
+
+        view_start = getattr(request, '_tenant_rbac_view_start', None)
+        if view_start is not None:
+            # Only requests that reached a view (not 404s from the resolver, redirects by middleware...)
+            tenant = getattr(request, 'tenant', None)
+            tenant_metrics.record(
+                tenant.pk if tenant is not None else '-',
+                request._tenant_rbac_view_name,
+                {
+                    'sql_count': metrics.sql_count,
+                    'db_ms': metrics.db_time * 1000,
+                    'auth_ms': metrics.auth_time * 1000,
+                    'view_ms': (time.perf_counter() - view_start) * 1000,
+                },
+            )
+        self.maybe_export()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        request._tenant_rbac_view_name = (
+            match.view_name if match and match.view_name else f'{view_func.__module__}.{view_func.__qualname__}'
+        )
+        # Includes template rendering, which happens after the view returns
+        request._tenant_rbac_view_start = time.perf_counter()
+
+    def maybe_export(self):
+        if time.monotonic() < self.next_export or not self.export_lock.acquire(blocking=False):
+            return
+        try:
+            self.next_export = time.monotonic() + self.export_interval
+            snapshot = tenant_metrics.snapshot()
+            for exporter in self.exporters:
+                try:
+                    exporter.export(snapshot)
+                except Exception:
+                    # Metrics must never break a request, but a broken exporter must not go unnoticed
+                    logger.exception('Metrics exporter %s failed', type(exporter).__name__)
+        finally:
+            self.export_lock.release()
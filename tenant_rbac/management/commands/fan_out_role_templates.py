@@ -0,0 +1,69 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from tenant_rbac.catalog import permission_catalog
+from tenant_rbac.provisioning import fan_out_role_templates, get_role_model, role_templates
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates the template roles (TENANT_RBAC_DEFAULT_ROLES and registered templates) that existing tenants '
+        'lack and grants the template permissions their roles lack, in resumable set-based batches'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--template', action='append', dest='templates', metavar='NAME',
+            help='Only this template (repeatable). Defaults to every template.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000, help='Tenants per batch (one transaction each).')
+        parser.add_argument('--start-after', help='Resume after this tenant primary key (printed after every batch).')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be created.')
+
+    def handle(self, *args, **options):
+        if options['templates']:
+            try:
+                templates = [role_templates.get(name) for name in options['templates']]
+            except KeyError as exc:
+                raise CommandError(f'Unknown role template: {exc.args[0]}.')
+        else:
+            templates = role_templates.all()
+        if not templates:
+            raise CommandError('No role templates. Define TENANT_RBAC_DEFAULT_ROLES or register one.')
+
+        known = {entry.key for entry in permission_catalog.entries}
+        unknown = sorted({key for template in templates for key in template.permissions} - known)
+        if unknown:
+            raise CommandError(f"Unknown permissions in role templates: {', '.join(unknown)}.")
+
+        role_model = get_role_model()
+        tenant_model = role_model._meta.get_field(getattr(role_model, 'tenant_id', 'tenant_id')).related_model
+        tenants = tenant_model._base_manager.all()
+        start_after = options['start_after']
+        if start_after is not None:
+            try:
+                start_after = tenant_model._meta.pk.to_python(start_after)
+            except ValidationError:
+                raise CommandError(f'Invalid --start-after: {start_after}.')
+            tenants = tenants.filter(pk__gt=start_after)
+        total = tenants.count()
+
+        start = time.perf_counter()
+
+        def progress(result):
+            self.stdout.write(
+                f'{result.tenants}/{total} tenants  +{result.roles} roles  +{result.permissions} permissions  '
+                f'{time.perf_counter() - start:6.1f}s  (--start-after {result.last_tenant})'
+            )
+
+        result = fan_out_role_templates(
+            templates, role_model=role_model, batch_size=options['batch_size'], start_after=start_after,
+            dry_run=options['dry_run'], progress=progress,
+        )
+        status = 'would be applied' if options['dry_run'] else 'applied'
+        self.stdout.write(self.style.SUCCESS(
+            f"{', '.join(template.name for template in templates)}: {result.roles} role(s) and "
+            f"{result.permissions} permission grant(s) {status} over {result.tenants} tenant(s)."
+        ))
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+import sys
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from tenant_rbac.members import bulk_assign_members, get_member_model
+
+
+class Command(BaseCommand):
+    help = (
+        'Creates or updates the memberships of a tenant from a CSV or NDJSON stream '
+        'with user_id and role_id columns/keys (role_id may be empty)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tenant', help='Primary key of the tenant.')
+        parser.add_argument('path', help="CSV/NDJSON file, or '-' for stdin.")
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='Defaults to the file extension (csv for stdin).')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--include-protected', action='store_true',
+            help='Also change the role of members with is_protected=True.'
+        )
+
+    def handle(self, *args, **options):
+        member_model = get_member_model()
+        tenant_field = getattr(member_model, 'tenant_id', 'tenant_id')
+        tenant_model = member_model._meta.get_field(tenant_field).related_model
+        try:
+            tenant = tenant_model._base_manager.get(pk=options['tenant'])
+        except (tenant_model.DoesNotExist, ValueError, ValidationError):
+            raise CommandError(f"Tenant '{options['tenant']}' does not exist.")
+
+        path = options['path']
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8') if path == '-' else open(path, encoding='utf-8', newline='')
+
+        try:
+            with stream:
+                rows = self.read_ndjson(stream) if fmt == 'ndjson' else self.read_csv(stream)
+                result = bulk_assign_members(
+                    tenant, rows, member_model=member_model,
+                    batch_size=options['batch_size'], skip_protected=not options['include_protected'],
+                )
+        except ValidationError as exc:
+            raise CommandError('; '.join(exc.messages))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.assigned} membership(s) written to {tenant}, {result.skipped} protected row(s) skipped.'
+        ))
+
+    def read_csv(self, stream):
+        reader = csv.DictReader(stream)
+        if not reader.fieldnames or 'user_id' not in reader.fieldnames:
+            raise CommandError("CSV input needs a header with 'user_id' (and optionally 'role_id').")
+        for row in reader:
+            yield row['user_id'], row.get('role_id') or None
+
+    def read_ndjson(self, stream):
+        for line_number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+                yield row['user_id'], row.get('role_id')
+            except (ValueError, KeyError, TypeError, AttributeError):
+                raise CommandError(f'Line {line_number}: expected an object with user_id (and optionally role_id).')
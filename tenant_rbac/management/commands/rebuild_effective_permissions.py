@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tenant_rbac.cache import invalidate_tenant_permissions
+from tenant_rbac.effective import get_effective_permission_model, sync_effective_permissions
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds the materialized effective permissions (TENANT_RBAC_EFFECTIVE_PERMISSION_MODEL) '
+        'from the memberships and roles, one tenant per transaction'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', action='append', default=[], help='Tenant primary key (repeatable). Default: all.')
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only compare the stored rows; exit with an error if any tenant is out of sync.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        model = get_effective_permission_model()
+        if model is None:
+            self.stdout.write(self.style.WARNING('TENANT_RBAC_EFFECTIVE_PERMISSION_MODEL is not set.'))
+            return
+
+        tenant_field = model._meta.get_field(getattr(model, 'tenant_id', 'tenant_id'))
+        tenant_model = tenant_field.related_model
+        if options['tenant']:
+            tenant_pks = [tenant_model._meta.pk.to_python(value) for value in options['tenant']]
+        else:
+            tenant_pks = list(tenant_model._base_manager.order_by('pk').values_list('pk', flat=True))
+
+        tenants = added = removed = out_of_sync = 0
+        for tenant_pk in tenant_pks:
+            with transaction.atomic():
+                result = sync_effective_permissions(
+                    tenant_pk, batch_size=options['batch_size'], dry_run=options['check']
+                )
+                if (result.added or result.removed) and not options['check']:
+                    invalidate_tenant_permissions(tenant_pk)
+            tenants += 1
+            added += result.added
+            removed += result.removed
+            if result.added or result.removed:
+                out_of_sync += 1
+                style = self.style.ERROR if options['check'] else self.style.SUCCESS
+                self.stdout.write(style(f'Tenant {tenant_pk}: {result.added} missing, {result.removed} stale row(s)'))
+
+        if options['check'] and out_of_sync:
+            raise CommandError(
+                f'{out_of_sync} tenant(s) out of sync ({added} missing, {removed} stale row(s)). '
+                'Run without --check to rebuild them.'
+            )
+        action = 'verified' if options['check'] else f'rebuilt ({added} added, {removed} removed)'
+        self.stdout.write(self.style.SUCCESS(f'{tenants} tenant(s) {action}.'))
@@ -0,0 +1,75 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tenant_rbac.bitmask import compute_role_masks, uses_permission_mask
+from tenant_rbac.cache import invalidate_tenant_permissions
+from tenant_rbac.models import AbstractTenantRole
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the compiled permission masks of every role and verifies them against the permissions M2M'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only verify the stored masks; exit with an error if any is out of sync.'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        role_models = [
+            model for model in apps.get_models()
+            if issubclass(model, AbstractTenantRole) and uses_permission_mask(model)
+        ]
+        if not role_models:
+            self.stdout.write(self.style.WARNING('No role model uses PermissionMaskMixin.'))
+            return
+
+        out_of_sync = 0
+        for role_model in role_models:
+            label = role_model._meta.label
+            stale = self.find_stale_roles(role_model)
+
+            if options['check']:
+                out_of_sync += len(stale)
+                for role_id in stale:
+                    self.stdout.write(self.style.ERROR(f'{label} #{role_id}: mask out of sync'))
+                self.stdout.write(f'{label}: {len(stale)} stale mask(s)')
+                continue
+
+            self.rebuild(role_model, stale, options['batch_size'])
+
+            # Verify the result against the M2M
+            remaining = self.find_stale_roles(role_model)
+            if remaining:
+                raise CommandError(f'{label}: {len(remaining)} mask(s) still out of sync after rebuild.')
+            self.stdout.write(self.style.SUCCESS(f'{label}: {len(stale)} mask(s) rebuilt, all verified.'))
+
+        if out_of_sync:
+            raise CommandError(f'{out_of_sync} role mask(s) out of sync. Run without --check to rebuild them.')
+
+    def find_stale_roles(self, role_model):
+        """Returns {role_id: expected_mask} for roles whose stored mask differs from the M2M."""
+        expected = compute_role_masks(role_model)
+        stored = role_model._base_manager.values_list('pk', 'permissions_mask').iterator()
+        return {
+            role_id: expected[role_id]
+            for role_id, mask in stored
+            if bytes(mask or b'') != expected.get(role_id, b'')
+        }
+
+    def rebuild(self, role_model, stale, batch_size):
+        if not stale:
+            return
+        tenant_field = getattr(role_model, 'tenant_id', 'tenant_id')
+        role_ids = list(stale)
+        tenant_pks = set()
+        with transaction.atomic():
+            for start in range(0, len(role_ids), batch_size):
+                roles = list(role_model._base_manager.filter(pk__in=role_ids[start:start + batch_size]))
+                for role in roles:
+                    role.permissions_mask = stale[role.pk]
+                    tenant_pks.add(getattr(role, tenant_field))
+                role_model._base_manager.bulk_update(roles, ['permissions_mask'])
+            invalidate_tenant_permissions(*tenant_pks)
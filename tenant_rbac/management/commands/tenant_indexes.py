@@ -0,0 +1,90 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import migrations, models
+from django.db.migrations.autodetector import MigrationAutodetector
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import MigrationWriter
+
+from tenant_rbac.indexes import check_tenant_indexes, suggest_tenant_indexes
+
+
+class Command(BaseCommand):
+    help = (
+        'Reports the tenant-leading composite indexes that the tenant_rbac query patterns need '
+        'and the models lack, and optionally writes the migrations that add them'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--emit-migration', action='store_true', help='Write one migration per app with the indexes.')
+        parser.add_argument(
+            '--concurrently', action='store_true',
+            help='Use AddIndexConcurrently (PostgreSQL) in a non-atomic migration.'
+        )
+        parser.add_argument('--name', default='tenant_indexes', help='Suffix of the migration names.')
+        parser.add_argument('--check', action='store_true', help='Exit with an error if any index is missing.')
+
+    def handle(self, *args, **options):
+        suggestions = suggest_tenant_indexes()
+        for model, message in check_tenant_indexes():
+            self.stdout.write(self.style.WARNING(f'{model._meta.label}: {message}'))
+
+        if not suggestions:
+            self.stdout.write(self.style.SUCCESS('Every tenant query pattern has a tenant-leading index.'))
+            return
+
+        by_model = {}
+        for suggestion in suggestions:
+            index = models.Index(fields=suggestion.fields, name='')
+            index.set_name_with_model(suggestion.model)
+            by_model.setdefault(suggestion.model, []).append(index)
+            self.stdout.write(
+                f"{suggestion.model._meta.label}: missing ({', '.join(suggestion.fields)})  "
+                f"<- {'; '.join(suggestion.reasons)}"
+            )
+
+        self.stdout.write('\nAdd to the Meta of each model, so makemigrations stays in sync:')
+        for model, indexes in by_model.items():
+            self.stdout.write(f'  {model.__name__}.Meta.indexes += [')
+            for index in indexes:
+                self.stdout.write(f'      models.Index(fields={index.fields!r}, name={index.name!r}),')
+            self.stdout.write('  ]')
+
+        if options['emit_migration']:
+            self.write_migrations(by_model, options['name'], options['concurrently'])
+        elif options['check']:
+            raise CommandError(f'{len(suggestions)} tenant index(es) missing.')
+
+    def write_migrations(self, by_model, name, concurrently):
+        if concurrently:
+            try:
+                from django.contrib.postgres.operations import AddIndexConcurrently as AddIndex
+            except ImportError:
+                raise CommandError('--concurrently needs PostgreSQL and its driver (psycopg).')
+        else:
+            AddIndex = migrations.AddIndex
+
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        by_app = {}
+        for model, indexes in by_model.items():
+            by_app.setdefault(model._meta.app_label, []).extend(
+                AddIndex(model_name=model._meta.model_name, index=index) for index in indexes
+            )
+
+        for app_label, operations in by_app.items():
+            leaves = loader.graph.leaf_nodes(app_label)
+            if not leaves:
+                raise CommandError(f"App '{app_label}' has no migrations; run makemigrations first.")
+            number = max(MigrationAutodetector.parse_number(leaf[1]) or 0 for leaf in leaves) + 1
+            migration = type('Migration', (migrations.Migration,), {
+                'dependencies': leaves,
+                'operations': operations,
+                # Concurrent index builds cannot run inside a transaction
+                'atomic': not concurrently,
+            })(f'{number:04d}_{name}', app_label)
+
+            writer = MigrationWriter(migration)
+            os.makedirs(os.path.dirname(writer.path), exist_ok=True)
+            with open(writer.path, 'w', encoding='utf-8') as handle:
+                handle.write(writer.as_string())
+            self.stdout.write(self.style.SUCCESS(f'Wrote {writer.path}'))
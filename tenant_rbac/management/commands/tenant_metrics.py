@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from tenant_rbac.instrumentation import METRICS, CacheMetricsExporter, percentile
+
+
+class Command(BaseCommand):
+    help = (
+        'Shows per-tenant request metrics (SQL count, DB time, authorization time, view time) '
+        'exported by TenantMetricsMiddleware through CacheMetricsExporter'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenant', help='Only this tenant id.')
+        parser.add_argument('--view', help='Only views whose name contains this text.')
+        parser.add_argument('--sort', choices=sorted(METRICS), default='view_ms', help='Sorted by p95 of this metric.')
+        parser.add_argument('--limit', type=int, default=30)
+        parser.add_argument('--json', action='store_true', help='Raw merged histograms as JSON.')
+        parser.add_argument('--clear', action='store_true', help='Delete the exported metrics.')
+
+    def handle(self, *args, **options):
+        exporter = CacheMetricsExporter()
+        if options['clear']:
+            exporter.clear()
+            self.stdout.write(self.style.SUCCESS('Exported metrics cleared.'))
+            return
+
+        rows = []
+        for series, histograms in exporter.collect().items():
+            tenant, view = series.split('|', 1)
+            if options['tenant'] and tenant != options['tenant']:
+                continue
+            if options['view'] and options['view'] not in view:
+                continue
+            rows.append((tenant, view, histograms))
+
+        if options['json']:
+            self.stdout.write(json.dumps({f'{tenant}|{view}': data for tenant, view, data in rows}, indent=2))
+            return
+        if not rows:
+            self.stdout.write(self.style.WARNING(
+                'No metrics exported yet. Enable TENANT_RBAC_METRICS and TenantMetricsMiddleware, '
+                'and use a cache shared with the web workers.'
+            ))
+            return
+
+        def p95(histograms, name):
+            return percentile(histograms[name], METRICS[name], 0.95)
+
+        def mean(histograms, name):
+            return histograms[name]['sum'] / histograms[name]['count'] if histograms[name]['count'] else 0.0
+
+        rows.sort(key=lambda row: p95(row[2], options['sort']), reverse=True)
+        self.stdout.write(
+            f"{'tenant':>8}  {'view':32} {'reqs':>6} {'view p50':>9} {'view p95':>9} "
+            f"{'sql avg':>8} {'sql p95':>8} {'db avg':>8} {'auth avg':>9}"
+        )
+        for tenant, view, histograms in rows[:options['limit']]:
+            self.stdout.write(
+                f"{tenant:>8}  {view[:32]:32} {histograms['view_ms']['count']:>6} "
+                f"{percentile(histograms['view_ms'], METRICS['view_ms'], 0.5):>7.1f}ms "
+                f"{p95(histograms, 'view_ms'):>7.1f}ms "
+                f"{mean(histograms, 'sql_count'):>8.1f} {p95(histograms, 'sql_count'):>8.0f} "
+                f"{mean(histograms, 'db_ms'):>6.1f}ms {mean(histograms, 'auth_ms'):>7.2f}ms"
+            )
@@ -0,0 +1,56 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tenant_rbac.hierarchy import uses_role_hierarchy, verify_role_hierarchy
+from tenant_rbac.models import AbstractTenantRole
+from tenant_rbac.roles import refresh_role_hierarchy
+
+
+class Command(BaseCommand):
+    help = (
+        'Verifies the role hierarchy: cycles, parent roles of another tenant and the materialized '
+        'closure (ancestors) against the parents M2M'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair', action='store_true',
+            help='Rebuild the stale closure rows (and their permission masks), then verify again.'
+        )
+
+    def handle(self, *args, **options):
+        role_models = [
+            model for model in apps.get_models()
+            if issubclass(model, AbstractTenantRole) and uses_role_hierarchy(model)
+        ]
+        if not role_models:
+            self.stdout.write(self.style.WARNING('No role model uses RoleHierarchyMixin.'))
+            return
+
+        problems = 0
+        for role_model in role_models:
+            label = role_model._meta.label
+            report = verify_role_hierarchy(role_model)
+
+            if options['repair'] and report.stale:
+                with transaction.atomic():
+                    refresh_role_hierarchy(role_model, report.stale)
+                self.stdout.write(self.style.SUCCESS(f'{label}: closure of {len(report.stale)} role(s) rebuilt.'))
+                report = verify_role_hierarchy(role_model)
+
+            for cycle in report.cycles:
+                self.stdout.write(self.style.ERROR(f"{label}: cycle between roles {', '.join(map(str, cycle))}"))
+            for child_id, parent_id in report.cross_tenant:
+                self.stdout.write(self.style.ERROR(f'{label} #{child_id}: parent #{parent_id} belongs to another tenant'))
+            for role_id in report.stale:
+                self.stdout.write(self.style.ERROR(f'{label} #{role_id}: closure out of sync'))
+
+            count = len(report.cycles) + len(report.cross_tenant) + len(report.stale)
+            problems += count
+            if not count:
+                self.stdout.write(self.style.SUCCESS(f'{label}: hierarchy verified.'))
+
+        if problems:
+            hint = '' if options['repair'] else ' Run with --repair to rebuild stale closures.'
+            raise CommandError(f'{problems} role hierarchy problem(s).{hint}')
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from tenant_rbac.cache import get_permission_cache
+from tenant_rbac.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        'Loads the permission catalog, checks the permissions required by views and fills '
+        'TENANT_RBAC_CACHE with the permission sets of the most recently active members'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tenant', action='append', default=None,
+            help='Tenant primary key (repeatable). Default: TENANT_RBAC_WARM_UP_TENANTS.'
+        )
+        parser.add_argument('--max-users', type=int, default=None, help='Users per tenant (default 1000).')
+
+    def handle(self, *args, **options):
+        if options['tenant'] and get_permission_cache() is None:
+            self.stdout.write(self.style.WARNING('TENANT_RBAC_CACHE is not set: permission sets are not cached.'))
+        result = warm_up(options['tenant'], options['max_users'], fail_silently=False)
+        for permission in result.unknown:
+            self.stdout.write(self.style.WARNING(f"Unknown permission required by a view: {permission}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.permissions} permission(s) loaded, {result.users} permission set(s) cached."
+        ))
@@ -0,0 +1,124 @@
+"""
+Bulk membership assignment.
+
+    bulk_assign_members(tenant, [(user_id, role_id), ...])
+
+Rows are upserted in chunks with one INSERT ... ON CONFLICT (tenant, user)
+DO UPDATE SET role per chunk. Roles and users are validated with one
+set-based query per chunk, the effective permission rows of each chunk
+are synced, one audit event is recorded per chunk and the permission
+cache of the tenant is invalidated once at the end (bulk_create sends no
+post_save).
+"""
+from collections import namedtuple
+from itertools import islice
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db import transaction
+
+from .audit import MEMBER_ASSIGN, audit_log
+from .cache import invalidate_tenant_permissions
+from .models import AbstractTenantRole
+
+BulkAssignResult = namedtuple('BulkAssignResult', ['assigned', 'skipped'])
+
+
+def get_member_model():
+    model_path = getattr(settings, 'TENANT_RBAC_MEMBER_MODEL', None)
+    if not model_path:
+        raise ImproperlyConfigured(
+            "Bulk member operations require TENANT_RBAC_MEMBER_MODEL (e.g. 'sandbox.Member')."
+        )
+    return apps.get_model(model_path)
+
+
+def get_role_field(member_model):
+    """The ForeignKey from the member model to its concrete Role model."""
+    for field in member_model._meta.concrete_fields:
+        if field.is_relation and field.many_to_one and issubclass(field.related_model, AbstractTenantRole):
+            return field
+    raise ImproperlyConfigured(f"{member_model.__name__} has no ForeignKey to an AbstractTenantRole model.")
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def bulk_assign_members(tenant, assignments, member_model=None, batch_size=1000, skip_protected=True):
+    """
+    Creates or updates the memberships of a tenant.
+
+    'assignments' is any iterable (it is consumed lazily) of (user_id, role_id)
+    pairs; role_id may be None. A user listed twice keeps the last role.
+    Members with is_protected=True keep their role unless skip_protected=False.
+
+    Raises ValidationError if a role is not from this tenant or a user does
+    not exist; everything runs in one transaction, so nothing is written then.
+    """
+    # tenant_rbac.effective imports this module
+    from .effective import sync_effective_permissions
+
+    member_model = member_model or get_member_model()
+    tenant_field = getattr(member_model, 'tenant_id', 'tenant_id')
+    role_field = get_role_field(member_model)
+    role_model = role_field.related_model
+    role_tenant_field = getattr(role_model, 'tenant_id', 'tenant_id')
+    user_model = get_user_model()
+
+    members = member_model._base_manager.filter(**{tenant_field: tenant.pk})
+    protected_users = set()
+    if skip_protected and any(field.name == 'is_protected' for field in member_model._meta.concrete_fields):
+        protected_users = set(members.filter(is_protected=True).values_list('user_id', flat=True))
+
+    valid_roles = set()
+    assigned = skipped = 0
+    with transaction.atomic():
+        for chunk in _chunks(assignments, batch_size):
+            # Last occurrence wins; also required by ON CONFLICT DO UPDATE on PostgreSQL
+            rows = {}
+            for user_id, role_id in chunk:
+                user_id = user_model._meta.pk.to_python(user_id)
+                role_id = role_model._meta.pk.to_python(role_id) if role_id not in (None, '') else None
+                if user_id in protected_users:
+                    skipped += 1
+                    continue
+                rows[user_id] = role_id
+            if not rows:
+                continue
+
+            new_roles = {role_id for role_id in rows.values() if role_id is not None} - valid_roles
+            if new_roles:
+                found = set(role_model._base_manager.filter(
+                    **{role_tenant_field: tenant.pk, 'pk__in': new_roles}
+                ).values_list('pk', flat=True))
+                if found != new_roles:
+                    raise ValidationError(
+                        f"Roles {sorted(new_roles - found)} do not belong to this tenant."
+                    )
+                valid_roles |= found
+
+            found_users = set(user_model._base_manager.filter(pk__in=rows).values_list('pk', flat=True))
+            if len(found_users) != len(rows):
+                raise ValidationError(f"Users {sorted(set(rows) - found_users)} do not exist.")
+
+            member_model._base_manager.bulk_create(
+                [
+                    member_model(**{tenant_field: tenant.pk, 'user_id': user_id, role_field.attname: role_id})
+                    for user_id, role_id in rows.items()
+                ],
+                update_conflicts=True,
+                unique_fields=[member_model._meta.get_field(tenant_field).name, 'user'],
+                update_fields=[role_field.name],
+            )
+            sync_effective_permissions(tenant.pk, user_ids=list(rows), member_model=member_model)
+            # One event per batch: a large import must not flood the audit queue
+            audit_log.record(MEMBER_ASSIGN, tenant=tenant, assignments=list(rows.items()))
+            assigned += len(rows)
+
+        invalidate_tenant_permissions(tenant.pk)
+    return BulkAssignResult(assigned, skipped)
@@ -0,0 +1,198 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models.signals import post_delete, post_save
+from django.utils.module_loading import import_string
+from django_multitenant.utils import set_current_tenant, unset_current_tenant
+
+from . import context
+
+
+class TenantCache:
+    """
+    Bounded LRU cache of resolved tenants with a time-to-live.
+    Local to the process: saves/deletes invalidate it in this process,
+    the TTL bounds staleness in the others.
+    """
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, tenant = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return tenant
+
+    def set(self, key, tenant):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, tenant)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, tenant_pk):
+        with self._lock:
+            for key in [key for key, (_, tenant) in self._data.items() if tenant.pk == tenant_pk]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+tenant_cache = TenantCache()
+
+
+def invalidate_tenant_cache(sender, instance, **kwargs):
+    tenant_cache.invalidate(instance.pk)
+
+
+def get_tenant_model():
+    model_path = getattr(settings, 'TENANT_RBAC_TENANT_MODEL', None)
+    if not model_path:
+        raise ImproperlyConfigured(
+            "TenantMiddleware requires TENANT_RBAC_TENANT_MODEL (e.g. 'sandbox.Organization')."
+        )
+    return apps.get_model(model_path)
+
+
+class TenantMiddleware:
+    """
+    Production tenant resolution.
+
+    Settings:
+        TENANT_RBAC_TENANT_MODEL = 'sandbox.Organization'
+        TENANT_RBAC_TENANT_RESOLVERS = ['tenant_rbac.resolvers.URLKwargTenantResolver']
+        TENANT_RBAC_TENANT_CACHE_SIZE = 1024
+        TENANT_RBAC_TENANT_CACHE_TTL = 60  # seconds
+
+    Resolvers are tried in order in process_view (so URL kwargs are
+    available). The tenant is injected in request.tenant, activated in
+    django-multitenant and in tenant_rbac.context (with the request, for
+    the audit log), and reset when the response is returned.
+
+    Works natively under both WSGI and ASGI: in async mode neither the
+    middleware nor a cache hit goes through a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django wraps a sync process_view in sync_to_async under ASGI;
+            # exposing the coroutine avoids that thread hop.
+            self.process_view = self.aprocess_view
+
+        self.tenant_model = get_tenant_model()
+        self.resolvers = [
+            import_string(path)()
+            for path in getattr(
+                settings, 'TENANT_RBAC_TENANT_RESOLVERS', ['tenant_rbac.resolvers.URLKwargTenantResolver']
+            )
+        ]
+
+        tenant_cache.maxsize = getattr(settings, 'TENANT_RBAC_TENANT_CACHE_SIZE', 1024)
+        tenant_cache.ttl = getattr(settings, 'TENANT_RBAC_TENANT_CACHE_TTL', 60)
+        post_save.connect(invalidate_tenant_cache, sender=self.tenant_model, dispatch_uid='tenant_rbac_tenant_cache')
+        post_delete.connect(invalidate_tenant_cache, sender=self.tenant_model, dispatch_uid='tenant_rbac_tenant_cache')
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        try:
+            return self.get_response(request)
+        finally:
+            self.deactivate(request)
+
+    async def __acall__(self, request):
+        try:
+            return await self.get_response(request)
+        finally:
+            self.deactivate(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        lookup = self.get_lookup(request, view_kwargs)
+        if lookup is not None:
+            self.activate(request, self.get_tenant(*lookup))
+        return None
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        lookup = self.get_lookup(request, view_kwargs)
+        if lookup is not None:
+            self.activate(request, await self.aget_tenant(*lookup))
+        return None
+
+    def activate(self, request, tenant):
+        if tenant is None:
+            return
+        request.tenant = tenant
+        request._tenant_rbac_context_token = context.set_current_tenant(tenant)
+        request._tenant_rbac_request_token = context.set_current_request(request)
+        set_current_tenant(tenant)
+
+    def deactivate(self, request):
+        # Never leak the tenant to the next request served by this thread/context
+        token = getattr(request, '_tenant_rbac_context_token', None)
+        if token is not None:
+            try:
+                context.reset_current_tenant(token)
+            except ValueError:
+                # Token created in another context (e.g. a sync_to_async copy)
+                context.set_current_tenant(None)
+        token = getattr(request, '_tenant_rbac_request_token', None)
+        if token is not None:
+            try:
+                context.reset_current_request(token)
+            except ValueError:
+                context.set_current_request(None)
+        unset_current_tenant()
+
+    def get_lookup(self, request, view_kwargs):
+        """Returns the first (lookup_field, value) pair produced by the resolvers."""
+        for resolver in self.resolvers:
+            lookup = resolver.resolve(request, view_kwargs)
+            if lookup is not None:
+                return lookup
+        return None
+
+    def get_tenant(self, lookup_field, value):
+        key = (lookup_field, value)
+        tenant = tenant_cache.get(key)
+        if tenant is None:
+            try:
+                tenant = self.tenant_model._base_manager.get(**{lookup_field: value})
+            except (self.tenant_model.DoesNotExist, ValueError, ValidationError):
+                # Misses are not cached: random hosts could otherwise flush the cache
+                return None
+            tenant_cache.set(key, tenant)
+        # Each request gets its own copy of the shared instance
+        return copy.copy(tenant)
+
+    async def aget_tenant(self, lookup_field, value):
+        key = (lookup_field, value)
+        tenant = tenant_cache.get(key)
+        if tenant is None:
+            try:
+                tenant = await self.tenant_model._base_manager.aget(**{lookup_field: value})
+            except (self.tenant_model.DoesNotExist, ValueError, ValidationError):
+                return None
+            tenant_cache.set(key, tenant)
+        return copy.copy(tenant)
@@ -1,4 +1,9 @@
+import time
+
 from django.core.exceptions import PermissionDenied, ImproperlyConfigured
+from .audit import record_denied
+from .instrumentation import get_request_metrics
+from .permissions import aget_request_user, aget_tenant_permissions, get_tenant_permissions
 
 class TenantRBACMixin:
     """
@@ -31,29 +36,62 @@ class TenantRBACMixin:
         if not tenant:
             return False
 
- 
-        membership_qs = user.tenant_memberships.all()
-        member_model = membership_qs.model
+        # The full permission set is loaded once per request;
+        # every further check is a set lookup without queries.
+        return self.tenant_permission_required in get_tenant_permissions(request, tenant)
+
+    def dispatch(self, request, *args, **kwargs):
+        metrics = get_request_metrics(request)
+        if metrics is None:
+            allowed = self.has_tenant_permission(request)
+        else:
+            start = time.perf_counter()
+            allowed = self.has_tenant_permission(request)
+            metrics.auth_time += time.perf_counter() - start
+        if not allowed:
+            record_denied(request, 'permission', permission=self.tenant_permission_required)
+            raise PermissionDenied("You do not have sufficient permissions in this workspace.")
+        return super().dispatch(request, *args, **kwargs)
+
+
+class AsyncTenantRBACMixin(TenantRBACMixin):
+    """
+    TenantRBACMixin for async views (async def get/post...).
+    The permission check runs on the event loop with the async ORM,
+    so the view never goes through sync_to_async.
+    """
+    async def ahas_tenant_permission(self, request):
+        if not self.tenant_permission_required:
+            return True
+
+        user = await aget_request_user(request)
+        if not user.is_authenticated:
+            return False
 
-        tenant_id_field = getattr(member_model, 'tenant_id', 'tenant_id')
-        lookup = {tenant_id_field: tenant.pk}
+        if user.is_superuser:
+            return True
 
-        try:
-            membership = membership_qs.filter(**lookup).select_related('role').first()
-        except Exception:
+        tenant = self.get_current_tenant(request)
+        if not tenant:
             return False
-        # -------------------------------
 
-        if membership and membership.role:
-            app_label, codename = self.tenant_permission_required.split('.')
-            return membership.role.permissions.filter(
-                content_type__app_label=app_label,
-                codename=codename
-            ).exists()
-            
-        return False
+        permissions = await aget_tenant_permissions(request, tenant, user=user)
+        return self.tenant_permission_required in permissions
 
-    def dispatch(self, request, *args, **kwargs):
-        if not self.has_tenant_permission(request):
+    async def dispatch(self, request, *args, **kwargs):
+        metrics = get_request_metrics(request)
+        if metrics is None:
+            allowed = await self.ahas_tenant_permission(request)
+        else:
+            start = time.perf_counter()
+            allowed = await self.ahas_tenant_permission(request)
+            metrics.auth_time += time.perf_counter() - start
+        if not allowed:
+            # The user is already resolved; record_denied() itself never queries
+            record_denied(
+                request, 'permission', actor=await aget_request_user(request),
+                permission=self.tenant_permission_required,
+            )
             raise PermissionDenied("You do not have sufficient permissions in this workspace.")
-        return super().dispatch(request, *args, **kwargs)
\ No newline at end of file
+        # Skip TenantRBACMixin.dispatch (sync check); View.dispatch returns the handler coroutine
+        return await super(TenantRBACMixin, self).dispatch(request, *args, **kwargs)
\ No newline at end of file
@@ -1,6 +1,10 @@
 from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import Permission
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 class AbstractTenantRole(models.Model):
@@ -40,6 +44,106 @@ class AbstractTenantRole(models.Model):
     def __str__(self):
         return self.name
 
+    @classmethod
+    def with_summary(cls, queryset=None):
+        """
+        Annotates member_count and permission_count on every role.
+
+        Both are correlated COUNT subqueries in the same SELECT (no JOIN
+        fan-out, no GROUP BY over the role columns), so listing any number
+        of roles with their counts is a single query:
+
+            Role.with_summary(Role.objects.filter(organization=tenant))
+        """
+        if queryset is None:
+            queryset = cls._default_manager.all()
+        annotations = {'permission_count': cls._permission_count_subquery()}
+        member_count = cls._member_count_subquery()
+        if member_count is not None:
+            annotations['member_count'] = member_count
+        return queryset.annotate(**annotations)
+
+    @classmethod
+    def _permission_count_subquery(cls):
+        field = cls._meta.get_field('permissions')
+        role_column = f"{field.m2m_field_name()}_id"
+        rows = field.remote_field.through._base_manager.filter(**{role_column: OuterRef('pk')})
+        return cls._count_subquery(rows, role_column)
+
+    @classmethod
+    def _member_count_subquery(cls):
+        # The member model (and its FK name) belong to the concrete project
+        for relation in cls._meta.related_objects:
+            if relation.one_to_many and issubclass(relation.related_model, AbstractTenantMember):
+                break
+        else:
+            return None
+
+        member_model = relation.related_model
+        role_column = relation.field.attname
+        rows = member_model._base_manager.filter(**{role_column: OuterRef('pk')})
+        if hasattr(cls, 'tenant_id') and hasattr(member_model, 'tenant_id'):
+            # Lets the database use (tenant, role) indexes and keeps Citus queries colocated
+            rows = rows.filter(**{member_model.tenant_id: OuterRef(cls.tenant_id)})
+        return cls._count_subquery(rows, role_column)
+
+    @staticmethod
+    def _count_subquery(rows, group_column):
+        counts = rows.order_by().values(group_column).annotate(count=Count('*')).values('count')
+        return Coalesce(Subquery(counts), 0)
+
+
+class PermissionMaskMixin(models.Model):
+    """
+    Optional mixin for Role models: stores a compiled bitmask of the role's
+    permissions (see tenant_rbac.bitmask), kept in sync with 'permissions'.
+
+    Usage:
+        class Role(PermissionMaskMixin, AbstractTenantRole, TenantModel): ...
+
+    Then run 'python manage.py rebuild_permission_masks' once to fill existing roles.
+    """
+    permissions_mask = models.BinaryField(
+        _("Compiled permissions"),
+        default=b'',
+        editable=False,
+        help_text=_("Bitmask of the role permissions (bit N = Permission with id N).")
+    )
+
+    class Meta:
+        abstract = True
+
+
+class RoleHierarchyMixin(models.Model):
+    """
+    Optional mixin for Role models: a role inherits the permissions of its
+    parent roles, transitively (e.g. Manager -> Employee). The closure is
+    materialized in 'ancestors' (see tenant_rbac.hierarchy), so permission
+    checks never walk the hierarchy.
+
+    Usage:
+        class Role(RoleHierarchyMixin, PermissionMaskMixin, AbstractTenantRole, TenantModel): ...
+    """
+    parents = models.ManyToManyField(
+        'self',
+        symmetrical=False,
+        blank=True,
+        related_name='children',
+        verbose_name=_("Inherits from"),
+        help_text=_("Roles whose permissions this role also has.")
+    )
+    # Maintained by tenant_rbac.signals; never edit it directly
+    ancestors = models.ManyToManyField(
+        'self',
+        symmetrical=False,
+        editable=False,
+        related_name='descendants',
+        verbose_name=_("All inherited roles"),
+    )
+
+    class Meta:
+        abstract = True
+
 
 class AbstractTenantMember(models.Model):
     """
@@ -68,4 +172,63 @@ class AbstractTenantMember(models.Model):
         verbose_name_plural = _("Team Members")
 
     def __str__(self):
-        return f"Membership: {self.user}"
\ No newline at end of file
+        return f"Membership: {self.user}"
+
+
+class AbstractTenantUserPermission(models.Model):
+    """
+    Abstract model for the optional effective permission table: one row per
+    permission a user has in a tenant (see tenant_rbac.effective).
+
+    Usage:
+        Inherit from this class and your Tenant base class, add the 'tenant'
+        field (ForeignKey) with a unique (tenant, user, permission_key) and an
+        index on (tenant, permission_key), then set
+        TENANT_RBAC_EFFECTIVE_PERMISSION_MODEL.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name=_("User"),
+    )
+    permission_key = models.CharField(
+        _("Permission"),
+        max_length=255,
+        help_text=_("\"app_label.codename\" of the permission.")
+    )
+
+    class Meta:
+        abstract = True
+        verbose_name = _("Effective Permission")
+        verbose_name_plural = _("Effective Permissions")
+
+    def __str__(self):
+        return f"{self.user}: {self.permission_key}"
+
+
+class AbstractAuditEvent(models.Model):
+    """
+    Abstract model for the optional audit log (see tenant_rbac.audit).
+
+    Usage:
+        Inherit from this class and your Tenant base class, add a nullable
+        'tenant' field (ForeignKey, db_constraint=False so events outlive the
+        tenant) with an index on (tenant, timestamp), then set TENANT_RBAC_AUDIT_MODEL.
+    """
+    timestamp = models.DateTimeField(_("Timestamp"), default=timezone.now)
+    # Not a ForeignKey: events are written later, in bulk, and outlive users
+    actor_id = models.CharField(_("Actor"), max_length=64, null=True, blank=True)
+    action = models.CharField(_("Action"), max_length=50)
+    target_type = models.CharField(_("Target type"), max_length=100, blank=True)
+    target_id = models.CharField(_("Target"), max_length=64, blank=True)
+    data = models.JSONField(_("Details"), default=dict, blank=True, encoder=DjangoJSONEncoder)
+
+    class Meta:
+        abstract = True
+        verbose_name = _("Audit Event")
+        verbose_name_plural = _("Audit Events")
+        ordering = ['-timestamp']
+
+    def __str__(self):
+        return f"{self.timestamp:%Y-%m-%d %H:%M:%S} {self.action}"
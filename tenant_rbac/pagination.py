@@ -0,0 +1,159 @@
+"""
+Keyset (cursor) pagination for tenant querysets.
+
+Rows are ordered on (tenant column, sort key, pk) and each page is fetched
+with "WHERE (sort key, pk) > (last seen values)" instead of OFFSET, so the
+cost of a page does not depend on how deep it is, and no COUNT(*) is run.
+The sort key must be a non-null column of the model.
+"""
+import base64
+import json
+
+from django.core.exceptions import FieldError, ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values, direction):
+    payload = json.dumps({'v': values, 'd': direction}, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values, direction = payload['v'], payload['d']
+    except (ValueError, TypeError, KeyError):
+        raise InvalidCursor('Invalid cursor.')
+    if direction not in ('n', 'p') or not isinstance(values, list) or len(values) != 2:
+        raise InvalidCursor('Invalid cursor.')
+    return values, direction
+
+
+class KeysetPage:
+    """Page API close to Django's Page, without numbers or counts."""
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    def __init__(self, queryset, per_page, ordering='pk', tenant_field=None):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.descending = ordering.startswith('-')
+        self.sort_field = ordering.lstrip('-')
+        self.tenant_field = tenant_field
+
+    def get_order_by(self, reverse=False):
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        fields = [self.sort_field] if self.sort_field == 'pk' else [self.sort_field, 'pk']
+        order_by = [prefix + field for field in fields]
+        if self.tenant_field:
+            # Constant inside a tenant; leading with it lets the DB use (tenant, key, pk) indexes
+            order_by.insert(0, prefix + self.tenant_field)
+        return order_by
+
+    def get_seek_filter(self, values, reverse=False):
+        sort_value, pk = values
+        after = self.descending == reverse
+        op = 'gt' if after else 'lt'
+        if self.sort_field == 'pk':
+            return Q(**{f'pk__{op}': pk})
+        return Q(**{f'{self.sort_field}__{op}': sort_value}) | Q(**{self.sort_field: sort_value, f'pk__{op}': pk})
+
+    def to_python(self, values):
+        """Converts the values of a cursor with the model fields; InvalidCursor if one does not fit."""
+        opts = self.queryset.model._meta
+        fields = [opts.pk if self.sort_field == 'pk' else opts.get_field(self.sort_field), opts.pk]
+        try:
+            values = [field.to_python(value) for field, value in zip(fields, values)]
+        except (ValidationError, ValueError, TypeError):
+            raise InvalidCursor('Invalid cursor.')
+        # Neither the sort key nor the pk can be null
+        if None in values:
+            raise InvalidCursor('Invalid cursor.')
+        return values
+
+    def get_values(self, obj):
+        return [getattr(obj, self.sort_field) if self.sort_field != 'pk' else obj.pk, obj.pk]
+
+    def page(self, cursor=None):
+        backwards = False
+        queryset = self.queryset
+        if cursor:
+            values, direction = decode_cursor(cursor)
+            backwards = direction == 'p'
+            queryset = queryset.filter(self.get_seek_filter(self.to_python(values), reverse=backwards))
+
+        try:
+            # One extra row tells whether there is another page in this direction
+            rows = list(queryset.order_by(*self.get_order_by(reverse=backwards))[:self.per_page + 1])
+        except (ValueError, ValidationError, FieldError):
+            raise InvalidCursor('Invalid cursor.')
+
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = encode_cursor(self.get_values(rows[-1]), 'n')
+            if (has_more and backwards) or (cursor and not backwards):
+                previous_cursor = encode_cursor(self.get_values(rows[0]), 'p')
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    Opt-in keyset pagination for ListViews.
+
+        class MemberListView(TenantListView):
+            paginate_by = 50
+            pagination_mode = 'keyset'
+            keyset_ordering = 'pk'    # or e.g. '-created_at'
+
+    Templates get page_obj.next_cursor / page_obj.previous_cursor,
+    to be sent back as ?cursor=...
+    """
+    pagination_mode = 'offset'
+    keyset_ordering = 'pk'
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        if self.pagination_mode != 'keyset':
+            return super().paginate_queryset(queryset, page_size)
+
+        tenant_field = self.get_tenant_field_name() if hasattr(self, 'get_tenant_field_name') else None
+        paginator = KeysetPaginator(queryset, page_size, ordering=self.keyset_ordering, tenant_field=tenant_field)
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor:
+            raise Http404('Invalid cursor.')
+        return paginator, page, page.object_list, page.has_other_pages()
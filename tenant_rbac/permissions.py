@@ -0,0 +1,229 @@
+from collections import defaultdict
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+
+from .bitmask import mask_has_bit, permission_bits, uses_permission_mask
+from .cache import aget_cached_permissions, get_cached_permissions
+from .catalog import permission_catalog
+from .effective import get_effective_permission_model
+from .hierarchy import uses_role_hierarchy
+from .members import get_role_field
+
+# Attribute used to memoize permission sets on the request object
+REQUEST_CACHE_ATTR = '_tenant_rbac_perms'
+
+
+def _permissions_query(user, tenant):
+    """
+    Builds the single query that resolves the permissions of a user in a tenant.
+    Returns (queryset, kind) or None if the user cannot have any permission:
+    'keys' rows are "app_label.codename" strings, 'ids' Permission ids and
+    'mask' a compiled role mask, both decoded with the permission catalog.
+    """
+    if not user.is_authenticated:
+        return None
+
+    # Global superuser has every permission, as in Django's ModelBackend
+    if user.is_superuser:
+        return Permission.objects.values_list('pk', flat=True), 'ids'
+
+    if not tenant or not hasattr(user, 'tenant_memberships'):
+        return None
+
+    effective_model = get_effective_permission_model()
+    if effective_model is not None:
+        # Materialized (tenant, user, key) rows: a range scan of one covering index
+        return effective_model._base_manager.filter(
+            **{getattr(effective_model, 'tenant_id', 'tenant_id'): tenant.pk, 'user_id': user.pk}
+        ).values_list('permission_key', flat=True), 'keys'
+
+    membership_qs = user.tenant_memberships.filter(
+        **{getattr(user.tenant_memberships.model, 'tenant_id', 'tenant_id'): tenant.pk}
+    )
+
+    role_model = membership_qs.model._meta.get_field('role').related_model
+    if uses_permission_mask(role_model):
+        # Compiled roles: a single read of Member -> Role.permissions_mask
+        return membership_qs.values_list('role__permissions_mask', flat=True)[:1], 'mask'
+
+    # Member -> Role -> role_permissions: integer ids, no join to Permission or ContentType
+    queryset = membership_qs.filter(role__permissions__isnull=False).values_list('role__permissions', flat=True)
+    if uses_role_hierarchy(role_model):
+        # Inherited grants through the materialized closure, in the same query
+        queryset = queryset.union(membership_qs.filter(role__ancestors__permissions__isnull=False).values_list(
+            'role__ancestors__permissions', flat=True,
+        ))
+    return queryset, 'ids'
+
+
+def load_tenant_permissions(user, tenant):
+    """
+    Loads the effective permissions of a user inside a tenant in a single query.
+    Returns a frozenset of "app_label.codename" strings.
+    """
+    query = _permissions_query(user, tenant)
+    if query is None:
+        return frozenset()
+
+    queryset, kind = query
+    try:
+        rows = list(queryset)
+    except Exception:
+        return frozenset()
+
+    if kind == 'mask':
+        return permission_bits.keys_for_mask(rows[0] if rows else None)
+    if kind == 'ids':
+        return permission_catalog.keys_for_ids(rows)
+    return frozenset(rows)
+
+
+async def aload_tenant_permissions(user, tenant):
+    """Async version of load_tenant_permissions() using the async ORM."""
+    query = _permissions_query(user, tenant)
+    if query is None:
+        return frozenset()
+
+    queryset, kind = query
+    try:
+        rows = [row async for row in queryset]
+    except Exception:
+        return frozenset()
+
+    if kind == 'mask':
+        return await permission_bits.akeys_for_mask(rows[0] if rows else None)
+    if kind == 'ids':
+        return await permission_catalog.akeys_for_ids(rows)
+    return frozenset(rows)
+
+
+def tenant_permission_matrix(tenant, user_ids, permission_keys, batch_size=1000):
+    """
+    Evaluates many permissions for many users of a tenant at once, e.g. the
+    actions of every row of a member list. Returns {user_id: frozenset of the
+    granted permission_keys} for every user id. Two grouped queries per batch
+    of users (superusers, then the grants of their memberships), whatever
+    the number of permissions.
+    """
+    user_model = get_user_model()
+    wanted = set(permission_keys)
+    # Unknown keys are never granted, not even to superusers
+    ids_by_key = {entry.key: entry.pk for entry in permission_catalog.entries if entry.key in wanted}
+    user_ids = list(dict.fromkeys(user_ids))
+    matrix = {user_id: frozenset() for user_id in user_ids}
+    if not tenant or not ids_by_key or not hasattr(user_model, 'tenant_memberships'):
+        return matrix
+
+    member_model = user_model.tenant_memberships.field.model
+    role_field = get_role_field(member_model)
+    role_model = role_field.related_model
+    role = role_field.name
+    effective_model = get_effective_permission_model()
+    iterator = iter(user_ids)
+    while chunk := list(islice(iterator, batch_size)):
+        granted = defaultdict(set)
+        for user_id in user_model._default_manager.filter(pk__in=chunk, is_superuser=True).values_list('pk', flat=True):
+            granted[user_id].update(ids_by_key)
+
+        if effective_model is not None:
+            rows = effective_model._base_manager.filter(**{
+                getattr(effective_model, 'tenant_id', 'tenant_id'): tenant.pk,
+                'user_id__in': chunk,
+                'permission_key__in': list(ids_by_key),
+            }).values_list('user_id', 'permission_key')
+        else:
+            memberships = member_model._base_manager.filter(**{
+                getattr(member_model, 'tenant_id', 'tenant_id'): tenant.pk, 'user_id__in': chunk,
+            }).order_by()
+            if uses_permission_mask(role_model):
+                rows = (
+                    (user_id, key)
+                    for user_id, mask in memberships.values_list('user_id', f'{role}__permissions_mask')
+                    for key, bit in ids_by_key.items()
+                    if mask_has_bit(mask, bit)
+                )
+            else:
+                keys_by_id = {pk: key for key, pk in ids_by_key.items()}
+                ids = list(keys_by_id)
+                queryset = memberships.filter(**{f'{role}__permissions__in': ids}).values_list('user_id', f'{role}__permissions')
+                if uses_role_hierarchy(role_model):
+                    queryset = queryset.union(memberships.filter(**{f'{role}__ancestors__permissions__in': ids}).values_list(
+                        'user_id', f'{role}__ancestors__permissions',
+                    ))
+                rows = ((user_id, keys_by_id[pk]) for user_id, pk in queryset)
+
+        for user_id, key in rows:
+            granted[user_id].add(key)
+        matrix.update((user_id, frozenset(keys)) for user_id, keys in granted.items())
+    return matrix
+
+
+def _get_request_cache(request):
+    cache = getattr(request, REQUEST_CACHE_ATTR, None)
+    if cache is None:
+        cache = {}
+        setattr(request, REQUEST_CACHE_ATTR, cache)
+    return cache
+
+
+def get_tenant_permissions(request, tenant=None):
+    """
+    Returns the permission set of request.user in the current tenant.
+    The set is loaded once and memoized on the request, so every further
+    check in the same request is a plain set lookup. If TENANT_RBAC_CACHE
+    is configured, the set is also shared across requests.
+    """
+    if tenant is None:
+        tenant = getattr(request, 'tenant', None)
+
+    user = request.user
+    key = (getattr(tenant, 'pk', None), user.pk)
+
+    cache = _get_request_cache(request)
+    if key not in cache:
+        cache[key] = get_cached_permissions(user, tenant, load_tenant_permissions)
+    return cache[key]
+
+
+async def aget_tenant_permissions(request, tenant=None, user=None):
+    """
+    Async version of get_tenant_permissions(), for async views.
+    Pass 'user' if already resolved (e.g. with 'await request.auser()').
+    """
+    if tenant is None:
+        tenant = getattr(request, 'tenant', None)
+
+    if user is None:
+        user = await aget_request_user(request)
+    key = (getattr(tenant, 'pk', None), user.pk)
+
+    cache = _get_request_cache(request)
+    if key not in cache:
+        cache[key] = await aget_cached_permissions(user, tenant, aload_tenant_permissions)
+    return cache[key]
+
+
+async def aget_request_user(request):
+    """Resolves request.user without blocking the event loop."""
+    if hasattr(request, 'auser'):
+        # Django 5.0+
+        return await request.auser()
+
+    def resolve_user():
+        # Older versions: evaluate the lazy user once, in a thread
+        request.user.is_authenticated
+        return request.user
+
+    return await sync_to_async(resolve_user)()
+
+
+def clear_tenant_permissions(request):
+    """
+    Drops the permissions memoized on the request (e.g. after changing
+    the current user's role in the same request).
+    """
+    if hasattr(request, REQUEST_CACHE_ATTR):
+        delattr(request, REQUEST_CACHE_ATTR)
@@ -0,0 +1,375 @@
+"""
+Declarative default roles and bulk tenant provisioning.
+
+    # settings.py
+    TENANT_RBAC_DEFAULT_ROLES = [
+        {'name': 'Administrator', 'description': 'Full access.', 'is_protected': True,
+         'permissions': ['sandbox.view_role', 'sandbox.add_role']},
+        {'name': 'Member'},
+    ]
+
+provision_default_roles(tenant_pks) creates those roles (and their
+permissions) for many tenants with a few bulk statements per batch;
+provision_tenants(tenants) bulk-inserts the tenants first. Neither sends
+per-row signals. fan_out_role_templates() brings existing tenants up to
+date after a template changes. Both record one ROLE_CREATE and one
+ROLE_GRANT audit event per tenant instead of one per role.
+"""
+from collections import defaultdict, namedtuple
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.models import Permission
+from django.core.exceptions import ImproperlyConfigured
+from django.db import NotSupportedError, connection, transaction
+
+from . import audit
+from .bitmask import mask_from_ids, sync_role_masks, uses_permission_mask
+from .cache import invalidate_tenant_permissions
+from .catalog import permission_catalog
+from .effective import get_effective_permission_model, sync_role_effective_permissions
+from .members import get_member_model, get_role_field
+
+
+class RoleTemplate:
+    """A role every tenant should have."""
+    def __init__(self, name, description='', is_protected=False, permissions=()):
+        self.name = name
+        self.description = description
+        self.is_protected = is_protected
+        self.permissions = tuple(permissions)  # "app_label.codename" keys
+
+    def __repr__(self):
+        return f"<RoleTemplate {self.name!r}>"
+
+    def permission_ids(self):
+        # Unknown keys are reported at startup by the tenant_rbac.E003 check
+        return permission_catalog.ids_for_keys(self.permissions)
+
+    def build(self, role_model, tenant_field, tenant_pk):
+        """Unsaved role of this template for one tenant."""
+        fields = {tenant_field: tenant_pk, 'name': self.name, 'description': self.description}
+        if any(field.name == 'is_protected' for field in role_model._meta.concrete_fields):
+            fields['is_protected'] = self.is_protected
+        if uses_permission_mask(role_model):
+            # Compiled now: the through rows are inserted without m2m_changed
+            fields['permissions_mask'] = mask_from_ids(self.permission_ids())
+        return role_model(**fields)
+
+
+class RoleTemplateRegistry:
+    """
+    The role templates every tenant should have: TENANT_RBAC_DEFAULT_ROLES
+    plus the ones registered in code (e.g. in an AppConfig.ready() that
+    ships new permissions). A registered template replaces the settings
+    one with the same name.
+    """
+    def __init__(self):
+        self._registered = {}
+
+    def register(self, template):
+        self._registered[template.name] = template
+        return template
+
+    def unregister(self, name):
+        self._registered.pop(name, None)
+
+    def all(self):
+        # Settings are read on every call: override_settings() works as expected
+        templates = {spec['name']: RoleTemplate(**spec) for spec in getattr(settings, 'TENANT_RBAC_DEFAULT_ROLES', [])}
+        templates.update(self._registered)
+        return list(templates.values())
+
+    def get(self, name):
+        for template in self.all():
+            if template.name == name:
+                return template
+        raise KeyError(name)
+
+
+role_templates = RoleTemplateRegistry()
+
+
+def get_default_role_templates():
+    return role_templates.all()
+
+
+def get_role_model():
+    return get_role_field(get_member_model()).related_model
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _audit_provisioned(created, granted):
+    """
+    One ROLE_CREATE ({tenant: [role names]}) and one ROLE_GRANT ({tenant:
+    {role name: permission ids}}) event per tenant, as bulk_assign_members
+    records one MEMBER_ASSIGN per chunk.
+    """
+    for tenant_pk, names in created.items():
+        audit.audit_log.record(audit.ROLE_CREATE, tenant=tenant_pk, roles=sorted(names))
+    for tenant_pk, grants in granted.items():
+        audit.audit_log.record(audit.ROLE_GRANT, tenant=tenant_pk, permissions={
+            name: sorted(permission_catalog.keys_for_ids(permission_ids)) for name, permission_ids in grants.items()
+        })
+
+
+def provision_default_roles(tenant_pks, templates=None, role_model=None, batch_size=1000):
+    """
+    Creates the template roles of each tenant that does not have them yet
+    (matched by name) and grants the template permissions to the roles it
+    creates. Per batch of tenants: one INSERT of roles, one SELECT of their
+    ids and one INSERT of role_permissions rows. Returns the number of roles created.
+    """
+    templates = get_default_role_templates() if templates is None else templates
+    role_model = role_model or get_role_model()
+    if not templates:
+        return 0
+
+    tenant_field = getattr(role_model, 'tenant_id', 'tenant_id')
+    names = [template.name for template in templates]
+    grants = {template.name: template.permission_ids() for template in templates}
+    field = role_model._meta.get_field('permissions')
+    through = field.remote_field.through
+    role_column = f"{field.m2m_field_name()}_id"
+    perm_column = f"{field.m2m_reverse_field_name()}_id"
+
+    created = 0
+    uses_audit = audit.get_audit_model() is not None
+    with transaction.atomic():
+        for batch in _batches(tenant_pks, batch_size):
+            existing = set(role_model._base_manager.filter(
+                **{f'{tenant_field}__in': batch, 'name__in': names}
+            ).values_list(tenant_field, 'name'))
+            roles = [
+                template.build(role_model, tenant_field, tenant_pk)
+                for tenant_pk in batch
+                for template in templates
+                if (tenant_pk, template.name) not in existing
+            ]
+            if not roles:
+                continue
+            role_model._base_manager.bulk_create(roles)
+            created += len(roles)
+
+            if any(grants.values()):
+                # Read the ids back: not every database returns them from bulk_create
+                new_roles = role_model._base_manager.filter(
+                    **{f'{tenant_field}__in': batch, 'name__in': names}
+                ).values_list('pk', tenant_field, 'name')
+                through._base_manager.bulk_create([
+                    through(**{role_column: role_id, perm_column: perm_id})
+                    for role_id, tenant_pk, name in new_roles
+                    if (tenant_pk, name) not in existing
+                    for perm_id in grants[name]
+                ])
+
+            if uses_audit:
+                created_names, granted = defaultdict(list), defaultdict(dict)
+                for role in roles:
+                    tenant_pk = getattr(role, tenant_field)
+                    created_names[tenant_pk].append(role.name)
+                    if grants[role.name]:
+                        granted[tenant_pk][role.name] = grants[role.name]
+                _audit_provisioned(created_names, granted)
+    return created
+
+
+def provision_tenants(tenants, templates=None, role_model=None, batch_size=1000):
+    """
+    Bulk-inserts unsaved tenant instances and creates their default roles.
+    Requires a database that returns primary keys from bulk inserts
+    (PostgreSQL, SQLite 3.35+, MariaDB 10.5+). Returns the saved tenants.
+    """
+    role_model = role_model or get_role_model()
+    tenant_model = role_model._meta.get_field(getattr(role_model, 'tenant_id', 'tenant_id')).related_model
+
+    saved = []
+    with transaction.atomic():
+        for batch in _batches(tenants, batch_size):
+            batch = tenant_model._base_manager.bulk_create(batch)
+            if any(tenant.pk is None for tenant in batch):
+                raise NotSupportedError(
+                    "provision_tenants() needs a database that returns primary keys from bulk inserts."
+                )
+            provision_default_roles(
+                [tenant.pk for tenant in batch], templates=templates, role_model=role_model, batch_size=batch_size
+            )
+            saved.extend(batch)
+    return saved
+
+
+FanOutResult = namedtuple('FanOutResult', ['tenants', 'roles', 'permissions', 'last_tenant'])
+
+
+class _FanOutSQL:
+    """Set-based statements of fan_out_role_templates() for one role model."""
+    def __init__(self, role_model):
+        qn = connection.ops.quote_name
+        opts = role_model._meta
+        if opts.auto_field is None or opts.pk is not opts.auto_field:
+            raise ImproperlyConfigured("fan_out_role_templates() needs a role model with an auto-incrementing primary key.")
+        self.role_model = role_model
+        self.tenant_field = opts.get_field(getattr(role_model, 'tenant_id', 'tenant_id'))
+        self.tenant_model = self.tenant_field.related_model
+        field = opts.get_field('permissions')
+        through = field.remote_field.through._meta
+
+        self.tenants = qn(self.tenant_model._meta.db_table)
+        self.tenant_pk = qn(self.tenant_model._meta.pk.column)
+        self.roles = qn(opts.db_table)
+        self.role_pk = qn(opts.pk.column)
+        self.role_tenant = qn(self.tenant_field.column)
+        self.role_name = qn(opts.get_field('name').column)
+        self.through = qn(through.db_table)
+        self.through_role = qn(through.get_field(field.m2m_field_name()).column)
+        self.through_permission = qn(through.get_field(field.m2m_reverse_field_name()).column)
+        self.permissions = qn(Permission._meta.db_table)
+        self.permission_pk = qn(Permission._meta.pk.column)
+
+    def _range(self, column, low, high):
+        if low is None:
+            return f"{column} <= %s", [high]
+        return f"{column} > %s AND {column} <= %s", [low, high]
+
+    def missing_roles(self, template, low, high):
+        """FROM clause of the tenants in (low, high] that lack the template role."""
+        tenants, params = self._range(f"t.{self.tenant_pk}", low, high)
+        sql = (
+            f"FROM {self.tenants} t WHERE {tenants} AND NOT EXISTS ("
+            f"SELECT 1 FROM {self.roles} r WHERE r.{self.role_tenant} = t.{self.tenant_pk} AND r.{self.role_name} = %s)"
+        )
+        return sql, params + [template.name]
+
+    def role_values(self, template):
+        """Columns and values of a template role, model defaults and pre_save() included."""
+        role = template.build(self.role_model, self.tenant_field.attname, None)
+        columns, values = [], []
+        for field in self.role_model._meta.concrete_fields:
+            if field.primary_key or field == self.tenant_field:
+                continue
+            columns.append(connection.ops.quote_name(field.column))
+            values.append(field.get_db_prep_save(field.pre_save(role, True), connection))
+        return columns, values
+
+    def missing_permissions(self, template, permission_ids, low, high):
+        """FROM clause of the (role, permission) pairs the template roles of the range lack."""
+        tenants, params = self._range(f"r.{self.role_tenant}", low, high)
+        placeholders = ', '.join(['%s'] * len(permission_ids))
+        sql = (
+            f"FROM {self.roles} r INNER JOIN {self.permissions} p ON p.{self.permission_pk} IN ({placeholders}) "
+            f"WHERE {tenants} AND r.{self.role_name} = %s AND NOT EXISTS ("
+            f"SELECT 1 FROM {self.through} x "
+            f"WHERE x.{self.through_role} = r.{self.role_pk} AND x.{self.through_permission} = p.{self.permission_pk})"
+        )
+        return sql, list(permission_ids) + params + [template.name]
+
+    def apply(self, cursor, template, low, high, dry_run=False, audited=None):
+        """
+        Returns (roles created, permissions granted) for the tenants in (low,
+        high]. 'audited' is an optional (created, granted) pair of dicts
+        filled for _audit_provisioned(), at the cost of one SELECT each.
+        """
+        roles_from, roles_params = self.missing_roles(template, low, high)
+        permission_ids = sorted(template.permission_ids())
+        if permission_ids:
+            grants_from, grants_params = self.missing_permissions(template, permission_ids, low, high)
+
+        if dry_run:
+            cursor.execute(f"SELECT COUNT(*) {roles_from}", roles_params)
+            roles = cursor.fetchone()[0]
+            permissions = roles * len(permission_ids)
+            if permission_ids:
+                cursor.execute(f"SELECT COUNT(*) {grants_from}", grants_params)
+                permissions += cursor.fetchone()[0]
+            return roles, permissions
+
+        stale = []
+        uses_mask = uses_permission_mask(self.role_model)
+        uses_effective = get_effective_permission_model() is not None
+        if permission_ids and (uses_mask or uses_effective):
+            # Existing roles about to gain permissions; new roles get a precompiled mask and have no members
+            cursor.execute(f"SELECT DISTINCT r.{self.role_pk} {grants_from}", grants_params)
+            stale = [row[0] for row in cursor.fetchall()]
+
+        if audited is not None:
+            cursor.execute(f"SELECT t.{self.tenant_pk} {roles_from}", roles_params)
+            for (tenant_pk,) in cursor.fetchall():
+                audited[0][tenant_pk].append(template.name)
+
+        columns, values = self.role_values(template)
+        placeholders = ', '.join(['%s'] * len(values))
+        cursor.execute(
+            f"INSERT INTO {self.roles} ({self.role_tenant}, {', '.join(columns)}) "
+            f"SELECT t.{self.tenant_pk}, {placeholders} {roles_from}",
+            values + roles_params,
+        )
+        roles = cursor.rowcount
+
+        permissions = 0
+        if permission_ids and audited is not None:
+            # After the role INSERT: the new roles get their grants too
+            cursor.execute(f"SELECT r.{self.role_tenant}, p.{self.permission_pk} {grants_from}", grants_params)
+            for tenant_pk, permission_id in cursor.fetchall():
+                audited[1][tenant_pk].setdefault(template.name, []).append(permission_id)
+        if permission_ids:
+            cursor.execute(
+                f"INSERT INTO {self.through} ({self.through_role}, {self.through_permission}) "
+                f"SELECT r.{self.role_pk}, p.{self.permission_pk} {grants_from}",
+                grants_params,
+            )
+            permissions = cursor.rowcount
+        if stale and uses_mask:
+            sync_role_masks(self.role_model, stale)
+        if stale and uses_effective:
+            sync_role_effective_permissions(self.role_model, stale)
+        return roles, permissions
+
+
+def fan_out_role_templates(templates=None, role_model=None, batch_size=1000, start_after=None,
+                           dry_run=False, progress=None):
+    """
+    Brings existing tenants up to date with the role templates: creates the
+    template roles a tenant lacks and grants the template permissions its
+    roles (matched by name) lack. Nothing is ever revoked.
+
+    Tenants are processed in primary key order, one transaction per batch.
+    Per batch and template, one INSERT ... SELECT ... WHERE NOT EXISTS adds
+    the roles and another the role_permissions rows; the cache versions of
+    the batch are bumped once. progress(result) is called after every batch
+    with the running totals: pass its last_tenant as start_after to resume
+    an interrupted run. Returns the final FanOutResult.
+    """
+    templates = get_default_role_templates() if templates is None else templates
+    statements = _FanOutSQL(role_model or get_role_model())
+    tenants = statements.tenant_model._base_manager.order_by('pk').values_list('pk', flat=True)
+
+    result = FanOutResult(0, 0, 0, start_after)
+    uses_audit = audit.get_audit_model() is not None
+    while True:
+        batch = tenants.filter(pk__gt=result.last_tenant) if result.last_tenant is not None else tenants
+        batch = list(batch[:batch_size])
+        if not batch:
+            return result
+
+        roles = permissions = 0
+        audited = (defaultdict(list), defaultdict(dict)) if uses_audit and not dry_run else None
+        with transaction.atomic(), connection.cursor() as cursor:
+            for template in templates:
+                created, granted = statements.apply(cursor, template, result.last_tenant, batch[-1], dry_run, audited)
+                roles += created
+                permissions += granted
+            if permissions and not dry_run:
+                invalidate_tenant_permissions(*batch)
+            if audited is not None:
+                _audit_provisioned(*audited)
+
+        result = FanOutResult(
+            result.tenants + len(batch), result.roles + roles, result.permissions + permissions, batch[-1]
+        )
+        if progress is not None:
+            progress(result)
@@ -0,0 +1,71 @@
+"""
+Strategies used by TenantMiddleware to find the tenant of a request.
+
+Each resolver returns a (lookup_field, value) pair or None. Customize them
+by subclassing, e.g.:
+
+    class SlugSubdomainResolver(SubdomainTenantResolver):
+        lookup_field = 'slug'
+        base_domain = 'saas.com'
+"""
+
+
+class BaseTenantResolver:
+    lookup_field = 'pk'
+
+    def get_value(self, request, view_kwargs):
+        raise NotImplementedError('Subclasses must implement get_value()')
+
+    def resolve(self, request, view_kwargs):
+        value = self.get_value(request, view_kwargs)
+        if value in (None, ''):
+            return None
+        return self.lookup_field, str(value)
+
+
+class SubdomainTenantResolver(BaseTenantResolver):
+    """acme.saas.com -> 'acme'."""
+    base_domain = None  # e.g. 'saas.com'. If None, the first label of a 3+ label host is used.
+
+    def get_value(self, request, view_kwargs):
+        host = request.get_host().split(':')[0].lower()
+        if self.base_domain:
+            suffix = '.' + self.base_domain.lower()
+            if not host.endswith(suffix):
+                return None
+            subdomain = host[:-len(suffix)]
+            # Only direct subdomains: a.b.saas.com is rejected
+            return subdomain if '.' not in subdomain else None
+
+        labels = host.split('.')
+        return labels[0] if len(labels) > 2 else None
+
+
+class HeaderTenantResolver(BaseTenantResolver):
+    """
+    X-Tenant-ID: 42. Membership is still checked by TenantRBACMixin,
+    but only trust this header behind a gateway that sets it.
+    """
+    header = 'HTTP_X_TENANT_ID'
+
+    def get_value(self, request, view_kwargs):
+        return request.META.get(self.header)
+
+
+class URLKwargTenantResolver(BaseTenantResolver):
+    """path('<int:tenant_id>/dashboard/', ...)"""
+    url_kwarg = 'tenant_id'
+
+    def get_value(self, request, view_kwargs):
+        return (view_kwargs or {}).get(self.url_kwarg)
+
+
+class SessionTenantResolver(BaseTenantResolver):
+    """request.session['tenant_id'], e.g. set by a "switch workspace" view."""
+    session_key = 'tenant_id'
+
+    def get_value(self, request, view_kwargs):
+        session = getattr(request, 'session', None)
+        if session is None:
+            return None
+        return session.get(self.session_key)
@@ -0,0 +1,259 @@
+"""
+Set-based changes to the permissions of many roles.
+
+    sync_role_permissions(Role, {role_id: {perm_id, ...}, ...})
+    grant_permissions(Role.objects.filter(name='Editor'), ['sandbox.add_role'])
+    revoke_permissions(Role.objects.filter(is_protected=False), ['sandbox.delete_role'])
+
+The role_permissions table is diffed and changed with a few queries per
+batch of roles (bulk INSERT / DELETE) in one transaction, instead of
+role.permissions.set() role by role. m2m_changed is not sent: compiled
+masks, effective permission rows and the permission cache are updated
+once for every touched role, and one audit event is recorded per role.
+refresh_role_hierarchy() does the same after parent roles change.
+"""
+from collections import defaultdict, namedtuple
+from itertools import islice
+
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db import transaction
+
+from . import audit
+from .bitmask import sync_role_masks, uses_permission_mask
+from .cache import invalidate_tenant_permissions
+from .catalog import permission_catalog
+from .effective import sync_role_effective_permissions
+from .hierarchy import get_descendant_ids, rebuild_role_closure
+from .permissions import get_tenant_permissions
+
+PermissionSyncResult = namedtuple('PermissionSyncResult', ['roles', 'added', 'removed'])
+
+
+def _permission_ids(permissions):
+    """Accepts Permission ids or "app_label.codename" keys; unknown values raise ValidationError."""
+    ids_by_key = {entry.key: entry.pk for entry in permission_catalog.entries}
+    known_ids = set(ids_by_key.values())
+    ids, unknown = set(), []
+    for value in permissions:
+        permission_id = ids_by_key.get(value) if isinstance(value, str) else int(value)
+        if permission_id not in known_ids:
+            unknown.append(str(value))
+        ids.add(permission_id)
+    if unknown:
+        raise ValidationError(f"Unknown permissions: {', '.join(sorted(unknown))}.")
+    return ids
+
+
+def _allowed_ids(request):
+    """Permission ids the request user may grant (None: no limit)."""
+    if request is None or request.user.is_superuser:
+        return None
+    tenant = getattr(request, 'tenant', None)
+    if tenant is None:
+        return set()
+    # Same rule as RoleFormMixin: only permissions the user has in this tenant
+    return permission_catalog.ids_for_keys(get_tenant_permissions(request, tenant))
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class _PermissionDiff:
+    """Collects the rows of one bulk change and applies them."""
+    def __init__(self, role_model, request=None, include_protected=False):
+        self.role_model = role_model
+        self.request = request
+        self.include_protected = include_protected
+        field = role_model._meta.get_field('permissions')
+        self.through = field.remote_field.through
+        self.role_column = f"{field.m2m_field_name()}_id"
+        self.perm_column = f"{field.m2m_reverse_field_name()}_id"
+        self.tenant_field = getattr(role_model, 'tenant_id', 'tenant_id')
+        self.has_protected = any(f.name == 'is_protected' for f in role_model._meta.concrete_fields)
+        self.allowed = _allowed_ids(request)
+        self.touched_roles = set()
+        self.tenant_pks = set()
+        self.added = self.removed = 0
+
+    def load_roles(self, queryset):
+        """Returns {role_id: tenant_pk}, enforcing is_protected and the request tenant."""
+        fields = ['pk', self.tenant_field] + (['is_protected'] if self.has_protected else [])
+        roles = {}
+        for row in queryset.values_list(*fields):
+            role_id, tenant_pk = row[0], row[1]
+            if self.has_protected and row[2] and not self.include_protected:
+                self.deny(f"Role {role_id} is protected and cannot be modified.", 'protected', role=role_id)
+            roles[role_id] = tenant_pk
+
+        if self.allowed is not None:
+            tenant = getattr(self.request, 'tenant', None)
+            if any(tenant is None or pk != tenant.pk for pk in roles.values()):
+                self.deny("You can only change roles of the current workspace.", 'tenant')
+        return roles
+
+    def check_grants(self, permission_ids):
+        if self.allowed is not None and not set(permission_ids) <= self.allowed:
+            # Anti-escalation: nobody grants what they do not have
+            self.deny(
+                "You cannot grant permissions you do not have in this workspace.", 'escalation',
+                permissions=sorted(permission_catalog.keys_for_ids(set(permission_ids) - self.allowed)),
+            )
+
+    def deny(self, message, reason, **data):
+        if self.request is not None:
+            audit.record_denied(self.request, reason, **data)
+        raise PermissionDenied(message)
+
+    def existing(self, role_ids, permission_ids=None):
+        rows = self.through._base_manager.filter(**{f"{self.role_column}__in": role_ids})
+        if permission_ids is not None:
+            rows = rows.filter(**{f"{self.perm_column}__in": permission_ids})
+        return rows.values_list('pk', self.role_column, self.perm_column)
+
+    def apply(self, roles, to_add, to_delete):
+        """to_add: [(role_id, perm_id)], to_delete: [(through row pk, role_id, perm_id)]."""
+        if to_delete:
+            self.through._base_manager.filter(pk__in=[row_pk for row_pk, _, _ in to_delete]).delete()
+        if to_add:
+            self.through._base_manager.bulk_create(
+                [self.through(**{self.role_column: role_id, self.perm_column: perm_id}) for role_id, perm_id in to_add],
+                ignore_conflicts=True,
+            )
+        changed = {role_id for role_id, _ in to_add} | {role_id for _, role_id, _ in to_delete}
+        self.touched_roles |= changed
+        self.tenant_pks |= {roles[role_id] for role_id in changed}
+        self.added += len(to_add)
+        self.removed += len(to_delete)
+        if audit.get_audit_model() is not None:
+            self.audit(roles, audit.ROLE_GRANT, to_add)
+            self.audit(roles, audit.ROLE_REVOKE, [(role_id, perm_id) for _, role_id, perm_id in to_delete])
+
+    def audit(self, roles, action, pairs):
+        by_role = defaultdict(set)
+        for role_id, perm_id in pairs:
+            by_role[role_id].add(perm_id)
+        actor = getattr(self.request, 'user', None)
+        for role_id, perm_ids in by_role.items():
+            audit.audit_log.record(
+                action, tenant=roles[role_id], actor=actor, target=self.role_model(pk=role_id),
+                permissions=sorted(permission_catalog.keys_for_ids(perm_ids)),
+            )
+
+    def finish(self):
+        if self.touched_roles:
+            if uses_permission_mask(self.role_model):
+                sync_role_masks(self.role_model, self.touched_roles)
+            sync_role_effective_permissions(self.role_model, self.touched_roles)
+            invalidate_tenant_permissions(*self.tenant_pks)
+        return PermissionSyncResult(len(self.touched_roles), self.added, self.removed)
+
+
+def sync_role_permissions(role_model, mapping, request=None, include_protected=False, batch_size=500):
+    """
+    Makes each role in 'mapping' ({role_id: permissions}) have exactly those
+    permissions (ids or "app_label.codename" keys).
+
+    Raises PermissionDenied for protected roles (unless include_protected=True)
+    and, when 'request' is given and its user is not a superuser, for roles
+    outside request.tenant or grants of permissions the user does not have.
+    Nothing is written if an error is raised.
+    """
+    desired = {role_id: _permission_ids(perms) for role_id, perms in mapping.items()}
+    diff = _PermissionDiff(role_model, request, include_protected)
+
+    with transaction.atomic():
+        for batch in _batches(desired, batch_size):
+            roles = diff.load_roles(role_model._base_manager.filter(pk__in=batch))
+            missing = set(batch) - set(roles)
+            if missing:
+                raise ValidationError(f"Roles {sorted(missing)} do not exist.")
+
+            current = defaultdict(set)
+            to_delete = []
+            for row_pk, role_id, perm_id in diff.existing(batch):
+                if perm_id in desired[role_id]:
+                    current[role_id].add(perm_id)
+                else:
+                    to_delete.append((row_pk, role_id, perm_id))
+
+            to_add = [
+                (role_id, perm_id)
+                for role_id in batch
+                for perm_id in desired[role_id] - current[role_id]
+            ]
+            diff.check_grants({perm_id for _, perm_id in to_add})
+            diff.apply(roles, to_add, to_delete)
+        return diff.finish()
+
+
+def grant_permissions(roles, permissions, request=None, include_protected=False, batch_size=500):
+    """
+    Adds the permissions to every role of the 'roles' queryset (e.g. all
+    "Editor" roles of every tenant). Protected roles are skipped unless
+    include_protected=True; 'request' applies the same checks as sync_role_permissions.
+    """
+    permission_ids = _permission_ids(permissions)
+    diff = _PermissionDiff(roles.model, request, include_protected)
+    diff.check_grants(permission_ids)
+    if diff.has_protected and not include_protected:
+        roles = roles.exclude(is_protected=True)
+
+    with transaction.atomic():
+        role_map = diff.load_roles(roles)
+        for batch in _batches(role_map, batch_size):
+            present = {(role_id, perm_id) for _, role_id, perm_id in diff.existing(batch, permission_ids)}
+            to_add = [
+                (role_id, perm_id)
+                for role_id in batch
+                for perm_id in permission_ids
+                if (role_id, perm_id) not in present
+            ]
+            diff.apply(role_map, to_add, [])
+        return diff.finish()
+
+
+def revoke_permissions(roles, permissions, request=None, include_protected=False, batch_size=500):
+    """Removes the permissions from every role of the 'roles' queryset (see grant_permissions)."""
+    permission_ids = _permission_ids(permissions)
+    diff = _PermissionDiff(roles.model, request, include_protected)
+    if diff.has_protected and not include_protected:
+        roles = roles.exclude(is_protected=True)
+
+    with transaction.atomic():
+        role_map = diff.load_roles(roles)
+        for batch in _batches(role_map, batch_size):
+            to_delete = list(diff.existing(batch, permission_ids))
+            diff.apply(role_map, [], to_delete)
+        return diff.finish()
+
+
+def refresh_role_hierarchy(role_model, role_ids, recompile=False):
+    """
+    Updates the stored ancestors of the given roles and of their descendants
+    after their parents changed, then their compiled masks, the effective
+    permissions of their members and the permission cache of their tenants.
+    Returns the ids of the roles whose closure changed.
+
+    With recompile=True the masks, effective rows and cache of every one of
+    those roles are refreshed even if its stored closure did not change:
+    after a role is deleted, the cascade has already removed the closure
+    rows pointing at it, but not the permissions compiled from them.
+    """
+    role_ids = set(role_ids)
+    if not role_ids:
+        return set()
+    role_ids |= get_descendant_ids(role_model, role_ids)
+    changed = rebuild_role_closure(role_model, role_ids)
+    stale = dict(changed)
+    if recompile:
+        tenant_field = getattr(role_model, 'tenant_id', 'tenant_id')
+        stale.update(role_model._base_manager.filter(pk__in=role_ids).order_by().values_list('pk', tenant_field))
+    if stale:
+        if uses_permission_mask(role_model):
+            sync_role_masks(role_model, stale)
+        sync_role_effective_permissions(role_model, stale)
+        invalidate_tenant_permissions(*set(stale.values()))
+    return set(changed)
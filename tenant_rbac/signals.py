@@ -0,0 +1,258 @@
+from django.apps import apps
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+
+from . import audit
+from .bitmask import sync_role_masks, uses_permission_mask
+from .cache import invalidate_tenant_permissions
+from .catalog import permission_catalog
+from .effective import get_effective_permission_model, sync_effective_permissions, sync_role_effective_permissions
+from .hierarchy import check_parents, get_descendant_ids, uses_role_hierarchy
+from .members import get_member_model, get_role_field
+from .models import AbstractTenantMember, AbstractTenantRole
+from .roles import refresh_role_hierarchy
+
+
+def get_tenant_pk(instance):
+    """Returns the tenant value of a tenant model instance (e.g. organization_id)."""
+    tenant_field = getattr(type(instance), 'tenant_id', 'tenant_id')
+    return getattr(instance, tenant_field, None)
+
+
+def invalidate_on_change(sender, instance, **kwargs):
+    # Role edits, role deletions (members are SET_NULL without signals)
+    # and membership changes, including role reassignment.
+    invalidate_tenant_permissions(get_tenant_pk(instance))
+
+
+def invalidate_on_permissions_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not reverse:
+        # role.permissions.add/remove/set/clear()
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            invalidate_tenant_permissions(get_tenant_pk(instance))
+        return
+
+    # permission.role_set.add/remove/clear(): 'model' is the role model
+    tenant_field = getattr(model, 'tenant_id', 'tenant_id')
+    if action in ('post_add', 'post_remove') and pk_set:
+        roles = model._base_manager.filter(pk__in=pk_set)
+    elif action == 'pre_clear':
+        roles = model._base_manager.filter(permissions=instance)
+    else:
+        return
+    invalidate_tenant_permissions(*roles.values_list(tenant_field, flat=True).distinct())
+
+
+def sync_masks_on_permissions_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            sync_role_masks(type(instance), [instance.pk])
+        return
+
+    # permission.role_set.add/remove/clear(): 'model' is the role model
+    if action in ('post_add', 'post_remove') and pk_set:
+        sync_role_masks(model, pk_set)
+    elif action == 'pre_clear':
+        # After the clear the affected roles can no longer be found
+        instance._tenant_rbac_cleared_roles = list(
+            model._base_manager.filter(permissions=instance).values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        sync_role_masks(model, instance.__dict__.pop('_tenant_rbac_cleared_roles', []))
+
+
+def sync_effective_on_member_change(sender, instance, **kwargs):
+    sync_effective_permissions(get_tenant_pk(instance), user_ids=[instance.user_id], member_model=sender)
+
+
+def sync_effective_on_permissions_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            sync_role_effective_permissions(type(instance), [instance.pk])
+        return
+
+    # permission.role_set.add/remove/clear(): 'model' is the role model
+    if action in ('post_add', 'post_remove') and pk_set:
+        sync_role_effective_permissions(model, pk_set)
+    elif action == 'pre_clear':
+        instance._tenant_rbac_effective_roles = list(
+            model._base_manager.filter(permissions=instance).values_list('pk', flat=True)
+        )
+    elif action == 'post_clear':
+        sync_role_effective_permissions(model, instance.__dict__.pop('_tenant_rbac_effective_roles', []))
+
+
+def remember_members_on_role_delete(sender, instance, **kwargs):
+    # Members are SET_NULL without signals; their rows go in post_delete
+    member_model = get_member_model()
+    instance._tenant_rbac_member_users = list(
+        member_model._base_manager.filter(**{get_role_field(member_model).attname: instance.pk})
+        .values_list('user_id', flat=True)
+    )
+
+
+def sync_members_on_role_delete(sender, instance, **kwargs):
+    user_ids = instance.__dict__.pop('_tenant_rbac_member_users', [])
+    if user_ids:
+        sync_effective_permissions(get_tenant_pk(instance), user_ids=user_ids)
+
+
+def refresh_on_parents_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    # role.parents.add(...) (instance = child) or role.children.add(...) (instance = parent)
+    if action == 'pre_add' and pk_set:
+        children, parents = (pk_set, [instance.pk]) if reverse else ([instance.pk], pk_set)
+        check_parents(model, children, parents)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        refresh_role_hierarchy(model, pk_set if reverse else [instance.pk])
+    elif action == 'pre_clear' and reverse:
+        # After the clear the former children can no longer be found
+        instance._tenant_rbac_cleared_children = list(instance.children.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        children = instance.__dict__.pop('_tenant_rbac_cleared_children', []) if reverse else [instance.pk]
+        refresh_role_hierarchy(model, children)
+
+
+def remember_descendants_on_delete(sender, instance, **kwargs):
+    instance._tenant_rbac_descendants = get_descendant_ids(sender, [instance.pk])
+
+
+def refresh_descendants_on_delete(sender, instance, **kwargs):
+    # Their ancestors reached through the deleted role are gone. The cascade
+    # already removed those closure rows, so recompile them unconditionally.
+    refresh_role_hierarchy(sender, instance.__dict__.pop('_tenant_rbac_descendants', ()), recompile=True)
+
+
+def audit_role_saved(sender, instance, created, **kwargs):
+    if created:
+        audit.audit_log.record(audit.ROLE_CREATE, tenant=get_tenant_pk(instance), target=instance, name=instance.name)
+
+
+def audit_role_deleted(sender, instance, **kwargs):
+    audit.audit_log.record(audit.ROLE_DELETE, tenant=get_tenant_pk(instance), target=instance, name=instance.name)
+
+
+def audit_member_saved(sender, instance, created, **kwargs):
+    audit.audit_log.record(
+        audit.MEMBER_ADD if created else audit.MEMBER_CHANGE,
+        tenant=get_tenant_pk(instance),
+        target=instance,
+        user=instance.user_id,
+        role=getattr(instance, get_role_field(sender).attname),
+    )
+
+
+def audit_member_deleted(sender, instance, **kwargs):
+    audit.audit_log.record(
+        audit.MEMBER_REMOVE, tenant=get_tenant_pk(instance), target=instance, user=instance.user_id,
+    )
+
+
+def audit_permissions_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    actions = {'post_add': audit.ROLE_GRANT, 'post_remove': audit.ROLE_REVOKE, 'post_clear': audit.ROLE_REVOKE}
+    if not reverse:
+        if action == 'pre_clear':
+            # After the clear the revoked permissions can no longer be found
+            instance._tenant_rbac_audit_cleared = list(instance.permissions.values_list('pk', flat=True))
+            return
+        if action == 'post_clear':
+            pk_set = instance.__dict__.pop('_tenant_rbac_audit_cleared', [])
+        if action in actions and pk_set:
+            audit.audit_log.record(
+                actions[action], tenant=get_tenant_pk(instance), target=instance,
+                permissions=sorted(permission_catalog.keys_for_ids(pk_set)),
+            )
+        return
+
+    # permission.role_set.add/remove/clear(): one event per role
+    tenant_field = getattr(model, 'tenant_id', 'tenant_id')
+    if action == 'pre_clear':
+        instance._tenant_rbac_audit_cleared = list(
+            model._base_manager.filter(permissions=instance).values_list('pk', tenant_field)
+        )
+        return
+    if action == 'post_clear':
+        roles = instance.__dict__.pop('_tenant_rbac_audit_cleared', [])
+    elif action in actions and pk_set:
+        roles = model._base_manager.filter(pk__in=pk_set).values_list('pk', tenant_field)
+    else:
+        return
+    permissions = sorted(permission_catalog.keys_for_ids([instance.pk]))
+    for role_id, tenant_pk in roles:
+        audit.audit_log.record(actions[action], tenant=tenant_pk, target=model(pk=role_id), permissions=permissions)
+
+
+def audit_parents_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    # Recorded on the role whose relation was edited (the child, or the parent for role.children)
+    if action in ('post_add', 'post_remove') and pk_set:
+        change = {'added' if action == 'post_add' else 'removed': sorted(pk_set)}
+    elif action == 'post_clear':
+        change = {'cleared': True}
+    else:
+        return
+    audit.audit_log.record(
+        audit.ROLE_PARENTS, tenant=get_tenant_pk(instance), target=instance,
+        relation='children' if reverse else 'parents', **change,
+    )
+
+
+def connect_signals():
+    """
+    Connects the mask sync, effective permission sync, audit and cache
+    invalidation handlers to every concrete Role and Member model.
+    Called from TenantRbacConfig.ready(), once all models are loaded.
+    """
+    uses_effective = get_effective_permission_model() is not None
+    uses_audit = audit.get_audit_model() is not None
+    for model in apps.get_models():
+        if uses_effective and issubclass(model, AbstractTenantMember):
+            uid = f"tenant_rbac_effective_{model._meta.label_lower}"
+            post_save.connect(sync_effective_on_member_change, sender=model, dispatch_uid=uid)
+            post_delete.connect(sync_effective_on_member_change, sender=model, dispatch_uid=uid)
+
+        if issubclass(model, AbstractTenantRole):
+            # Masks and effective rows are synced before the cache is invalidated
+            if uses_permission_mask(model):
+                m2m_changed.connect(
+                    sync_masks_on_permissions_changed,
+                    sender=model.permissions.through,
+                    dispatch_uid=f"tenant_rbac_mask_{model._meta.label_lower}_permissions",
+                )
+            if uses_effective:
+                uid = f"tenant_rbac_effective_{model._meta.label_lower}"
+                m2m_changed.connect(
+                    sync_effective_on_permissions_changed, sender=model.permissions.through, dispatch_uid=uid
+                )
+                pre_delete.connect(remember_members_on_role_delete, sender=model, dispatch_uid=uid)
+                post_delete.connect(sync_members_on_role_delete, sender=model, dispatch_uid=uid)
+
+        if issubclass(model, (AbstractTenantRole, AbstractTenantMember)):
+            # Receivers run in connection order: the effective rows are synced first, so that
+            # a request in between cannot cache the old set under the new version
+            uid = f"tenant_rbac_invalidate_{model._meta.label_lower}"
+            post_save.connect(invalidate_on_change, sender=model, dispatch_uid=uid)
+            post_delete.connect(invalidate_on_change, sender=model, dispatch_uid=uid)
+
+        if issubclass(model, AbstractTenantRole):
+            m2m_changed.connect(
+                invalidate_on_permissions_changed,
+                sender=model.permissions.through,
+                dispatch_uid=f"tenant_rbac_invalidate_{model._meta.label_lower}_permissions",
+            )
+
+        if issubclass(model, AbstractTenantRole) and uses_role_hierarchy(model):
+            uid = f"tenant_rbac_hierarchy_{model._meta.label_lower}"
+            m2m_changed.connect(refresh_on_parents_changed, sender=model.parents.through, dispatch_uid=uid)
+            pre_delete.connect(remember_descendants_on_delete, sender=model, dispatch_uid=uid)
+            post_delete.connect(refresh_descendants_on_delete, sender=model, dispatch_uid=uid)
+
+        if uses_audit and issubclass(model, AbstractTenantRole):
+            uid = f"tenant_rbac_audit_{model._meta.label_lower}"
+            post_save.connect(audit_role_saved, sender=model, dispatch_uid=uid)
+            post_delete.connect(audit_role_deleted, sender=model, dispatch_uid=uid)
+            m2m_changed.connect(audit_permissions_changed, sender=model.permissions.through, dispatch_uid=uid)
+            if uses_role_hierarchy(model):
+                m2m_changed.connect(audit_parents_changed, sender=model.parents.through, dispatch_uid=uid)
+
+        if uses_audit and issubclass(model, AbstractTenantMember):
+            uid = f"tenant_rbac_audit_{model._meta.label_lower}"
+            post_save.connect(audit_member_saved, sender=model, dispatch_uid=uid)
+            post_delete.connect(audit_member_deleted, sender=model, dispatch_uid=uid)
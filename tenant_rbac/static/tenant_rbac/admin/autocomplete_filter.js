@@ -0,0 +1,18 @@
+'use strict';
+{
+    // Reloads the changelist with the object picked in an AutocompleteFilter
+    const $ = django.jQuery;
+    $(function() {
+        $('.tenant-rbac-autocomplete-filter').each(function() {
+            const container = this;
+            $(container).find('select').on('change', function() {
+                let query = container.dataset.queryString;
+                if (this.value) {
+                    query += (query.length > 1 ? '&' : '') +
+                        encodeURIComponent(container.dataset.lookup) + '=' + encodeURIComponent(this.value);
+                }
+                window.location.search = query;
+            });
+        });
+    });
+}
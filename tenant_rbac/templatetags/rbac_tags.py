@@ -1,23 +1,52 @@
 from django import template
-from tenant_rbac.mixins import TenantRBACMixin
+from tenant_rbac.permissions import get_tenant_permissions
 
 register = template.Library()
 
+
+def _get_tenant(context, request):
+    tenant = getattr(request, 'tenant', None)
+    if tenant is None:
+        tenant = context.get('tenant')
+    return tenant
+
+
 @register.simple_tag(takes_context=True)
 def has_tenant_perm(context, permission_name):
     """
     Example: {% has_tenant_perm 'app.action' as can_edit %}
     {% if can_edit %} ... {% endif %}
+
+    Every call in the same request reuses one permission set,
+    so the number of checks in a template does not add queries.
     """
     request = context.get('request')
     if not request:
         return False
 
+    user = request.user
+    if not user.is_authenticated:
+        return False
+
+    if user.is_superuser:
+        return True
+
+    tenant = _get_tenant(context, request)
+    if not tenant:
+        return False
+
+    return permission_name in get_tenant_permissions(request, tenant)
+
+
+@register.simple_tag(takes_context=True)
+def tenant_perms(context):
+    """
+    Exposes the full permission set of the user in the current tenant.
+    Example: {% tenant_perms as perms %}
+    {% if 'app.action' in perms %} ... {% endif %}
+    """
+    request = context.get('request')
+    if not request:
+        return frozenset()
 
-    mixin = TenantRBACMixin()
-    mixin.tenant_permission_required = permission_name
-    
-    if not hasattr(request, 'tenant') and hasattr(context, 'tenant'):
-        request.tenant = context['tenant']
-        
-    return mixin.has_tenant_permission(request)
\ No newline at end of file
+    return get_tenant_permissions(request, _get_tenant(context, request))
\ No newline at end of file
@@ -1,12 +1,49 @@
-from django.views.generic import ListView, CreateView, UpdateView, DeleteView, DetailView
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Prefetch
+from django.db.models.constants import LOOKUP_SEP
+from django.views.generic import View, ListView, CreateView, UpdateView, DeleteView, DetailView
 from django.core.exceptions import ImproperlyConfigured, PermissionDenied
-from .mixins import TenantRBACMixin
+from .audit import record_denied
+from .mixins import AsyncTenantRBACMixin, TenantRBACMixin
 from .forms import TenantModelForm
+from .pagination import KeysetPaginationMixin
+from .permissions import tenant_permission_matrix
+
+logger = logging.getLogger('tenant_rbac.queries')
+
+
+class QueryCounter:
+    """Execute wrapper (connection.execute_wrapper) that counts the queries run."""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
 
 class TenantGenericViewMixin:
     """
     Shared logic for field detection and filtering.
+
+    Eager loading is declarative:
+        list_select_related = ['user', 'role']
+        list_prefetch_related = ['members__user']  # or Prefetch(...) objects
+
+    Prefetched tenant models are filtered by the current tenant too.
+
+    With DEBUG = True and TENANT_RBAC_QUERY_BUDGET_PER_OBJECT set (or
+    query_budget_per_object on the view), a warning is logged on
+    'tenant_rbac.queries' when the view and its template run more than
+    TENANT_RBAC_QUERY_BUDGET_BASE (default 5) + budget * rendered objects queries.
     """
+    list_select_related = ()
+    list_prefetch_related = ()
+    query_budget_per_object = None
+
     def get_tenant_field_name(self):
         if not self.model:
              if hasattr(self, 'get_queryset') and self.get_queryset() is not None:
@@ -22,10 +59,141 @@ class TenantGenericViewMixin:
         tenant = self.get_current_tenant(self.request)
         if not tenant: return qs.none()
         tenant_field = self.get_tenant_field_name()
-        return qs.filter(**{tenant_field: tenant.pk})
+        qs = qs.filter(**{tenant_field: tenant.pk})
+        if self.list_select_related:
+            qs = qs.select_related(*self.list_select_related)
+        if self.list_prefetch_related:
+            qs = qs.prefetch_related(*self.get_prefetch_lookups(qs.model, tenant))
+        return qs
+
+    def get_prefetch_lookups(self, model, tenant):
+        """
+        Expands list_prefetch_related into Prefetch objects whose querysets
+        are filtered by tenant, one per level ('members__user' -> 'members', 'members__user').
+        """
+        lookups, seen = [], set()
+        for lookup in self.list_prefetch_related:
+            if isinstance(lookup, Prefetch):
+                lookups.append(self.scope_prefetch(lookup, tenant))
+                seen.add(lookup.prefetch_to)
+                continue
+            current = model
+            parts = lookup.split(LOOKUP_SEP)
+            for depth, part in enumerate(parts):
+                current = current._meta.get_field(part).related_model
+                path = LOOKUP_SEP.join(parts[:depth + 1])
+                if path in seen:
+                    continue
+                seen.add(path)
+                lookups.append(self.scope_prefetch(Prefetch(path, queryset=current._default_manager.all()), tenant))
+        return lookups
+
+    def scope_prefetch(self, prefetch, tenant):
+        queryset = prefetch.queryset
+        if queryset is None or not hasattr(queryset.model, 'tenant_id'):
+            return prefetch
+        tenant_field = getattr(queryset.model, 'tenant_id', 'tenant_id')
+        return Prefetch(
+            prefetch.prefetch_through,
+            queryset=queryset.filter(**{tenant_field: tenant.pk}),
+            to_attr=prefetch.to_attr,
+        )
+
+    def get_query_budget_per_object(self):
+        if self.query_budget_per_object is not None:
+            return self.query_budget_per_object
+        return getattr(settings, 'TENANT_RBAC_QUERY_BUDGET_PER_OBJECT', None)
+
+    def dispatch(self, request, *args, **kwargs):
+        budget = self.get_query_budget_per_object() if settings.DEBUG else None
+        if budget is None:
+            return super().dispatch(request, *args, **kwargs)
+
+        # Counted with an execute wrapper: connection.queries_log is capped at
+        # 9000 entries, and the difference of its lengths stays 0 once full
+        counter = QueryCounter()
+        connection.execute_wrappers.append(counter)
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        except BaseException:
+            connection.execute_wrappers.remove(counter)
+            raise
+
+        def check_budget(response):
+            connection.execute_wrappers.remove(counter)
+            self.check_query_budget(counter.count, budget, getattr(response, 'context_data', None))
+
+        if hasattr(response, 'add_post_render_callback') and not response.is_rendered:
+            # TemplateResponse: also count the queries run while rendering
+            response.add_post_render_callback(check_budget)
+        else:
+            check_budget(response)
+        return response
 
+    def check_query_budget(self, queries, budget, context):
+        objects = 1
+        if context:
+            if context.get('object_list') is not None:
+                objects = max(len(context['object_list']), 1)
+        allowed = getattr(settings, 'TENANT_RBAC_QUERY_BUDGET_BASE', 5) + budget * objects
+        if queries > allowed:
+            logger.warning(
+                '%s ran %d queries for %d object(s) (budget %d). '
+                'Missing list_select_related / list_prefetch_related?',
+                self.__class__.__name__, queries, objects, allowed,
+            )
+
+
+class AsyncTenantView(AsyncTenantRBACMixin, View):
+    """
+    Base view for async tenant-gated endpoints (e.g. JSON APIs under ASGI).
+    Define 'async def get(self, request, *args, **kwargs)' and use the
+    async ORM inside, always filtering by request.tenant.
+    """
+    pass
+
+
+class RowPermissionsMixin:
+    """
+    Evaluates permissions for the user of every row on the current page:
 
-class TenantListView(TenantRBACMixin, TenantGenericViewMixin, ListView):
+        row_permissions = ['sandbox.change_role', 'auth.add_user']
+        row_permissions_user_field = 'user'
+
+    Each object gets 'tenant_perms' (a frozenset of the granted keys), from
+    one tenant_permission_matrix() call per page: the number of queries does
+    not grow with rows or permissions.
+    """
+    row_permissions = ()
+    row_permissions_user_field = 'user'
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if self.row_permissions and context.get('object_list') is not None:
+            self.annotate_row_permissions(context['object_list'])
+        return context
+
+    def annotate_row_permissions(self, objects):
+        # Evaluates the page once; the template iterates the same cached instances
+        objects = list(objects)
+        if not objects:
+            return
+        user_attr = objects[0]._meta.get_field(self.row_permissions_user_field).attname
+        matrix = tenant_permission_matrix(
+            self.get_current_tenant(self.request),
+            [getattr(obj, user_attr) for obj in objects],
+            self.row_permissions,
+        )
+        for obj in objects:
+            obj.tenant_perms = matrix.get(getattr(obj, user_attr), frozenset())
+
+
+class TenantListView(TenantRBACMixin, TenantGenericViewMixin, KeysetPaginationMixin, RowPermissionsMixin, ListView):
+    """
+    Set pagination_mode = 'keyset' (with paginate_by) for cursor pagination
+    on large tenants: no OFFSET scans and no COUNT(*). Set row_permissions
+    to evaluate permissions for the user of every row on the page.
+    """
     pass
 
 class TenantDetailView(TenantRBACMixin, TenantGenericViewMixin, DetailView):
@@ -70,6 +238,7 @@ class TenantDeleteView(TenantRBACMixin, TenantGenericViewMixin, DeleteView):
         # OPTION A: Standardization of the 'is_protected' field
         # If the object has is_protected=True, we forbid deletion.
         if getattr(self.object, 'is_protected', False):
+            self.record_protected_denied()
             raise PermissionDenied("This record is protected and cannot be deleted.")
         
         return super().form_valid(form)
@@ -78,5 +247,9 @@ class TenantDeleteView(TenantRBACMixin, TenantGenericViewMixin, DeleteView):
     def post(self, request, *args, **kwargs):
         self.object = self.get_object()
         if getattr(self.object, 'is_protected', False):
+             self.record_protected_denied()
              raise PermissionDenied("This record is protected and cannot be deleted.")
-        return super().post(request, *args, **kwargs)
\ No newline at end of file
+        return super().post(request, *args, **kwargs)
+
+    def record_protected_denied(self):
+        record_denied(self.request, 'protected', target=self.object)
\ No newline at end of file
@@ -0,0 +1,94 @@
+"""
+Warm-up of the permission caches before a worker takes traffic.
+
+After a deploy, the first requests of every worker would load the
+permission catalog, the content types and the permission sets of their
+users. warm_up() does it up front:
+
+    # wsgi.py / asgi.py, after get_wsgi_application()
+    from tenant_rbac.warmup import warm_up
+    warm_up()
+
+    # or gunicorn.conf.py
+    def post_worker_init(worker):
+        from tenant_rbac.warmup import warm_up
+        warm_up()
+
+It loads the permission catalog (also used by the masks) and the
+ContentType cache, checks every tenant_permission_required of the URLconf
+against the database and, when TENANT_RBAC_CACHE is set, caches the
+permission sets of the most recently active members of
+TENANT_RBAC_WARM_UP_TENANTS (at most TENANT_RBAC_WARM_UP_MAX_USERS per
+tenant, default 1000). With a shared cache, 'python manage.py
+warm_up_permissions' does this once per deploy instead.
+
+By default errors (e.g. an unmigrated database) are logged, not raised:
+the warm-up must not keep a worker from starting.
+"""
+import logging
+from collections import namedtuple
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F
+
+from .cache import get_permission_cache, prime_cached_permissions
+from .catalog import permission_catalog
+from .checks import iter_permission_views
+from .members import get_member_model
+from .permissions import tenant_permission_matrix
+
+logger = logging.getLogger('tenant_rbac')
+
+WarmUpResult = namedtuple('WarmUpResult', ['permissions', 'unknown', 'users'])
+
+
+def warm_up_tenant(tenant_pk, max_users=1000, member_model=None):
+    """
+    Caches the permission sets of the most recently active members of a
+    tenant, two queries per 1000 users. Returns the number of users cached.
+    """
+    if get_permission_cache() is None:
+        return 0
+    member_model = member_model or get_member_model()
+    tenant_field = member_model._meta.get_field(getattr(member_model, 'tenant_id', 'tenant_id'))
+    user_ids = list(
+        member_model._base_manager.filter(**{tenant_field.attname: tenant_pk, 'user__is_superuser': False})
+        .order_by(F('user__last_login').desc(nulls_last=True))
+        .values_list('user_id', flat=True)[:max_users]
+    )
+    if not user_ids:
+        return 0
+    tenant = tenant_field.related_model(pk=tenant_pk)
+    keys = [entry.key for entry in permission_catalog.entries]
+    return prime_cached_permissions(tenant_pk, lambda: tenant_permission_matrix(tenant, user_ids, keys))
+
+
+def warm_up(tenant_pks=None, max_users=None, fail_silently=True):
+    """
+    Loads the per-process caches and, for tenant_pks (default
+    TENANT_RBAC_WARM_UP_TENANTS), the cached permission sets.
+    Returns a WarmUpResult, or None if it failed and fail_silently is set.
+    """
+    if tenant_pks is None:
+        tenant_pks = getattr(settings, 'TENANT_RBAC_WARM_UP_TENANTS', ())
+    if max_users is None:
+        max_users = getattr(settings, 'TENANT_RBAC_WARM_UP_MAX_USERS', 1000)
+    try:
+        permission_catalog.load()
+        ContentType.objects.get_for_models(*apps.get_models())
+
+        # The system check only sees model permissions; this one sees the database
+        known = {entry.key for entry in permission_catalog.entries}
+        unknown = sorted({permission for _, _, permission in iter_permission_views()} - known)
+        for permission in unknown:
+            logger.warning("Permission '%s' required by a view does not exist in the database.", permission)
+
+        users = sum(warm_up_tenant(tenant_pk, max_users) for tenant_pk in tenant_pks)
+    except Exception:
+        if not fail_silently:
+            raise
+        logger.exception('Permission warm-up failed')
+        return None
+    return WarmUpResult(len(known), unknown, users)